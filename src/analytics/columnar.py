@@ -0,0 +1,312 @@
+"""
+Columnar loading and export of cell_logs for analytics.
+
+Loading: the server projects every event to a fixed-layout document
+{c: int32 cell_id, s: int32 status (1=ON, 0=OFF), t: int64 epoch ms}, and the
+raw BSON batches are viewed as a NumPy record array instead of being decoded
+into one Python dict per event. Result: cell_id int32, status uint8, ts int64 (ms).
+
+Export: day-partitioned files (one per UTC day) that load_data() and
+performance_trends.py can scan instead of querying Mongo:
+
+    python -m src.analytics.columnar export --days 7 --out data/cell_logs
+    python -m src.analytics.columnar export --days 1 --out data/cell_logs --format arrow
+    python -m src.analytics.columnar info --data data/cell_logs
+
+Arrow IPC files are memory-mapped when scanned (no copy); Parquet is smaller on disk.
+Files need pyarrow; loading from Mongo does not.
+"""
+from __future__ import annotations
+import argparse
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from bson import decode_all
+from pymongo.collection import Collection
+
+from src.common.schema import log_field
+
+COLUMNS = ("cell_id", "status", "ts")
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# One projected document: int32 length, then (type byte, 1-char name, value) x 3, then 0x00
+_DOC = np.dtype([
+    ("size", "<i4"),
+    ("c_type", "u1"), ("c_name", "S2"), ("cell_id", "<i4"),
+    ("s_type", "u1"), ("s_name", "S2"), ("status", "<i4"),
+    ("t_type", "u1"), ("t_name", "S2"), ("ts", "<i8"),
+    ("end", "u1"),
+])
+_INT32, _INT64 = 0x10, 0x12
+
+def _pipeline(since: datetime, until: Optional[datetime], cell_ids: Optional[List[int]],
+              cluster: Optional[str] = None, shard: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+    match: Dict[str, Any] = {"ts": {"$gte": since}}
+    if until is not None:
+        match["ts"]["$lt"] = until
+    if cell_ids:
+        match[log_field("cell_id")] = {"$in": sorted(set(cell_ids))}
+    if cluster is not None:
+        match[log_field("cluster")] = cluster
+    if shard is not None:
+        # (k, n): only cells with cell_id % n == k
+        match.setdefault(log_field("cell_id"), {})["$mod"] = [shard[1], shard[0]]
+    return [
+        {"$match": match},
+        {"$sort": {"ts": 1}},
+        # Field order and BSON types fixed so every document has the same 30-byte layout
+        {"$project": {
+            "_id": 0,
+            "c": {"$toInt": f"${log_field('cell_id')}"},
+            "s": {"$cond": [{"$eq": ["$status", "ON"]}, 1, 0]},
+            "t": {"$toLong": "$ts"},
+        }},
+    ]
+
+def _empty() -> Dict[str, np.ndarray]:
+    return {"cell_id": np.empty(0, np.int32), "status": np.empty(0, np.uint8), "ts": np.empty(0, np.int64)}
+
+def decode_batch(buf: bytes) -> Dict[str, np.ndarray]:
+    """Raw BSON batch of projected documents -> typed columns (slow path if any doc is irregular)."""
+    if len(buf) % _DOC.itemsize == 0:
+        rec = np.frombuffer(buf, dtype=_DOC)
+        if ((rec["size"] == _DOC.itemsize).all() and (rec["c_type"] == _INT32).all()
+                and (rec["s_type"] == _INT32).all() and (rec["t_type"] == _INT64).all()):
+            return {"cell_id": rec["cell_id"].copy(), "status": rec["status"].astype(np.uint8),
+                    "ts": rec["ts"].copy()}
+    # e.g. a document without cell_id ($toInt gives null): decode normally, drop incomplete rows
+    docs = [d for d in decode_all(buf) if d.get("c") is not None and d.get("t") is not None]
+    if not docs:
+        return _empty()
+    return {"cell_id": np.fromiter((d["c"] for d in docs), np.int32, len(docs)),
+            "status": np.fromiter((d["s"] for d in docs), np.uint8, len(docs)),
+            "ts": np.fromiter((d["t"] for d in docs), np.int64, len(docs))}
+
+def iter_batches(coll: Collection, since: datetime, until: Optional[datetime] = None,
+                 cell_ids: Optional[List[int]] = None, cluster: Optional[str] = None,
+                 batch_size: int = 100_000, shard: Optional[Tuple[int, int]] = None
+                 ) -> Iterator[Dict[str, np.ndarray]]:
+    """Typed column batches in ts order, one per server batch."""
+    pipeline = _pipeline(since, until, cell_ids, cluster, shard)
+    cursor = coll.aggregate_raw_batches(pipeline, batchSize=batch_size, allowDiskUse=True)
+    for buf in cursor:
+        cols = decode_batch(buf)
+        if len(cols["ts"]):
+            yield cols
+
+def concat(batches: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    if not batches:
+        return _empty()
+    return {k: np.concatenate([b[k] for b in batches]) for k in COLUMNS}
+
+def load_columns(hours: Optional[float] = None, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 cell_ids: Optional[List[int]] = None, coll: Optional[Collection] = None) -> Dict[str, np.ndarray]:
+    """cell_id/status/ts arrays for a window (last `hours`, or since..until) straight from Mongo."""
+    if coll is None:
+        from src.common.db import get_logs_collection
+        coll = get_logs_collection()
+    if since is None:
+        since = datetime.now(timezone.utc) - timedelta(hours=hours if hours is not None else 24)
+    return concat(list(iter_batches(coll, since, until, cell_ids)))
+
+def to_frame(cols: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    The DataFrame shape the notebooks use (cell_id, status "ON"/"OFF", ts as naive
+    UTC datetimes, status_numeric), built from columns without per-row objects.
+    """
+    status = np.asarray(cols["status"], dtype=np.uint8)
+    return pd.DataFrame({
+        "cell_id": np.asarray(cols["cell_id"], dtype=np.int32),
+        "status": pd.Categorical.from_codes(status.astype(np.int8), categories=["OFF", "ON"]),
+        "ts": pd.to_datetime(np.asarray(cols["ts"], dtype=np.int64), unit="ms"),
+        "status_numeric": status,
+    })
+
+def load_frame(hours: Optional[float] = None, since: Optional[datetime] = None, until: Optional[datetime] = None,
+               cell_ids: Optional[List[int]] = None) -> pd.DataFrame:
+    return to_frame(load_columns(hours=hours, since=since, until=until, cell_ids=cell_ids))
+
+# ---------- day-partitioned files ----------
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("columnar files need pyarrow (pip install pyarrow)")
+    return pa, ipc, pq
+
+def _schema(pa):
+    return pa.schema([("cell_id", pa.int32()), ("status", pa.uint8()), ("ts", pa.timestamp("ms", tz="UTC"))])
+
+def day_path(out_dir: str, day: date, fmt: str = "parquet") -> str:
+    return os.path.join(out_dir, f"cell_logs_{day.isoformat()}{FORMATS[fmt]}")
+
+def _day_of(ms: np.ndarray) -> np.ndarray:
+    return (ms // 86_400_000).astype(np.int64)  # days since epoch (UTC)
+
+class _DayWriter:
+    """Writes one file per UTC day; batches arrive in ts order, so at most one file is open."""
+    def __init__(self, out_dir: str, fmt: str):
+        self.pa, self.ipc, self.pq = _pyarrow()
+        self.schema = _schema(self.pa)
+        self.out_dir, self.fmt = out_dir, fmt
+        self.day: Optional[int] = None
+        self.writer = None
+        self.tmp: Optional[str] = None
+        self.files: List[Dict[str, Any]] = []
+
+    def _open(self, day: int) -> None:
+        self.close()
+        self.day = day
+        path = day_path(self.out_dir, date(1970, 1, 1) + timedelta(days=day), self.fmt)
+        self.tmp = path + ".tmp"  # renamed on close so a reader never sees a half-written day
+        if self.fmt == "parquet":
+            self.writer = self.pq.ParquetWriter(self.tmp, self.schema, compression="zstd")
+        else:
+            self.writer = self.ipc.new_file(self.tmp, self.schema)
+        self.files.append({"path": path, "rows": 0})
+
+    def write(self, cols: Dict[str, np.ndarray]) -> None:
+        days = _day_of(cols["ts"])
+        # Split the batch where the day changes (it is sorted by ts)
+        cuts = np.flatnonzero(np.diff(days)) + 1
+        for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(days)]):
+            if days[lo] != self.day:
+                self._open(int(days[lo]))
+            table = self.pa.Table.from_arrays([
+                self.pa.array(cols["cell_id"][lo:hi], self.pa.int32()),
+                self.pa.array(cols["status"][lo:hi], self.pa.uint8()),
+                self.pa.array(cols["ts"][lo:hi], self.pa.timestamp("ms", tz="UTC")),
+            ], schema=self.schema)
+            self.writer.write_table(table)
+            self.files[-1]["rows"] += int(hi - lo)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            os.replace(self.tmp, self.files[-1]["path"])
+            self.writer = None
+
+def export(out_dir: str, since: datetime, until: Optional[datetime] = None, fmt: str = "parquet",
+           coll: Optional[Collection] = None, batch_size: int = 100_000) -> List[Dict[str, Any]]:
+    """
+    Stream cell_logs in [since, until) to one file per UTC day; memory stays at one
+    server batch. Re-exporting a day replaces its file, so the window is widened to
+    whole days (since down to 00:00 UTC, until up to the next midnight): a partial
+    edge day never overwrites a complete earlier export. Returns [{path, rows}].
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {list(FORMATS)}")
+    since = _day_floor(since)
+    if until is not None:
+        floor = _day_floor(until)
+        until = floor if floor == _utc(until) else floor + timedelta(days=1)
+    if coll is None:
+        from src.common.db import get_logs_collection
+        coll = get_logs_collection()
+    os.makedirs(out_dir, exist_ok=True)
+    writer = _DayWriter(out_dir, fmt)
+    try:
+        for cols in iter_batches(coll, since, until, batch_size=batch_size):
+            writer.write(cols)
+    finally:
+        writer.close()
+    return writer.files
+
+def _utc(ts: Optional[datetime]) -> Optional[datetime]:
+    return ts.replace(tzinfo=timezone.utc) if ts is not None and ts.tzinfo is None else ts
+
+def _day_floor(ts: datetime) -> datetime:
+    return datetime.combine(_utc(ts).astimezone(timezone.utc).date(), datetime.min.time(), tzinfo=timezone.utc)
+
+def day_files(data_dir: str, since: Optional[datetime], until: Optional[datetime]) -> List[str]:
+    first = since.astimezone(timezone.utc).date() if since else None
+    last = until.astimezone(timezone.utc).date() if until else None
+    out = []
+    for name in sorted(os.listdir(data_dir)):
+        stem, ext = os.path.splitext(name)
+        if not stem.startswith("cell_logs_") or ext not in FORMATS.values():
+            continue
+        day = date.fromisoformat(stem[len("cell_logs_"):])
+        # Filename filter first: files outside the window are never opened
+        if (first and day < first) or (last and day > last):
+            continue
+        out.append(os.path.join(data_dir, name))
+    return out
+
+def read_file(path: str, memory_map: bool = True) -> Dict[str, np.ndarray]:
+    """cell_id/status/ts columns of one exported day file."""
+    pa, ipc, pq = _pyarrow()
+    if path.endswith(FORMATS["arrow"]):
+        source = pa.memory_map(path) if memory_map else pa.OSFile(path)
+        table = ipc.open_file(source).read_all()
+    else:
+        table = pq.read_table(path, memory_map=memory_map)
+    return {
+        "cell_id": table.column("cell_id").to_numpy(),
+        "status": table.column("status").to_numpy(),
+        "ts": table.column("ts").cast(pa.int64()).to_numpy(),
+    }
+
+def scan_columns(data_dir: str, hours: Optional[float] = None, since: Optional[datetime] = None,
+                 until: Optional[datetime] = None, cell_ids: Optional[List[int]] = None,
+                 memory_map: bool = True) -> Dict[str, np.ndarray]:
+    """Same columns as load_columns(), read from exported day files. hours=None reads everything."""
+    if since is None and hours is not None:
+        since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    since, until = _utc(since), _utc(until)
+    parts = []
+    for path in day_files(data_dir, since, until):
+        cols = read_file(path, memory_map)
+        keep = np.ones(len(cols["ts"]), dtype=bool)
+        if since is not None:
+            keep &= cols["ts"] >= int(since.timestamp() * 1000)
+        if until is not None:
+            keep &= cols["ts"] < int(until.timestamp() * 1000)
+        if cell_ids:
+            keep &= np.isin(cols["cell_id"], cell_ids)
+        parts.append(cols if keep.all() else {k: v[keep] for k, v in cols.items()})
+    return concat(parts)
+
+def scan_frame(data_dir: str, hours: Optional[float] = None, since: Optional[datetime] = None,
+               until: Optional[datetime] = None, cell_ids: Optional[List[int]] = None) -> pd.DataFrame:
+    return to_frame(scan_columns(data_dir, hours=hours, since=since, until=until, cell_ids=cell_ids))
+
+def _cli() -> None:
+    from dotenv import load_dotenv
+    load_dotenv()
+    ap = argparse.ArgumentParser(description="Columnar export of cell_logs.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export", help="write day-partitioned files from MongoDB")
+    ex.add_argument("--out", default="data/cell_logs")
+    ex.add_argument("--days", type=float, default=1, help="export the last N days (widened to whole UTC days)")
+    ex.add_argument("--since", help="ISO start (overrides --days)")
+    ex.add_argument("--until", help="ISO end (exclusive); default now")
+    ex.add_argument("--format", choices=list(FORMATS), default="parquet")
+    info = sub.add_parser("info", help="summarize exported files")
+    info.add_argument("--data", default="data/cell_logs")
+    args = ap.parse_args()
+
+    if args.cmd == "export":
+        since = (_utc(datetime.fromisoformat(args.since)) if args.since
+                 else datetime.now(timezone.utc) - timedelta(days=args.days))
+        until = _utc(datetime.fromisoformat(args.until)) if args.until else None
+        files = export(args.out, since, until, fmt=args.format)
+        for f in files:
+            print(f"  {f['path']}: {f['rows']:,} rows")
+        print(f"✅ Exported {sum(f['rows'] for f in files):,} events to {len(files)} file(s) in {args.out}")
+    else:
+        cols = scan_columns(args.data)
+        if not len(cols["ts"]):
+            print(f"❌ No exported data in {args.data}")
+            return
+        lo, hi = pd.to_datetime([cols["ts"].min(), cols["ts"].max()], unit="ms", utc=True)
+        print(f"✅ {len(cols['ts']):,} events, {len(np.unique(cols['cell_id'])):,} cells, {lo} .. {hi}")
+
+if __name__ == "__main__":
+    _cli()
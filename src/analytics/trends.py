@@ -0,0 +1,283 @@
+"""
+Chunked, parallel trend engine behind performance_trends.py.
+
+The window is never loaded as one frame. Each task reads one time partition (an
+exported day file, or partition_hours of cell_logs) for one shard of cells
+(cell_id % shards) and reduces it to a mergeable partial:
+
+  per (cell, hour)   ON events and events
+  per hour of day    OFF events
+
+i.e. a few numbers per cell-hour however often cells report. Tasks run on a
+process pool; the parent only merges partials and derives what
+analyze_performance_trends() shows, with the same pandas semantics:
+
+  system_hourly      per hour, the mean over cells of their hourly uptime (hours
+                     inside a cell's first..last hour without events are NaN)
+  cell_performance   share of ON events per cell, best first
+  failure_hours      OFF events by hour of day (UTC)
+
+plus the trend line, SLA compliance and the figures the insights print. Nothing
+here plots, so it runs headless (cron, CI):
+
+    python -m src.analytics.trends --data data/cell_logs --workers 8 --out trends.json
+    python -m src.analytics.trends --days 30 --shards 4 --workers 8
+"""
+from __future__ import annotations
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pymongo.collection import Collection
+
+from src.analytics import columnar
+
+HOUR_MS = 3_600_000
+SLA_LEVEL = 0.95       # a cell is SLA compliant above this share of ON events
+CRITICAL_LEVEL = 0.8
+
+_KEYS = ("cell_id", "hour", "on", "n")
+
+# ---------- partials ----------
+
+def _reduce(cell_id: np.ndarray, hour: np.ndarray, on: np.ndarray, n: np.ndarray,
+            failures: np.ndarray) -> Dict[str, np.ndarray]:
+    # Sum rows with the same (cell, hour); result sorted by cell, then hour
+    if not len(cell_id):
+        return {**{k: np.empty(0, np.int64) for k in _KEYS}, "failures": failures}
+    order = np.lexsort((hour, cell_id))
+    cell_id, hour, on, n = cell_id[order], hour[order], on[order], n[order]
+    starts = np.flatnonzero(np.r_[True, (np.diff(cell_id) != 0) | (np.diff(hour) != 0)])
+    return {"cell_id": cell_id[starts], "hour": hour[starts], "on": np.add.reduceat(on, starts),
+            "n": np.add.reduceat(n, starts), "failures": failures}
+
+def partial(cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Columns (cell_id, status 1/0, ts ms), in any order -> partial."""
+    ts = np.asarray(cols["ts"], dtype=np.int64)
+    status = np.asarray(cols["status"], dtype=np.int64)
+    hour = ts // HOUR_MS
+    failures = np.bincount(hour[status == 0] % 24, minlength=24).astype(np.int64)
+    return _reduce(np.asarray(cols["cell_id"], dtype=np.int64), hour, status,
+                   np.ones(len(ts), dtype=np.int64), failures)
+
+def merge(parts: Iterable[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Combine partials from any time partitions and cell shards (overlaps are summed)."""
+    parts = list(parts)
+    if not parts:
+        return partial(columnar.concat([]))
+    return _reduce(*(np.concatenate([p[k] for p in parts]) for k in _KEYS),
+                   np.sum([p["failures"] for p in parts], axis=0))
+
+def frame_partial(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Partial of an in-memory frame shaped like columnar.to_frame() (ts naive UTC)."""
+    ts = pd.to_datetime(df["ts"])
+    if ts.dt.tz is not None:
+        ts = ts.dt.tz_convert("UTC").dt.tz_localize(None)
+    return partial({"cell_id": df["cell_id"].to_numpy(), "status": df["status_numeric"].to_numpy(),
+                    "ts": ts.to_numpy(dtype="datetime64[ms]").astype(np.int64)})
+
+# ---------- results ----------
+
+def trend_line(system_hourly: pd.Series) -> Optional[Dict[str, Any]]:
+    """
+    Least-squares line through the hourly series by position, as the plot draws it.
+    None with fewer than 2 hours or when the fit fails (e.g. hours without events).
+    """
+    if len(system_hourly) < 2:
+        return None
+    values = system_hourly.values
+    if len(set(values)) <= 1:
+        return {"direction": "stable", "slope": 0.0, "intercept": float(values[0]), "next_pct": None}
+    try:
+        z = np.polyfit(np.arange(len(values)), values, 1)
+    except Exception:
+        return None
+    direction = "improving" if z[0] > 0 else "declining" if z[0] < 0 else "stable"
+    return {"direction": direction, "slope": float(z[0]), "intercept": float(z[1]),
+            "next_pct": float(np.poly1d(z)(len(values)) * 100)}
+
+def finish(p: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Merged partial -> the series and figures analyze_performance_trends() reports."""
+    cell_id, hour, on, n = (p[k] for k in _KEYS)
+    failures = p["failures"]
+    nz = np.flatnonzero(failures)
+    failure_hours = pd.Series(failures[nz], index=pd.Index(nz.astype(np.int32), name="ts"), name="count")
+    result: Dict[str, Any] = {"events": int(n.sum()), "cells": 0, "failure_hours": failure_hours}
+    if not len(cell_id):
+        return result
+
+    # Per-cell hourly uptime, then the mean over cells per hour (NaN hours are skipped)
+    hourly = pd.DataFrame({"ts": pd.to_datetime(hour * HOUR_MS, unit="ms"), "status_numeric": on / n})
+    system = hourly.groupby("ts")["status_numeric"].mean()
+    # resample() gives every cell every hour from its first to its last: those hours exist even if empty
+    starts = np.flatnonzero(np.r_[True, np.diff(cell_id) != 0])
+    ends = np.r_[starts[1:], len(cell_id)] - 1
+    lo = int(hour.min())
+    cover = np.zeros(int(hour.max()) - lo + 2, dtype=np.int64)
+    np.add.at(cover, hour[starts] - lo, 1)
+    np.add.at(cover, hour[ends] - lo + 1, -1)
+    hours = lo + np.flatnonzero(np.cumsum(cover)[:-1] > 0)
+    system = system.reindex(pd.DatetimeIndex(pd.to_datetime(hours * HOUR_MS, unit="ms"), name="ts"))
+
+    cells = pd.Index(cell_id[starts].astype(np.int32), name="cell_id")
+    performance = pd.Series(np.add.reduceat(on, starts) / np.add.reduceat(n, starts), index=cells,
+                            name="status_numeric").sort_values(ascending=False)
+    sla_compliance = (performance > SLA_LEVEL).sum() / len(performance) * 100
+    result.update({
+        "cells": len(performance),
+        "start": system.index[0].to_pydatetime().replace(tzinfo=timezone.utc),
+        "end": (system.index[-1] + pd.Timedelta(hours=1)).to_pydatetime().replace(tzinfo=timezone.utc),
+        "system_hourly": system,
+        "trend": trend_line(system),
+        "cell_performance": performance,
+        "sla_compliance": float(sla_compliance),
+        "critical_cells": [int(c) for c in performance[performance < CRITICAL_LEVEL].index],
+        "avg_uptime": float(performance.mean() * 100),
+    })
+    if len(failure_hours):
+        result["peak_failure_hour"] = int(failure_hours.idxmax())
+        # worth planning maintenance around when the peak stands out
+        result["failure_peak_outlier"] = bool(failure_hours.max() > failure_hours.mean() * 2)
+    return result
+
+def from_frame(df: pd.DataFrame) -> Dict[str, Any]:
+    """finish() for a frame already in memory (the notebooks' df)."""
+    return finish(frame_partial(df))
+
+# ---------- tasks ----------
+
+def _mask(cols: Dict[str, np.ndarray], since_ms: Optional[int], until_ms: Optional[int],
+          shard: Tuple[int, int]) -> Dict[str, np.ndarray]:
+    keep = np.ones(len(cols["ts"]), dtype=bool)
+    if since_ms is not None:
+        keep &= cols["ts"] >= since_ms
+    if until_ms is not None:
+        keep &= cols["ts"] < until_ms
+    if shard[1] > 1:
+        keep &= cols["cell_id"] % shard[1] == shard[0]
+    return cols if keep.all() else {k: v[keep] for k, v in cols.items()}
+
+def run_task(task: Dict[str, Any], coll: Optional[Collection] = None) -> Dict[str, np.ndarray]:
+    """
+    Partial for one task: {"path"} (a day file) or {"since_ms", "until_ms"} (cell_logs),
+    plus "shard": (k, n). Memory is one file or one server batch plus the partial.
+    """
+    shard = tuple(task["shard"])
+    if task.get("path"):
+        cols = columnar.read_file(task["path"])
+        return partial(_mask(cols, task.get("since_ms"), task.get("until_ms"), shard))
+    if coll is None:
+        from src.common.db import get_logs_collection
+        coll = get_logs_collection()
+    since = datetime.fromtimestamp(task["since_ms"] / 1000, tz=timezone.utc)
+    until = datetime.fromtimestamp(task["until_ms"] / 1000, tz=timezone.utc)
+    acc = merge([])
+    for cols in columnar.iter_batches(coll, since, until, shard=shard if shard[1] > 1 else None):
+        acc = merge([acc, partial(cols)])
+    return acc
+
+def _utc(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+def _ms(ts: datetime) -> int:
+    return int(_utc(ts).timestamp() * 1000)
+
+def plan(since: Optional[datetime] = None, until: Optional[datetime] = None, data_dir: Optional[str] = None,
+         shards: int = 1, partition_hours: float = 24) -> List[Dict[str, Any]]:
+    """
+    Tasks covering [since, until) x shards. Files: one partition per day file in the
+    window (since=None reads every file). Mongo: hour-aligned slices of partition_hours.
+    """
+    since, until = (_utc(since) if since else None), (_utc(until) if until else None)
+    since_ms = _ms(since) if since is not None else None
+    until_ms = _ms(until) if until is not None else None
+    if data_dir is not None:
+        windows = [{"path": path, "since_ms": since_ms, "until_ms": until_ms}
+                   for path in columnar.day_files(data_dir, since, until)]
+    else:
+        if since_ms is None or until_ms is None:
+            raise ValueError("since and until are required when reading from MongoDB")
+        step = max(1, int(partition_hours * HOUR_MS) // HOUR_MS) * HOUR_MS
+        cuts = [since_ms] + list(range((since_ms // step + 1) * step, until_ms, step)) + [until_ms]
+        windows = [{"since_ms": a, "until_ms": b} for a, b in zip(cuts, cuts[1:]) if a < b]
+    return [{**w, "shard": (k, shards)} for w in windows for k in range(shards)]
+
+def compute(since: Optional[datetime] = None, until: Optional[datetime] = None, hours: Optional[float] = None,
+            data_dir: Optional[str] = None, workers: Optional[int] = None, shards: int = 1,
+            partition_hours: float = 24, coll: Optional[Collection] = None) -> Dict[str, Any]:
+    """
+    Trends for the last `hours` (or since..until) from exported day files or cell_logs.
+    workers=1 runs the tasks in this process (the only mode that uses `coll`); otherwise
+    a spawned process pool (PyMongo clients are not fork-safe) with workers processes
+    (default: CPU count). Without data_dir the window defaults to the last 24 hours.
+    """
+    if since is None and (hours is not None or data_dir is None):
+        since = (until or datetime.now(timezone.utc)) - timedelta(hours=hours if hours is not None else 24)
+    if until is None and data_dir is None:
+        until = datetime.now(timezone.utc)
+    tasks = plan(since, until, data_dir, shards, partition_hours)
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if workers == 1:
+        parts = [run_task(t, coll) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            parts = list(pool.map(run_task, tasks))
+    result = finish(merge(parts))
+    result.update({"tasks": len(tasks), "workers": workers})
+    return result
+
+def to_json(result: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe copy: series become lists, NaN becomes null."""
+    out = {k: v for k, v in result.items() if not isinstance(v, (pd.Series, datetime))}
+    for k in ("start", "end"):
+        if k in result:
+            out[k] = result[k].isoformat()
+    if "system_hourly" in result:
+        out["system_hourly"] = [{"ts": ts.isoformat(), "uptime_pct": None if np.isnan(v) else round(v * 100, 4)}
+                                for ts, v in result["system_hourly"].items()]
+        out["cell_performance"] = [{"cell_id": int(c), "uptime_pct": round(v * 100, 4)}
+                                   for c, v in result["cell_performance"].items()]
+    out["failure_hours"] = {int(h): int(c) for h, c in result["failure_hours"].items()}
+    return out
+
+def _cli() -> None:
+    from dotenv import load_dotenv
+    load_dotenv()
+    ap = argparse.ArgumentParser(description="Hourly uptime trend, cell ranking and failure hours (no plots).")
+    ap.add_argument("--data", help="exported day files (python -m src.analytics.columnar export); default: MongoDB")
+    ap.add_argument("--hours", type=float, default=None, help="last N hours (MongoDB default: 24; files: all)")
+    ap.add_argument("--days", type=float, default=None, help="last N days")
+    ap.add_argument("--since", help="ISO start (overrides --hours/--days)")
+    ap.add_argument("--until", help="ISO end (exclusive)")
+    ap.add_argument("--workers", type=int, default=None, help="processes (default: CPU count; 1 = in-process)")
+    ap.add_argument("--shards", type=int, default=1, help="split each partition into N cell shards")
+    ap.add_argument("--partition-hours", type=float, default=24, help="MongoDB: hours per time partition")
+    ap.add_argument("--out", default=None, help="write the results as JSON")
+    args = ap.parse_args()
+
+    hours = args.days * 24 if args.days is not None else args.hours
+    since = _utc(datetime.fromisoformat(args.since)) if args.since else None
+    until = _utc(datetime.fromisoformat(args.until)) if args.until else None
+    result = compute(since, until, hours=hours, data_dir=args.data, workers=args.workers,
+                     shards=args.shards, partition_hours=args.partition_hours)
+    if not result["cells"]:
+        print("❌ No events in the window")
+        return
+    trend = result["trend"]
+    print(f"✅ {result['events']:,} events, {result['cells']:,} cells, {len(result['system_hourly'])} hours "
+          f"({result['tasks']} tasks on {result['workers']} workers)")
+    print(f"  SLA compliance {result['sla_compliance']:.1f}%, average uptime {result['avg_uptime']:.1f}%, "
+          f"trend {trend['direction'] if trend else 'n/a'}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(to_json(result), f, indent=2)
+        print(f"💾 Results saved to {args.out}")
+
+if __name__ == "__main__":
+    _cli()
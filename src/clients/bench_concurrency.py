@@ -0,0 +1,81 @@
+"""
+Latency of overlapping tool calls with blocking (ASYNC_TOOLS=0) vs async (ASYNC_TOOLS=1) tools.
+
+Starts the MCP server once per mode and fires --calls concurrent calls on one session:
+a mix of summarize_recent (slow: waits on the LLM) and fetch_logs (fast). By default the
+LLM is the offline stub with --llm-ms of simulated latency, so no Groq key is needed.
+Needs MongoDB with some recent logs (run the generator first).
+
+    python -m src.clients.bench_concurrency --calls 40 --llm-ms 1500
+"""
+import argparse, asyncio, json, os, time
+from dotenv import load_dotenv
+load_dotenv()
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+def _pct(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] if values else 0.0
+
+async def run_mode(async_tools: bool, calls: int, summaries: float, llm_ms: int, real_llm: bool) -> dict:
+    env = {**os.environ, "ASYNC_TOOLS": "1" if async_tools else "0", "SUMMARY_CACHE_TTL": "0"}
+    if not real_llm:
+        env.update(LLM_BACKEND="stub", STUB_LLM_LATENCY_MS=str(llm_ms))
+    server = StdioServerParameters(command="python", args=["-m", "src.mcp_server.server"], env=env)
+
+    async with stdio_client(server) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            await session.call_tool(name="fetch_logs", arguments={"limit": 1})  # warm up connections
+
+            n_sum = int(calls * summaries)
+            latencies: dict = {"summarize_recent": [], "fetch_logs": []}
+
+            async def one(i: int) -> None:
+                if i < n_sum:
+                    # Different windows -> different prompts, so the summary cache can't merge them
+                    name, args = "summarize_recent", {"minutes": 10 + i}
+                else:
+                    name, args = "fetch_logs", {"limit": 50, "minutes": 10}
+                t0 = time.perf_counter()
+                res = await session.call_tool(name=name, arguments=args)
+                if res.isError:
+                    raise RuntimeError(f"{name} failed: {res.content}")
+                latencies[name].append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(calls)))
+            wall = time.perf_counter() - t0
+
+    out = {"mode": "async" if async_tools else "blocking", "calls": calls, "wall_s": round(wall, 3)}
+    for name, vals in latencies.items():
+        if vals:
+            out[name] = {"n": len(vals), "p50_s": round(_pct(vals, 50), 3),
+                         "p95_s": round(_pct(vals, 95), 3), "max_s": round(max(vals), 3)}
+    return out
+
+async def main(args) -> None:
+    results = []
+    for async_tools in (False, True):
+        r = await run_mode(async_tools, args.calls, args.summaries, args.llm_ms, args.real_llm)
+        results.append(r)
+        print(f"\n[{r['mode']}] {r['calls']} overlapping calls in {r['wall_s']:.2f}s")
+        for name in ("summarize_recent", "fetch_logs"):
+            if name in r:
+                s = r[name]
+                print(f"  {name:<17} n={s['n']:<4} p50={s['p50_s']:.3f}s p95={s['p95_s']:.3f}s max={s['max_s']:.3f}s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.json}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Concurrent tool-call latency: blocking vs async tools.")
+    ap.add_argument("--calls", type=int, default=40, help="overlapping tool calls per mode")
+    ap.add_argument("--summaries", type=float, default=0.25, help="fraction of calls that are summarize_recent")
+    ap.add_argument("--llm-ms", type=int, default=1500, help="simulated LLM latency (stub backend)")
+    ap.add_argument("--real-llm", action="store_true", help="use the configured Groq backend instead of the stub")
+    ap.add_argument("--json", default=None, help="also write results to this file")
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,56 @@
+"""
+Compare ingest cost of the row (write_logs) and columnar (write_logs_columnar) payloads.
+
+Times what the server does per call: JSON-decode the arguments, validate and build
+documents. With --mongo the documents are also inserted into a scratch collection.
+
+    python -m src.clients.bench_ingest --cells 50000 --repeat 5
+"""
+import argparse, json, random, time
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+load_dotenv()
+
+from src.common.models import CellLog, CellLogBatch
+from src.generator.generate_logs import build_call
+
+def _rows_to_docs(args: dict) -> list:
+    return [CellLog.model_validate(item).model_dump(mode="python") for item in args["batch"]]
+
+def _columnar_to_docs(args: dict) -> list:
+    return CellLogBatch.model_validate(args).to_docs()
+
+def bench(cells: int, repeat: int, coll=None) -> None:
+    cell_ids = list(range(1, cells + 1))
+    statuses = [random.choice(("ON", "OFF")) for _ in cell_ids]
+    ts = datetime.now(timezone.utc).isoformat()
+
+    print(f"{'payload':<10} {'bytes':>12} {'best s':>9} {'rows/s':>12}")
+    for payload in ("rows", "columnar", "bitmask"):
+        _, args = build_call(payload, cell_ids, statuses, ts, 1)
+        body = json.dumps(args)
+        to_docs = _rows_to_docs if payload == "rows" else _columnar_to_docs
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            docs = to_docs(json.loads(body))
+            if coll is not None:
+                coll.insert_many(docs, ordered=False)
+            best = min(best, time.perf_counter() - t0)
+        print(f"{payload:<10} {len(body):>12,} {best:>9.4f} {cells / best:>12,.0f}")
+
+    if coll is not None:
+        coll.drop()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Row vs columnar ingest throughput.")
+    ap.add_argument("--cells", type=int, default=50000, help="rows per batch")
+    ap.add_argument("--repeat", type=int, default=5, help="runs per payload (best is reported)")
+    ap.add_argument("--mongo", action="store_true", help="also insert into a scratch collection")
+    args = ap.parse_args()
+
+    coll = None
+    if args.mongo:
+        from src.common.db import get_client
+        coll = get_client()["maveric_bench"]["cell_logs_bench"]
+    bench(args.cells, args.repeat, coll)
@@ -0,0 +1,108 @@
+"""
+Time to first tool call: a fresh stdio server per client (how mcp_fetch, summarize_once
+and the generator used to connect) vs connecting to one long-running streamable-HTTP server.
+
+Each of --runs clients connects (stdio: process spawn, imports, handshake; http: handshake
+only), makes its first call to --tool and then a second one. The HTTP server is started
+once; its own start-up is reported separately and its first client pays the Mongo set-up.
+Also reports the server's import time and whether the LLM stack (groq) was imported.
+
+    python -m src.clients.bench_startup --runs 5
+    python -m src.clients.bench_startup --runs 5 --tool summary_cache_stats   # no MongoDB needed
+"""
+import argparse, asyncio, json, os, socket, subprocess, sys, time
+from statistics import median
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from src.clients.connect import open_session, server_params
+
+def import_profile() -> Dict[str, Any]:
+    """Wall time of `import src.mcp_server.server` in a fresh interpreter, and what it pulled in."""
+    code = ("import sys, time; t = time.perf_counter(); import src.mcp_server.server; "
+            "print((time.perf_counter() - t) * 1000, 'groq' in sys.modules, 'numpy' in sys.modules)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+    return {"import_ms": round(float(out[0]), 1), "groq_loaded": out[1] == "True", "numpy_loaded": out[2] == "True"}
+
+async def client_run(url: str | None, tool: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    async with open_session(url, server_params(env=dict(os.environ))) as session:
+        t1 = time.perf_counter()
+        res = await session.call_tool(name=tool, arguments=args)
+        t2 = time.perf_counter()
+        await session.call_tool(name=tool, arguments=args)
+        t3 = time.perf_counter()
+    return {"connect_ms": (t1 - t0) * 1000, "first_call_ms": (t2 - t1) * 1000,
+            "time_to_first_call_ms": (t2 - t0) * 1000, "second_call_ms": (t3 - t2) * 1000, "error": res.isError}
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_http_server(port: int, timeout: float = 30) -> tuple:
+    """(process, seconds until the port accepts connections)."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "src.mcp_server.server", "--transport", "streamable-http",
+                             "--host", "127.0.0.1", "--port", str(port)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while time.perf_counter() - t0 < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc, time.perf_counter() - t0
+        except OSError:
+            time.sleep(0.02)
+    proc.terminate()
+    raise RuntimeError(f"server not listening on port {port} after {timeout:.0f}s")
+
+def _row(name: str, runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    keys = ("connect_ms", "first_call_ms", "time_to_first_call_ms", "second_call_ms")
+    out = {k: round(median(r[k] for r in runs), 1) for k in keys}
+    out["first_client_ms"] = round(runs[0]["time_to_first_call_ms"], 1)
+    out["errors"] = sum(r["error"] for r in runs)
+    print(f"  {name:<16} connect={out['connect_ms']:>8.1f}ms first call={out['first_call_ms']:>8.1f}ms "
+          f"time to first call={out['time_to_first_call_ms']:>8.1f}ms (1st client {out['first_client_ms']:.1f}ms) "
+          f"next call={out['second_call_ms']:>7.1f}ms")
+    return out
+
+async def main(runs: int, tool: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    prof = import_profile()
+    print(f"Server import: {prof['import_ms']:.0f}ms (groq loaded: {prof['groq_loaded']}, "
+          f"numpy loaded: {prof['numpy_loaded']})")
+    print(f"Medians over {runs} clients, tool {tool}:")
+    stdio = [await client_run(None, tool, args) for _ in range(runs)]
+    result = {"import": prof, "stdio": _row("stdio (spawn)", stdio)}
+
+    port = _free_port()
+    proc, ready = start_http_server(port)
+    try:
+        url = f"http://127.0.0.1:{port}/mcp"
+        http = [await client_run(url, tool, args) for _ in range(runs)]
+        result["http"] = {**_row("streamable-http", http), "server_ready_ms": round(ready * 1000, 1)}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    print(f"  (HTTP server listening after {ready * 1000:.0f}ms, paid once per server, not per client)")
+    if stdio[0]["error"] or http[0]["error"]:
+        print(f"⚠️ {tool} returned errors (is MongoDB running?); timings include the failure path")
+    speedup = result["stdio"]["time_to_first_call_ms"] / max(result["http"]["time_to_first_call_ms"], 1e-3)
+    print(f"✅ Time to first call: {speedup:.0f}x faster on the shared server")
+    return result
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Cold start (stdio spawn) vs warm shared server (streamable HTTP).")
+    ap.add_argument("--runs", type=int, default=5, help="clients per transport")
+    ap.add_argument("--tool", default="fetch_logs")
+    ap.add_argument("--args", default=None, help='tool arguments as JSON (fetch_logs: {"limit": 1})')
+    ap.add_argument("--json", default=None, help="write results to this file")
+    a = ap.parse_args()
+    tool_args = json.loads(a.args) if a.args else {"limit": 1} if a.tool == "fetch_logs" else {}
+    result = asyncio.run(main(a.runs, a.tool, tool_args))
+    if a.json:
+        with open(a.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Results saved to {a.json}")
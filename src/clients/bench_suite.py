@@ -0,0 +1,268 @@
+"""
+Reproducible offline benchmarks for the server tools.
+
+For each fleet size a deterministic dataset (seeded statuses, fixed time offsets
+from the start of the run) is written into a scratch database, then the tools are
+called in-process through FastMCP's call_tool (argument validation included, stdio
+transport excluded) with the stub LLM:
+
+  write_logs_columnar   the whole fleet per tick (this also seeds the dataset)
+  fetch_logs            one 100-row page, and one compact 1,000-row page, per window
+  summarize_recent      per window (summary cache off, so every call aggregates + "calls" the LLM)
+  summarize_logs        summarize_logs_and_tower_info() on the window's events
+  write_logs            1,000-row batches (runs last, so reads see only the seeded data)
+
+Each result has latency percentiles, throughput and the peak Python heap of one extra
+call traced with tracemalloc (timed calls run untraced). Results are written as JSON;
+--baseline compares the new run with an earlier file and exits 1 if any p50 latency or
+peak memory regressed by more than --threshold.
+
+    python -m src.clients.bench_suite --cells 10,1000,10000,100000 --out bench.json
+    python -m src.clients.bench_suite --cells 10,1000 --baseline bench.json --threshold 0.2
+    python -m src.clients.bench_suite --compare old.json new.json
+
+--backend memory runs against mongomock (pip install mongomock) instead of a local
+mongod; rollups and current_state are switched off there because mongomock's
+bulk_write does not support them. The default (auto) uses mongod when it answers.
+"""
+import argparse, asyncio, json, logging, os, platform, random, subprocess, sys, time, tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from src.common.metrics import LatencyHistogram
+
+CLUSTERS = 10
+ROW_BATCH = 1000
+COLUMNAR_BATCH = 50000
+
+def _configure(backend: str, db_name: str) -> str:
+    """Environment for the in-process server; must run before it is imported."""
+    os.environ.update(LLM_BACKEND="stub", STUB_LLM_LATENCY_MS="0", SUMMARY_CACHE_TTL="0",
+                      WRITE_BUFFER="0", MONGO_DB=db_name)
+    if backend == "auto":
+        from pymongo import MongoClient
+        from pymongo.errors import PyMongoError
+        try:
+            MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+                        serverSelectionTimeoutMS=1500).admin.command("ping")
+            backend = "mongo"
+        except PyMongoError:
+            backend = "memory"
+    if backend == "memory":
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("❌ --backend memory needs mongomock (pip install mongomock)")
+        os.environ.update(ASYNC_TOOLS="0", ROLLUPS="0", CURRENT_STATE="0", ANOMALY_DETECTORS="0")
+        import src.common.db as db
+        db._client = mongomock.MongoClient()
+    return backend
+
+def _reset_db() -> None:
+    import src.common.db as db
+    database = db.get_db()
+    for name in ("cell_logs", "cell_rollups", "cell_state"):
+        database.drop_collection(name)
+        db._prepared.discard(f"{database.name}.{name}")  # recreate indexes on next use
+
+class Dataset:
+    """Seeded statuses for `cells` cells at `ticks` evenly spaced times over the last `span_min` minutes."""
+
+    def __init__(self, cells: int, ticks: int, span_min: float, seed: int, start: datetime):
+        rng = random.Random(seed * 1_000_003 + cells)
+        self.cells = cells
+        self.cell_ids = list(range(1, cells + 1))
+        self.times = [start - timedelta(minutes=span_min * (ticks - 1 - t) / ticks) for t in range(ticks)]
+        # Mostly stable cells with ~5% flipping each tick
+        state = [rng.random() < 0.9 for _ in self.cell_ids]
+        self.statuses: List[List[str]] = []
+        for _ in range(ticks):
+            state = [(not s) if rng.random() < 0.05 else s for s in state]
+            self.statuses.append(["ON" if s else "OFF" for s in state])
+
+    def cluster(self, cell_id: int) -> str:
+        return f"cluster-{(cell_id - 1) % CLUSTERS}"
+
+    def logs_since(self, since: datetime) -> List[Dict[str, Any]]:
+        return [{"cell_id": cid, "status": s, "ts": ts, "cluster": self.cluster(cid)}
+                for ts, statuses in zip(self.times, self.statuses) if ts >= since
+                for cid, s in zip(self.cell_ids, statuses)]
+
+async def _measure(fn: Callable[[], Awaitable[Any]], repeat: int, events: int = 0) -> Dict[str, Any]:
+    """Time `repeat` calls, then trace one more for peak memory."""
+    hist = LatencyHistogram()
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        await fn()
+        hist.record(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - t_start
+    tracemalloc.start()
+    try:
+        await fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    s = hist.summary()
+    return {"calls": repeat, "p50_ms": s["p50"], "p90_ms": s["p90"], "p99_ms": s["p99"], "mean_ms": s["mean"],
+            "max_ms": s["max"], "calls_per_s": round(repeat / elapsed, 2) if elapsed else None,
+            "events_per_s": round(events * repeat / elapsed) if elapsed and events else None,
+            "peak_mem_kb": round(peak / 1024)}
+
+async def bench_fleet(cells: int, windows: List[int], ticks: int, repeat: int, seed: int) -> List[Dict[str, Any]]:
+    from src.mcp_server import server
+    from src.mcp_server.summarizers.groq_llm import summarize_logs_and_tower_info
+
+    _reset_db()
+    now = datetime.now(timezone.utc)
+    data = Dataset(cells, ticks, max(windows), seed, now)
+    results: List[Dict[str, Any]] = []
+
+    def add(tool: str, window: Optional[int], res: Dict[str, Any], **extra: Any) -> None:
+        results.append({"tool": tool, "cells": cells, "window_min": window, **extra, **res})
+        print(f"  {tool:<24} cells={cells:<7} window={str(window or '-'):<4} "
+              f"p50={res['p50_ms']:>9.2f}ms p99={res['p99_ms']:>9.2f}ms peak={res['peak_mem_kb']:>8,}KB")
+
+    # Seed through the columnar tool, one tick at a time (each tick is one measured call per chunk)
+    hist = LatencyHistogram()
+    t_start = time.perf_counter()
+    tracemalloc_peak = 0
+    # One call per cluster (the columnar payload has a single cluster), split at COLUMNAR_BATCH
+    chunks = [idx[lo:lo + COLUMNAR_BATCH] for c in range(CLUSTERS)
+              for idx in [list(range(c, cells, CLUSTERS))] for lo in range(0, len(idx), COLUMNAR_BATCH)]
+    for t, (ts, statuses) in enumerate(zip(data.times, data.statuses)):
+        for n, idx in enumerate(chunks):
+            ids = [data.cell_ids[i] for i in idx]
+            args = {"cell_ids": ids, "statuses": [statuses[i] for i in idx], "ts": ts.isoformat(),
+                    "run_id": t + 1, "cluster": data.cluster(ids[0])}
+            traced = t == 0 and n == 0
+            if traced:
+                tracemalloc.start()
+            t0 = time.perf_counter()
+            await server.mcp.call_tool("write_logs_columnar", args)
+            hist.record(time.perf_counter() - t0)
+            if traced:
+                tracemalloc_peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+    elapsed = time.perf_counter() - t_start
+    s = hist.summary()
+    add("write_logs_columnar", None, {
+        "calls": s["count"], "p50_ms": s["p50"], "p90_ms": s["p90"], "p99_ms": s["p99"], "mean_ms": s["mean"],
+        "max_ms": s["max"], "calls_per_s": round(s["count"] / elapsed, 2),
+        "events_per_s": round(cells * ticks / elapsed), "peak_mem_kb": round(tracemalloc_peak / 1024)})
+
+    for window in windows:
+        since = now - timedelta(minutes=window)
+        add("fetch_logs", window, await _measure(
+            lambda: server.mcp.call_tool("fetch_logs", {"limit": 100, "minutes": window}), repeat))
+        add("fetch_logs_compact", window, await _measure(
+            lambda: server.mcp.call_tool("fetch_logs", {"limit": 1000, "minutes": window, "compact": True,
+                                                        "fields": ["cell_id", "status", "ts"]}), repeat))
+        add("summarize_recent", window, await _measure(
+            lambda: server.mcp.call_tool("summarize_recent", {"minutes": window}), repeat))
+        logs = data.logs_since(since)
+
+        async def summarize_logs() -> None:
+            summarize_logs_and_tower_info(logs)
+        add("summarize_logs", window, await _measure(summarize_logs, repeat, len(logs)), events=len(logs))
+
+    rows = min(cells, ROW_BATCH)
+    batch = [{"cell_id": cid, "status": s, "run_id": ticks + 1, "ts": now.isoformat()}
+             for cid, s in zip(data.cell_ids[:rows], data.statuses[-1][:rows])]
+    add("write_logs", None, await _measure(lambda: server.mcp.call_tool("write_logs", {"batch": batch}),
+                                           repeat, rows), batch=rows)
+    return results
+
+def _meta(args: argparse.Namespace, backend: str) -> Dict[str, Any]:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        rev = None
+    return {"started": datetime.now(timezone.utc).isoformat(), "git": rev, "python": platform.python_version(),
+            "platform": platform.platform(), "backend": backend, "seed": args.seed, "ticks": args.ticks,
+            "repeat": args.repeat, "cells": args.cells, "windows": args.windows}
+
+def _key(r: Dict[str, Any]) -> Tuple[str, int, Optional[int]]:
+    return r["tool"], r["cells"], r["window_min"]
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> List[str]:
+    """Print p50/peak-memory changes for matching results; return the regressions."""
+    base = {_key(r): r for r in old["results"]}
+    if old["meta"].get("backend") != new["meta"].get("backend"):
+        print(f"⚠️ backends differ: {old['meta'].get('backend')} vs {new['meta'].get('backend')}")
+    regressions = []
+    print(f"\n{'tool':<24} {'cells':>7} {'win':>4} {'p50 ms':>19} {'peak KB':>21}")
+    for r in new["results"]:
+        b = base.get(_key(r))
+        if b is None:
+            continue
+        cols = []
+        for metric, floor in (("p50_ms", 0.5), ("peak_mem_kb", 64)):
+            before, after = b[metric], r[metric]
+            change = (after - before) / before if before else 0.0
+            # Tiny absolute differences are noise, however large in relative terms
+            bad = change > threshold and after - before > floor
+            cols.append(f"{before:>8g}→{after:<8g}{'❌' if bad else ''}")
+            if bad:
+                regressions.append(f"{r['tool']} cells={r['cells']} window={r['window_min']}: "
+                                   f"{metric} {before:g} -> {after:g} (+{change:.0%})")
+        print(f"{r['tool']:<24} {r['cells']:>7} {str(r['window_min'] or '-'):>4} {cols[0]:>19} {cols[1]:>21}")
+    return regressions
+
+def _report(regressions: List[str], threshold: float) -> int:
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) over {threshold:.0%}:")
+        for line in regressions:
+            print(f"  • {line}")
+        return 1
+    print(f"\n✅ No regressions over {threshold:.0%}")
+    return 0
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Offline benchmark suite for the MCP tools.")
+    ap.add_argument("--cells", default="10,1000,10000,100000", help="comma-separated fleet sizes")
+    ap.add_argument("--windows", default="5,60", help="comma-separated window sizes in minutes")
+    ap.add_argument("--ticks", type=int, default=6, help="events per cell, spread over the largest window")
+    ap.add_argument("--repeat", type=int, default=20, help="timed calls per tool and window")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--backend", choices=["auto", "mongo", "memory"], default="auto")
+    ap.add_argument("--db", default="maveric_bench", help="scratch database (dropped per fleet size)")
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--baseline", help="earlier results JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown / memory growth")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="only compare two result files")
+    args = ap.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f_old, open(args.compare[1]) as f_new:
+            return _report(compare(json.load(f_old), json.load(f_new), args.threshold), args.threshold)
+
+    backend = _configure(args.backend, args.db)
+    args.cells = [int(c) for c in args.cells.split(",")]
+    args.windows = [int(w) for w in args.windows.split(",")]
+    logging.getLogger("src").setLevel(logging.WARNING)  # per-call summarizer info lines
+    print(f"Backend: {backend}, database {args.db}, seed {args.seed}")
+
+    async def run_all() -> List[Dict[str, Any]]:
+        out = []
+        for cells in args.cells:
+            out += await bench_fleet(cells, args.windows, args.ticks, args.repeat, args.seed)
+        return out
+
+    results = {"meta": _meta(args, backend), "results": asyncio.run(run_all())}
+    _reset_db()
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results saved to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            return _report(compare(json.load(f), results, args.threshold), args.threshold)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Open an MCP client session: a fresh stdio server subprocess by default, or a
+long-running network server when a URL is given (--url / MCP_SERVER_URL).
+
+    python -m src.mcp_server.server --transport streamable-http --port 8000
+    MCP_SERVER_URL=http://127.0.0.1:8000/mcp python -m src.clients.mcp_fetch
+
+URLs ending in /sse use the SSE transport, anything else streamable HTTP.
+Connecting to a running server skips interpreter start-up, imports and Mongo
+setup, and every client shares its connection pools and summary cache.
+"""
+import os
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+def server_params(env: Optional[Dict[str, str]] = None) -> StdioServerParameters:
+    # Run the server as a module so imports resolve (src/ layout)
+    return StdioServerParameters(command="python", args=["-m", "src.mcp_server.server"], env=env)
+
+def server_url(url: Optional[str] = None) -> Optional[str]:
+    return url or os.getenv("MCP_SERVER_URL") or None
+
+@asynccontextmanager
+async def open_session(url: Optional[str] = None, server: Optional[StdioServerParameters] = None,
+                       **session_kwargs: Any) -> AsyncIterator[ClientSession]:
+    """Initialized ClientSession over HTTP/SSE when a URL is set, else over stdio (`server`)."""
+    url = server_url(url)
+    async with AsyncExitStack() as stack:
+        if url is None:
+            read, write = await stack.enter_async_context(stdio_client(server or server_params()))
+        elif url.rstrip("/").endswith("/sse"):
+            read, write = await stack.enter_async_context(sse_client(url))
+        else:
+            read, write, _ = await stack.enter_async_context(streamablehttp_client(url))
+        session = await stack.enter_async_context(ClientSession(read, write, **session_kwargs))
+        await session.initialize()
+        yield session
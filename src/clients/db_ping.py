@@ -1,11 +1,12 @@
 from src.common.db import ping, get_logs_collection
 from src.common.models import CellLog
+from src.common.schema import to_storage
 
 def main():
     print("Mongo ping:", "✅" if ping() else "❌")
     coll = get_logs_collection()
     doc = CellLog(cell_id=1, status="ON", run_id=1).model_dump(mode="python")
-    res = coll.insert_one(doc)
+    res = coll.insert_one(to_storage([doc])[0])
     print("Inserted _id:", res.inserted_id)
 
 if __name__ == "__main__":
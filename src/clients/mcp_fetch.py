@@ -2,31 +2,27 @@ import asyncio
 from dotenv import load_dotenv
 load_dotenv()
 
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from src.clients.connect import open_session
 
 async def main():
-    # Run the server as a module so imports resolve (src/ layout)
-    server = StdioServerParameters(command="python", args=["-m", "src.mcp_server.server"])
+    # Spawns the server over stdio, or uses the running one at MCP_SERVER_URL
+    async with open_session() as session:
+        res = await session.call_tool(name="fetch_logs", arguments={"limit": 5, "minutes": 10})
 
-    async with stdio_client(server) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
-            res = await session.call_tool(name="fetch_logs", arguments={"limit": 5, "minutes": 10})
-
-            # Handle MCP response structure
-            try:
-                if hasattr(res, 'structuredContent') and res.structuredContent:
-                    result = res.structuredContent.get('result', [])
-                    print(f"Found {len(result)} recent logs:")
-                    for log in result:
-                        print(f"  Cell {log['cell_id']}: {log['status']} at {log['ts']}")
-                else:
-                    print("No structured result found")
-                    print(res)
-            except Exception as e:
-                print(f"Error parsing response: {e}")
+        # Handle MCP response structure
+        try:
+            if hasattr(res, 'structuredContent') and res.structuredContent:
+                result = res.structuredContent.get('result', {})
+                logs = result.get('logs', [])
+                print(f"Found {len(logs)} recent logs" + (" (more available)" if result.get('next_token') else "") + ":")
+                for log in logs:
+                    print(f"  Cell {log['cell_id']}: {log['status']} at {log['ts']}")
+            else:
+                print("No structured result found")
                 print(res)
+        except Exception as e:
+            print(f"Error parsing response: {e}")
+            print(res)
 
 if __name__ == "__main__":
     asyncio.run(main())
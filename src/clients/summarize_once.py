@@ -1,9 +1,9 @@
 import asyncio, os
 from dotenv import load_dotenv
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
 import json 
 
+from src.clients.connect import open_session
+
 # Load environment variables
 load_dotenv()
 
@@ -37,33 +37,30 @@ def save_summary_to_json(summary: str, stats: str, filename: str = "summary_repo
 
 
 async def main(minutes: int = 10):
-    server = StdioServerParameters(command="python", args=["-m", "src.mcp_server.server"])
-
-    async with stdio_client(server) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
-            res = await session.call_tool(name="summarize_recent", arguments={"minutes": minutes})
+    # Spawns the server over stdio, or uses the running one at MCP_SERVER_URL
+    async with open_session() as session:
+        res = await session.call_tool(name="summarize_recent", arguments={"minutes": minutes})
 
-            # Handle new MCP response structure
-            try:
-                if hasattr(res, 'structuredContent') and res.structuredContent:
-                    result = res.structuredContent.get('result', {})
-                    stats = result.get("stats", "No stats available")
-                    summary = result.get("summary", "No summary available")
-                else:
-                    # Fallback
-                    stats = str(res)
-                    summary = ""
-            except Exception as e:
-                stats = f"Error parsing response: {e}"
+        # Handle new MCP response structure
+        try:
+            if hasattr(res, 'structuredContent') and res.structuredContent:
+                result = res.structuredContent.get('result', {})
+                stats = result.get("stats", "No stats available")
+                summary = result.get("summary", "No summary available")
+            else:
+                # Fallback
+                stats = str(res)
                 summary = ""
+        except Exception as e:
+            stats = f"Error parsing response: {e}"
+            summary = ""
 
-            print("\n=== STATS ===\n", stats)
-            print("\n=== SUMMARY ===\n", summary)
+        print("\n=== STATS ===\n", stats)
+        print("\n=== SUMMARY ===\n", summary)
 
-            # Save the output to text and JSON files
-            save_summary_to_file(summary, stats, filename="summarized_report.txt")
-            save_summary_to_json(summary, stats, filename="summarized_report.json")
+        # Save the output to text and JSON files
+        save_summary_to_file(summary, stats, filename="summarized_report.txt")
+        save_summary_to_json(summary, stats, filename="summarized_report.json")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,42 @@
+import argparse, asyncio
+from dotenv import load_dotenv
+load_dotenv()
+
+from src.clients.connect import open_session
+
+async def main(cell_ids, cluster, transitions_only: bool, duration: float, url: str | None = None):
+    """Print events pushed by subscribe_events instead of polling fetch_logs."""
+    async def on_message(params):
+        if params.logger != "cell_events":
+            return
+        data = params.data
+        for ev in data["events"]:
+            print(f"  Cell {ev['cell_id']}: {ev['status']} at {ev['ts']}")
+        if data.get("dropped"):
+            print(f"  ({data['dropped']} events dropped: client too slow)")
+
+    resume_token = None
+    async with open_session(url, logging_callback=on_message) as session:
+        # Each call streams for `duration` seconds; loop with the resume token to keep watching
+        while True:
+            res = await session.call_tool(name="subscribe_events", arguments={
+                "cell_ids": cell_ids, "cluster": cluster, "transitions_only": transitions_only,
+                "resume_token": resume_token, "duration_seconds": duration,
+            })
+            result = (res.structuredContent or {}).get("result", {})
+            resume_token = result.get("resume_token")
+            print(f"[{result.get('source')}] delivered {result.get('delivered', 0)} events")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Watch cell events pushed by the MCP server.")
+    ap.add_argument("--cells", type=int, nargs="*", default=None, help="only these cell ids")
+    ap.add_argument("--cluster", default=None, help="only this cluster")
+    ap.add_argument("--transitions", action="store_true", help="only status changes")
+    ap.add_argument("--duration", type=float, default=60, help="seconds per subscription call")
+    ap.add_argument("--url", default=None, help="running server (default MCP_SERVER_URL, else spawn over stdio)")
+    args = ap.parse_args()
+
+    try:
+        asyncio.run(main(args.cells, args.cluster, args.transitions, args.duration, args.url))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,49 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, List
+
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.collection import Collection
+
+from src.common.schema import log_field
+
+def per_cell_pipeline(since: datetime) -> List[Dict[str, Any]]:
+    """
+    Aggregation that reduces a time window to one row per cell:
+    ON/OFF counts, last status/ts and cluster. Runs entirely in MongoDB.
+    """
+    cell, cluster = "$" + log_field("cell_id"), "$" + log_field("cluster")
+    is_on = {"$eq": ["$status", "ON"]}
+    return [
+        {"$match": {"ts": {"$gte": since}}},
+        {"$sort": {"ts": 1}},  # makes $last the most recent event (uses the ts index)
+        {"$group": {
+            "_id": cell,
+            "on": {"$sum": {"$cond": [is_on, 1, 0]}},
+            "off": {"$sum": {"$cond": [is_on, 0, 1]}},
+            "last_status": {"$last": "$status"},
+            "last_ts": {"$last": "$ts"},
+            "cluster": {"$last": cluster},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+
+def window_per_cell(coll: Collection, since: datetime) -> Dict[int, Dict[str, Any]]:
+    """{cell_id: {"on", "off", "last_status", "last_ts", "cluster"}} for events since `since`."""
+    out: Dict[int, Dict[str, Any]] = {}
+    for row in coll.aggregate(per_cell_pipeline(since), allowDiskUse=True):
+        out[int(row.pop("_id"))] = row
+    return out
+
+async def awindow_per_cell(coll: AsyncCollection, since: datetime) -> Dict[int, Dict[str, Any]]:
+    """window_per_cell() on the async driver."""
+    out: Dict[int, Dict[str, Any]] = {}
+    async for row in await coll.aggregate(per_cell_pipeline(since), allowDiskUse=True):
+        out[int(row.pop("_id"))] = row
+    return out
+
+def window_totals(per_cell: Dict[int, Dict[str, Any]]) -> Dict[str, int]:
+    """Window-wide event totals from the per-cell aggregate (O(cells))."""
+    on = sum(c["on"] for c in per_cell.values())
+    off = sum(c["off"] for c in per_cell.values())
+    return {"total": on + off, "on": on, "off": off}
@@ -0,0 +1,129 @@
+"""
+Live current-state store: one document per cell in cell_state.
+
+    {_id: cell_id, status, ts, changed_at, cluster, run_id, updated_at}
+
+write_logs upserts it in bulk. The "changed_at" bookkeeping runs server-side in
+an update pipeline, so several writers (and out-of-order batches) can't move a
+cell backwards. StatusCache mirrors the collection in process memory and is
+refreshed incrementally from `updated_at`.
+"""
+from __future__ import annotations
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.collection import Collection
+
+def ensure_state_indexes(coll: Collection) -> None:
+    coll.create_index([("updated_at", ASCENDING)], name="updated_at_1")
+    coll.create_index([("status", ASCENDING), ("cluster", ASCENDING)], name="status_1_cluster_1")
+
+def _utc(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+def latest_per_cell(docs: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """Newest event per cell in a batch of flat CellLog dicts."""
+    latest: Dict[int, Dict[str, Any]] = {}
+    for d in docs:
+        cid = int(d["cell_id"])
+        cur = latest.get(cid)
+        if cur is None or _utc(d["ts"]) >= _utc(cur["ts"]):
+            latest[cid] = d
+    return latest
+
+def state_updates(docs: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[UpdateOne]:
+    """One upsert per cell; only applied if the event is not older than what is stored."""
+    now = now or datetime.now(timezone.utc)
+    ops = []
+    for cid, d in latest_per_cell(docs).items():
+        ts, status = _utc(d["ts"]), d["status"]
+        # null/missing ts (new doc) sorts before any date, so new cells always take the event
+        newer = {"$lte": [{"$ifNull": ["$ts", None]}, ts]}
+
+        def pick(value: Any, field: str) -> Dict[str, Any]:
+            return {"$cond": [newer, value, "$" + field]}
+
+        changed = {"$cond": [{"$eq": ["$status", status]}, "$changed_at", ts]}
+        ops.append(UpdateOne({"_id": cid}, [{"$set": {
+            "changed_at": pick(changed, "changed_at"),
+            "status": pick(status, "status"),
+            "ts": pick(ts, "ts"),
+            "cluster": pick(d.get("cluster"), "cluster"),
+            "run_id": pick(d.get("run_id"), "run_id"),
+            "updated_at": now,
+        }}], upsert=True))
+    return ops
+
+class StatusCache:
+    """
+    In-process mirror of cell_state. Writes from this process are applied directly;
+    rows written by other processes are picked up by refresh() at most every
+    `max_age` seconds, reading only documents updated since the last refresh.
+    """
+
+    def __init__(self, max_age: float = 5.0):
+        self.max_age = max_age
+        self.cells: Dict[int, Dict[str, Any]] = {}
+        self.by_status: Dict[str, Set[int]] = {"ON": set(), "OFF": set()}
+        self._loaded_at: Optional[datetime] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _put(self, cid: int, row: Dict[str, Any]) -> None:
+        old = self.cells.get(cid)
+        if old is not None:
+            if _utc(old["ts"]) > _utc(row["ts"]):
+                return
+            self.by_status[old["status"]].discard(cid)
+        self.cells[cid] = row
+        self.by_status[row["status"]].add(cid)
+
+    def refresh(self, coll: Collection, force: bool = False) -> None:
+        if not force and self._loaded_at is not None and time.monotonic() - self._checked < self.max_age:
+            return
+        started = datetime.now(timezone.utc)
+        with self._lock:
+            # Small overlap so a write racing the previous refresh isn't missed
+            flt = {} if self._loaded_at is None else {"updated_at": {"$gte": self._loaded_at - timedelta(seconds=1)}}
+            for row in coll.find(flt):
+                cid = int(row.pop("_id"))
+                row.pop("updated_at", None)
+                row["ts"] = _utc(row["ts"])
+                row["changed_at"] = _utc(row["changed_at"]) if row.get("changed_at") else row["ts"]
+                self._put(cid, row)
+            self._loaded_at = started
+            self._checked = time.monotonic()
+
+    def apply(self, docs: List[Dict[str, Any]]) -> None:
+        """Mirror a batch this process just wrote (same rules as state_updates)."""
+        with self._lock:
+            for cid, d in latest_per_cell(docs).items():
+                ts = _utc(d["ts"])
+                old = self.cells.get(cid)
+                if old is not None and old["ts"] > ts:
+                    continue
+                changed = old["changed_at"] if old is not None and old["status"] == d["status"] else ts
+                self._put(cid, {"status": d["status"], "ts": ts, "changed_at": changed,
+                                "cluster": d.get("cluster"), "run_id": d.get("run_id")})
+
+    def query(self, status: Optional[str] = None, cluster: Optional[str] = None,
+              stale_after: Optional[float] = None) -> Dict[str, Any]:
+        """Counts plus the matching cells; `stale` marks cells silent for over stale_after seconds."""
+        if status is not None and status not in ("ON", "OFF"):
+            raise ValueError(f"status must be ON or OFF, got {status!r}")
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            ids = self.by_status[status] if status is not None else self.cells.keys()
+            out = []
+            for cid in sorted(ids):
+                row = self.cells[cid]
+                if cluster is not None and row.get("cluster") != cluster:
+                    continue
+                age = (now - row["ts"]).total_seconds()
+                out.append({"cell_id": cid, **row,
+                            "stale": stale_after is not None and age > stale_after})
+            counts = {s: len(c) for s, c in self.by_status.items()}
+        return {"as_of": now, "counts": counts, "total": sum(counts.values()), "matched": len(out), "cells": out}
@@ -1,42 +1,115 @@
 from __future__ import annotations
 import os
-from typing import Optional
-from pymongo import MongoClient, ASCENDING
+import threading
+from typing import Any, Callable, Dict, Optional, Set
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
 from pymongo.collection import Collection
+from pymongo.database import Database
 
-# Module-level singleton client for reuse
+from src.common import metrics
+
+# Module-level singleton clients for reuse (the async one serves the async MCP tools)
 _client: Optional[MongoClient] = None
+_async_client: Optional[AsyncMongoClient] = None
+
+# Collections already prepared (storage mode + indexes) by this process
+_prepared: Set[str] = set()
+_prepare_lock = threading.Lock()
 
 def _mongo_uri() -> str:
     return os.getenv("MONGO_URI", "mongodb://localhost:27017")
 
+def _pool_options() -> Dict[str, Any]:
+    """Connection pool settings shared by the sync and async clients."""
+    opts: Dict[str, Any] = {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_MS", "300000")),
+        "maxConnecting": int(os.getenv("MONGO_MAX_CONNECTING", "4")),
+    }
+    # Client-side operation timeout (covers pool wait, server selection and the command)
+    if os.getenv("MONGO_TIMEOUT_MS"):
+        opts["timeoutMS"] = int(os.getenv("MONGO_TIMEOUT_MS"))
+    # Per-command timings for server_metrics (no listener when METRICS=0)
+    opts["event_listeners"] = metrics.command_listeners()
+    return opts
+
 def get_client() -> MongoClient:
     global _client
     if _client is None:
-        _client = MongoClient(_mongo_uri())
+        _client = MongoClient(_mongo_uri(), **_pool_options())
     return _client
 
-def get_logs_collection() -> Collection:
-    client = get_client()
-    dbname = os.getenv("MONGO_DB", "maveric")
-    db = client[dbname]
+def get_async_client() -> AsyncMongoClient:
+    # Created lazily inside the running event loop (the server's loop owns its connections)
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncMongoClient(_mongo_uri(), **_pool_options())
+    return _async_client
+
+def get_db() -> Database:
+    return get_client()[os.getenv("MONGO_DB", "maveric")]
+
+def get_async_db() -> AsyncDatabase:
+    return get_async_client()[os.getenv("MONGO_DB", "maveric")]
+
+def _auto_index() -> bool:
+    # MONGO_AUTO_INDEX=0 leaves index creation to `python -m src.common.schema migrate`
+    return os.getenv("MONGO_AUTO_INDEX", "1").strip().lower() not in ("0", "false", "no", "off")
+
+def _prepare_once(coll: Collection, prepare: Callable[[], None]) -> None:
+    if coll.full_name in _prepared:
+        return
+    with _prepare_lock:
+        if coll.full_name not in _prepared:
+            with metrics.timer("mongo_prepare_seconds", collection=coll.name):
+                prepare()
+            _prepared.add(coll.full_name)
+
+def get_logs_collection(ensure_indexes: bool = True) -> Collection:
+    db = get_db()
     coll = db["cell_logs"]
 
-    # Index for time-based queries
-    coll.create_index([("ts", ASCENDING)], background=True)
+    # Storage mode (LOG_STORAGE), indexes and TTL are set up once per process, not per call
+    if ensure_indexes:
+        from src.common.schema import prepare_collection
+        _prepare_once(coll, lambda: prepare_collection(db, coll.name, indexes=_auto_index()))
+
+    return coll
+
+def logs_prepared() -> bool:
+    return get_db()["cell_logs"].full_name in _prepared
 
-    # Optional TTL index if LOG_TTL_DAYS is set
-    ttl_days = (os.getenv("LOG_TTL_DAYS") or "").strip()
-    if ttl_days:
-        try:
-            seconds = int(float(ttl_days) * 24 * 3600)
-            # Single-field TTL index required by Mongo
-            coll.create_index("ts", expireAfterSeconds=seconds, name="ts_ttl", background=True)
-        except Exception:
-            pass  # ignore misconfig; you can fix the env later
+def get_async_logs_collection() -> AsyncCollection:
+    """
+    Async handle on cell_logs. Storage mode and indexes are still set up once through
+    get_logs_collection(); async callers should run that off the loop first (see
+    logs_prepared()).
+    """
+    return get_async_db()["cell_logs"]
 
+def get_rollups_collection() -> Collection:
+    """Per-cell minute/hour aggregates maintained by write_logs (see src.common.rollups)."""
+    coll = get_db()["cell_rollups"]
+    if _auto_index():
+        from src.common.rollups import ensure_rollup_indexes
+        _prepare_once(coll, lambda: ensure_rollup_indexes(coll))
     return coll
 
+def get_state_collection() -> Collection:
+    """Latest status per cell, upserted by write_logs (see src.common.current_state)."""
+    coll = get_db()["cell_state"]
+    if _auto_index():
+        from src.common.current_state import ensure_state_indexes
+        _prepare_once(coll, lambda: ensure_state_indexes(coll))
+    return coll
+
+def get_detectors_collection() -> Collection:
+    """Checkpoints of the online anomaly detectors, one document per cell (see src.common.detectors)."""
+    return get_db()["cell_detectors"]
+
 def ping() -> bool:
     try:
         get_client().admin.command("ping")
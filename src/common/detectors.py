@@ -0,0 +1,204 @@
+"""
+Online per-cell anomaly detectors, updated by write_logs in O(1) per event.
+
+Per cell the state is a handful of numbers:
+  rate          EWMA of status flips per hour (time-decayed, half-life ANOMALY_FLIP_HALF_LIFE_MINUTES)
+  outage_start  when the current OFF run began (None while ON)
+  off_streak    consecutive OFF events
+
+and a cell is flagged when
+  High Instability   rate >= ANOMALY_FLIP_RATE flips/hour
+  Ongoing Outage     OFF for >= ANOMALY_OUTAGE_MINUTES (HIGH from ANOMALY_OUTAGE_HIGH_MINUTES)
+  OFF Streak         >= ANOMALY_OFF_STREAK OFF events in a row
+
+Flags are answered from memory: only cells that are OFF or were flapping at their
+last event are candidates, so the `anomalies` tool doesn't touch the logs. The state
+is checkpointed to cell_detectors (one document per changed cell) at most every
+ANOMALY_CHECKPOINT_SECONDS and on shutdown, and reloaded on start. Out-of-order
+events (older than the cell's last one) are ignored. Defaults follow the notebook
+rules in src.analytics.anomalies (30/60 minute downtime, more than 10 flips).
+"""
+from __future__ import annotations
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from pymongo import ReplaceOne
+from pymongo.collection import Collection
+
+def detectors_enabled() -> bool:
+    return os.getenv("ANOMALY_DETECTORS", "1").strip().lower() not in ("0", "false", "no", "off")
+
+def thresholds_from_env() -> Dict[str, float]:
+    return {
+        "flip_rate": float(os.getenv("ANOMALY_FLIP_RATE", "10")),
+        "half_life_minutes": float(os.getenv("ANOMALY_FLIP_HALF_LIFE_MINUTES", "60")),
+        "outage_minutes": float(os.getenv("ANOMALY_OUTAGE_MINUTES", "30")),
+        "outage_high_minutes": float(os.getenv("ANOMALY_OUTAGE_HIGH_MINUTES", "60")),
+        "off_streak": int(os.getenv("ANOMALY_OFF_STREAK", "5")),
+    }
+
+def _utc(ts: datetime) -> datetime:
+    # PyMongo returns naive datetimes that are already UTC
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+class CellDetector:
+    """Constant-size detector state for one cell; times are epoch seconds."""
+    __slots__ = ("status", "ts", "rate", "outage_start", "off_streak", "flips", "cluster")
+
+    def __init__(self, status: str, ts: float, cluster: Optional[str] = None):
+        self.status = status
+        self.ts = ts
+        self.rate = 0.0           # flips/hour as of self.ts
+        self.outage_start: Optional[float] = ts if status == "OFF" else None
+        self.off_streak = 1 if status == "OFF" else 0
+        self.flips = 0
+        self.cluster = cluster
+
+    def add(self, status: str, ts: float, decay: float) -> None:
+        # decay = ln2 / half-life (per second): the old rate fades, each flip adds one half-life's worth
+        self.rate *= math.exp(-decay * (ts - self.ts))
+        if status != self.status:
+            self.rate += decay * 3600
+            self.flips += 1
+            self.outage_start = ts if status == "OFF" else None
+            self.status = status
+        self.off_streak = self.off_streak + 1 if status == "OFF" else 0
+        self.ts = ts
+
+    def rate_at(self, now: float, decay: float) -> float:
+        return self.rate * math.exp(-decay * max(0.0, now - self.ts))
+
+    def to_doc(self, cid: int) -> Dict[str, Any]:
+        return {"_id": cid, "status": self.status, "ts": self.ts, "rate": self.rate,
+                "outage_start": self.outage_start, "off_streak": self.off_streak,
+                "flips": self.flips, "cluster": self.cluster}
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "CellDetector":
+        d = cls(doc["status"], doc["ts"], doc.get("cluster"))
+        d.rate, d.outage_start = doc.get("rate", 0.0), doc.get("outage_start")
+        d.off_streak, d.flips = doc.get("off_streak", 0), doc.get("flips", 0)
+        return d
+
+class AnomalyDetectors:
+    """All cells' detectors, the candidate sets behind flagged(), and checkpointing."""
+
+    def __init__(self, coll: Optional[Collection] = None, checkpoint_seconds: Optional[float] = None,
+                 **thresholds: float):
+        self.coll = coll
+        self.thresholds = {**thresholds_from_env(), **thresholds}
+        self.decay = math.log(2) / (self.thresholds["half_life_minutes"] * 60)
+        self.checkpoint_seconds = (float(os.getenv("ANOMALY_CHECKPOINT_SECONDS", "30"))
+                                   if checkpoint_seconds is None else checkpoint_seconds)
+        self.cells: Dict[int, CellDetector] = {}
+        self.off: Set[int] = set()        # currently OFF
+        self.flapping: Set[int] = set()   # rate over the limit at their last event (it only decays after)
+        self._dirty: Set[int] = set()
+        self._saved = time.monotonic()
+        self._loaded = coll is None
+        self._lock = threading.Lock()
+
+    def _index(self, cid: int, d: CellDetector) -> None:
+        (self.off.add if d.status == "OFF" else self.off.discard)(cid)
+        (self.flapping.add if d.rate >= self.thresholds["flip_rate"] else self.flapping.discard)(cid)
+
+    def load(self) -> int:
+        """Restore the last checkpoint (once). Returns the number of cells loaded."""
+        with self._lock:
+            if self._loaded:
+                return 0
+            for doc in self.coll.find({}):
+                cid = int(doc["_id"])
+                self.cells[cid] = d = CellDetector.from_doc(doc)
+                self._index(cid, d)
+            self._loaded = True
+            return len(self.cells)
+
+    def update(self, docs: List[Dict[str, Any]]) -> None:
+        """Feed a batch of flat CellLog dicts."""
+        self.load()
+        with self._lock:
+            for doc in sorted(docs, key=lambda d: _utc(d["ts"])):
+                cid, status, ts = int(doc["cell_id"]), doc["status"], _utc(doc["ts"]).timestamp()
+                d = self.cells.get(cid)
+                if d is None:
+                    self.cells[cid] = d = CellDetector(status, ts, doc.get("cluster"))
+                elif ts < d.ts:
+                    continue
+                else:
+                    d.add(status, ts, self.decay)
+                    if doc.get("cluster") is not None:
+                        d.cluster = doc["cluster"]
+                self._index(cid, d)
+                self._dirty.add(cid)
+
+    def checkpoint(self, force: bool = False) -> int:
+        """Save changed cells if the interval has passed (or force). Returns the number saved."""
+        if self.coll is None or (not force and time.monotonic() - self._saved < self.checkpoint_seconds):
+            return 0
+        with self._lock:
+            ids = list(self._dirty)
+            ops = [ReplaceOne({"_id": cid}, self.cells[cid].to_doc(cid), upsert=True) for cid in ids]
+            self._dirty.clear()
+            self._saved = time.monotonic()
+        if ops:
+            try:
+                self.coll.bulk_write(ops, ordered=False)
+            except Exception:
+                with self._lock:
+                    self._dirty.update(ids)  # retry with the next checkpoint
+                raise
+        return len(ops)
+
+    def flagged(self, now: Optional[datetime] = None, cell_ids: Optional[List[int]] = None,
+                cluster: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Current anomalies as (cell_id, type, severity, value, description) dicts, by cell."""
+        self.load()
+        t = (now or datetime.now(timezone.utc)).timestamp()
+        th = self.thresholds
+        wanted = set(cell_ids) if cell_ids else None
+        out: List[Dict[str, Any]] = []
+        with self._lock:
+            for cid in sorted(self.off | self.flapping):
+                d = self.cells[cid]
+                if (wanted is not None and cid not in wanted) or (cluster is not None and d.cluster != cluster):
+                    continue
+                rate = d.rate_at(t, self.decay)
+                if rate < th["flip_rate"]:
+                    self.flapping.discard(cid)  # decayed below the limit; re-checked at its next event
+                else:
+                    out.append({"cell_id": cid, "type": "High Instability", "severity": "MEDIUM",
+                                "value": f"{rate:.1f} flips/h",
+                                "description": f"Cell {cid} is flipping {rate:.1f} times per hour (potential instability)"})
+                if d.outage_start is not None:
+                    minutes = (t - d.outage_start) / 60
+                    if minutes >= th["outage_minutes"]:
+                        out.append({"cell_id": cid, "type": "Ongoing Outage",
+                                    "severity": "HIGH" if minutes >= th["outage_high_minutes"] else "MEDIUM",
+                                    "value": f"{minutes:.1f} minutes",
+                                    "description": f"Cell {cid} has been offline for {minutes:.1f} minutes"})
+                if d.off_streak >= th["off_streak"]:
+                    out.append({"cell_id": cid, "type": "OFF Streak", "severity": "MEDIUM",
+                                "value": f"{d.off_streak} events",
+                                "description": f"Cell {cid} reported OFF {d.off_streak} times in a row"})
+        return out
+
+    def instability(self, cell_ids: Iterable[int], now: Optional[datetime] = None) -> Dict[int, bool]:
+        """
+        Whether each of cell_ids is over the flip-rate limit now. Cells the detectors
+        have never seen (not ingested here, not in the checkpoint) are left out.
+        """
+        self.load()
+        t = (now or datetime.now(timezone.utc)).timestamp()
+        with self._lock:
+            return {cid: cid in self.flapping and self.cells[cid].rate_at(t, self.decay) >= self.thresholds["flip_rate"]
+                    for cid in cell_ids if cid in self.cells}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"cells": len(self.cells), "off": len(self.off), "flapping": len(self.flapping),
+                    "unsaved": len(self._dirty)}
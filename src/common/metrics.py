@@ -0,0 +1,355 @@
+"""
+In-process metrics for the MCP server: latency histograms, counters and
+per-second rates, kept in one registry and exposed through the server_metrics
+tool or as Prometheus text (METRICS_PROM_FILE / METRICS_PORT).
+
+Recording is O(1): a perf_counter pair, one log-linear bucket increment and a
+dict lookup under a lock, a few microseconds against tool calls that take
+milliseconds. METRICS=0 turns every call into a no-op and leaves the PyMongo
+command listener unregistered.
+
+Names (seconds unless noted):
+  mcp_tool_call_seconds{tool}     whole call incl. FastMCP argument validation
+  mcp_tool_handler_seconds{tool}  the tool function only
+  validation_seconds{tool}        CellLog / CellLogBatch model validation
+  ingest_stage_seconds{stage}     insert / rollups / current_state
+  events_ingested                 counter + events/s over the last minute
+  mongo_command_seconds{command}  every command, from the command listener
+  mongo_docs_returned{command}    documents in cursor replies
+  mongo_prepare_seconds{collection}  one-time storage/index setup
+  llm_call_seconds{backend}, llm_tokens{backend}
+"""
+from __future__ import annotations
+import functools
+import inspect
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+Labels = Tuple[Tuple[str, Any], ...]
+
+class LatencyHistogram:
+    """
+    HdrHistogram-style log-linear buckets over integer microseconds: values below
+    2**sub_bits are exact, larger ones keep sub_bits significant bits (~0.8% error).
+    """
+
+    def __init__(self, sub_bits: int = 8):
+        self.sub_bits = sub_bits
+        self.counts: Dict[Tuple[int, int], int] = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, seconds: float) -> None:
+        us = int(seconds * 1e6) if seconds > 0 else 0
+        shift = us.bit_length() - self.sub_bits
+        key = (shift, us >> shift) if shift > 0 else (0, us)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.count += 1
+        self.total += us
+        if us > self.max:
+            self.max = us
+
+    def percentile(self, p: float) -> float:
+        """Value at percentile p in ms (upper edge of its bucket, capped at the max seen)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for (shift, m) in sorted(self.counts):
+            seen += self.counts[(shift, m)]
+            if seen >= rank:
+                return min(((m + 1) << shift) - 1, self.max) / 1000
+        return self.max / 1000
+
+    def summary(self) -> Dict[str, Any]:
+        out = {f"p{p:g}": round(self.percentile(p), 3) for p in (50, 90, 95, 99, 99.9)}
+        out.update(count=self.count, max=round(self.max / 1000, 3),
+                   mean=round(self.total / self.count / 1000, 3) if self.count else 0.0)
+        return out
+
+class RateMeter:
+    """Events per second over a sliding window of one-second slots."""
+
+    def __init__(self, window: int = 60):
+        self.window = window
+        self.slots = [0.0] * window
+        self.stamps = [0] * window
+
+    def add(self, n: float, now: Optional[float] = None) -> None:
+        sec = int(now if now is not None else time.time())
+        i = sec % self.window
+        if self.stamps[i] != sec:
+            self.stamps[i], self.slots[i] = sec, 0.0
+        self.slots[i] += n
+
+    def rate(self, now: Optional[float] = None) -> float:
+        sec = int(now if now is not None else time.time())
+        total = sum(v for v, s in zip(self.slots, self.stamps) if sec - self.window < s <= sec)
+        return total / self.window
+
+class _Timer:
+    __slots__ = ("registry", "name", "labels", "t0")
+
+    def __init__(self, registry: "Metrics", name: str, labels: Labels):
+        self.registry, self.name, self.labels = registry, name, labels
+
+    def __enter__(self) -> "_Timer":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.registry._observe(self.name, self.labels, time.perf_counter() - self.t0)
+        if exc_type is not None:
+            self.registry._inc(_errors_name(self.name), self.labels, 1)
+
+class _NullTimer:
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+_NULL_TIMER = _NullTimer()
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    if len(labels) == 1:  # the common case, without sorting
+        return tuple(labels.items())
+    return tuple(sorted(labels.items()))
+
+def _order(item: Tuple[Tuple[str, Labels], Any]) -> Tuple[str, str]:
+    name, labels = item[0]
+    return name, repr(labels)
+
+def _errors_name(name: str) -> str:
+    return (name[:-len("_seconds")] if name.endswith("_seconds") else name) + "_errors"
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.histograms: Dict[Tuple[str, Labels], LatencyHistogram] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.meters: Dict[str, RateMeter] = {}
+
+    def _observe(self, name: str, labels: Labels, seconds: float) -> None:
+        key = (name, labels)
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = LatencyHistogram()
+            hist.record(seconds)
+
+    def _inc(self, name: str, labels: Labels, value: float) -> None:
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        self._observe(name, _labels(labels), seconds)
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        self._inc(name, _labels(labels), value)
+
+    def mark(self, name: str, n: float = 1) -> None:
+        """Counter plus a per-second rate over the last minute."""
+        with self._lock:
+            self.counters[(name, ())] = self.counters.get((name, ()), 0) + n
+            meter = self.meters.get(name)
+            if meter is None:
+                meter = self.meters[name] = RateMeter()
+            meter.add(n)
+
+    def timer(self, name: str, **labels: Any) -> _Timer:
+        return _Timer(self, name, _labels(labels))
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.meters.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly view: {histograms: {name: [{labels, p50, ...}]}, counters, rates}."""
+        with self._lock:
+            hists = [(k, h.summary()) for k, h in self.histograms.items()]
+            counters = list(self.counters.items())
+            rates = {name: round(m.rate(), 2) for name, m in self.meters.items()}
+        out: Dict[str, Any] = {"uptime_seconds": round(time.time() - self.started, 1),
+                               "histograms_ms": {}, "counters": {}, "per_second_1m": rates}
+        for (name, labels), summary in sorted(hists, key=_order):
+            out["histograms_ms"].setdefault(name, []).append({**dict(labels), **summary})
+        for (name, labels), value in sorted(counters, key=_order):
+            out["counters"].setdefault(name, []).append({**dict(labels), "value": value})
+        return out
+
+    def prometheus(self, prefix: str = "maveric_") -> str:
+        """Prometheus text exposition: histograms as summaries (seconds), counters as *_total."""
+        with self._lock:
+            hists = sorted(self.histograms.items(), key=_order)
+            counters = sorted(self.counters.items(), key=_order)
+            rates = sorted((name, m.rate()) for name, m in self.meters.items())
+        lines: List[str] = []
+        typed = set()
+
+        def head(metric: str, kind: str) -> None:
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+
+        for (name, labels), h in hists:
+            metric = prefix + name
+            head(metric, "summary")
+            for q in (0.5, 0.9, 0.99):
+                lines.append(f"{metric}{_prom_labels(labels + (('quantile', str(q)),))} {h.percentile(q * 100) / 1000:.6g}")
+            lines.append(f"{metric}_sum{_prom_labels(labels)} {h.total / 1e6:.6g}")
+            lines.append(f"{metric}_count{_prom_labels(labels)} {h.count}")
+        for (name, labels), value in counters:
+            metric = f"{prefix}{name}_total"
+            head(metric, "counter")
+            lines.append(f"{metric}{_prom_labels(labels)} {value:g}")
+        for name, rate in rates:
+            metric = f"{prefix}{name}_per_second"
+            head(metric, "gauge")
+            lines.append(f"{metric} {rate:g}")
+        return "\n".join(lines) + "\n"
+
+def _prom_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    def escape(v: str) -> str:
+        return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(str(v))}"' for k, v in labels) + "}"
+
+# ---------- module-level registry ----------
+
+registry = Metrics()
+
+def enabled() -> bool:
+    return os.getenv("METRICS", "1").strip().lower() not in ("0", "false", "no", "off")
+
+_enabled = enabled()
+
+def observe(name: str, seconds: float, **labels: Any) -> None:
+    if _enabled:
+        registry.observe(name, seconds, **labels)
+
+def inc(name: str, value: float = 1, **labels: Any) -> None:
+    if _enabled:
+        registry.inc(name, value, **labels)
+
+def mark(name: str, n: float = 1) -> None:
+    if _enabled:
+        registry.mark(name, n)
+
+def timer(name: str, **labels: Any):
+    return registry.timer(name, **labels) if _enabled else _NULL_TIMER
+
+def timed(name: str, **labels: Any) -> Callable[[Callable], Callable]:
+    """Decorator timing a sync or async function (signature and coroutine-ness preserved)."""
+    def wrap(fn: Callable) -> Callable:
+        if not _enabled:
+            return fn
+        key = _labels(labels)
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                with _Timer(registry, name, key):
+                    return await fn(*args, **kwargs)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Timer(registry, name, key):
+                return fn(*args, **kwargs)
+        return wrapper
+    return wrap
+
+# ---------- PyMongo ----------
+
+class CommandTimer(monitoring.CommandListener):
+    """Per-command latency from PyMongo's own duration_micros, plus documents returned by cursors."""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        command = event.command_name
+        registry.observe("mongo_command_seconds", event.duration_micros / 1e6, command=command)
+        reply = event.reply
+        cursor = reply.get("cursor") if isinstance(reply, dict) else None
+        if isinstance(cursor, dict):
+            batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+            if isinstance(batch, list):
+                registry.inc("mongo_docs_returned", len(batch), command=command)
+        elif isinstance(reply, dict) and command in ("insert", "update", "delete") and "n" in reply:
+            registry.inc("mongo_docs_written", reply["n"], command=command)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        registry.observe("mongo_command_seconds", event.duration_micros / 1e6, command=event.command_name)
+        registry.inc("mongo_command_errors", command=event.command_name)
+
+_command_timer = CommandTimer()
+
+def command_listeners() -> List[monitoring.CommandListener]:
+    """event_listeners for MongoClient / AsyncMongoClient (none when METRICS=0)."""
+    return [_command_timer] if _enabled else []
+
+# ---------- Prometheus export ----------
+
+_exporters_started = False
+
+def _write_prom_file(path: str) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(registry.prometheus())
+    os.replace(tmp, path)  # node_exporter's textfile collector never sees a partial file
+
+def start_exporters() -> None:
+    """
+    METRICS_PROM_FILE: rewrite this file every METRICS_PROM_INTERVAL seconds (default 15).
+    METRICS_PORT: serve /metrics over HTTP on this port. Both run in daemon threads.
+    """
+    global _exporters_started
+    if _exporters_started or not _enabled:
+        return
+    _exporters_started = True
+    path = os.getenv("METRICS_PROM_FILE")
+    if path:
+        interval = float(os.getenv("METRICS_PROM_INTERVAL", "15"))
+
+        def loop() -> None:
+            while True:
+                try:
+                    _write_prom_file(path)
+                except OSError:
+                    pass  # directory gone / read-only: try again next round
+                time.sleep(interval)
+        threading.Thread(target=loop, name="metrics-file", daemon=True).start()
+    port = os.getenv("METRICS_PORT")
+    if port:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass  # stdout belongs to the stdio transport
+
+        httpd = ThreadingHTTPServer((os.getenv("METRICS_HOST", "127.0.0.1"), int(port)), Handler)
+        threading.Thread(target=httpd.serve_forever, name="metrics-http", daemon=True).start()
@@ -1,6 +1,7 @@
 from __future__ import annotations
-from pydantic import BaseModel, Field
-from typing import Literal, Optional
+import base64
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Dict, List, Literal, Optional
 from datetime import datetime, timezone
 
 Status = Literal["ON", "OFF"]
@@ -12,3 +13,51 @@ class CellLog(BaseModel):
     ts: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     run_id: int
     cluster: Optional[str] = None
+
+def pack_statuses(statuses: List[str]) -> str:
+    """Pack ON/OFF statuses into a base64 bitmask (bit i set = item i is ON, LSB first)."""
+    bits = bytearray((len(statuses) + 7) // 8)
+    for i, s in enumerate(statuses):
+        if s == "ON":
+            bits[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(bits)).decode("ascii")
+
+def unpack_statuses(status_bits: str, count: int) -> List[str]:
+    """Inverse of pack_statuses for the first `count` items."""
+    raw = base64.b64decode(status_bits)
+    if len(raw) < (count + 7) // 8:
+        raise ValueError(f"status_bits holds {len(raw) * 8} bits, need {count}")
+    return ["ON" if (raw[i >> 3] >> (i & 7)) & 1 else "OFF" for i in range(count)]
+
+class CellLogBatch(BaseModel):
+    """
+    Columnar batch of events sharing ts/run_id/cluster.
+    cell_ids and statuses are parallel arrays; statuses may instead be sent
+    packed as `status_bits` (see pack_statuses).
+    """
+    cell_ids: List[int]
+    statuses: Optional[List[Status]] = None
+    status_bits: Optional[str] = None
+    ts: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    run_id: int
+    cluster: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _check_columns(self) -> "CellLogBatch":
+        if (self.statuses is None) == (self.status_bits is None):
+            raise ValueError("exactly one of statuses or status_bits is required")
+        if self.statuses is not None and len(self.statuses) != len(self.cell_ids):
+            raise ValueError(f"statuses has {len(self.statuses)} items, cell_ids has {len(self.cell_ids)}")
+        if self.status_bits is not None:
+            # Decode once here so a bad bitmask fails validation, not the insert
+            self.statuses = unpack_statuses(self.status_bits, len(self.cell_ids))
+            self.status_bits = None
+        return self
+
+    def to_docs(self) -> List[Dict[str, Any]]:
+        """Expand to row documents in the same shape as CellLog.model_dump()."""
+        ts, run_id, cluster = self.ts, self.run_id, self.cluster
+        return [
+            {"cell_id": cid, "status": s, "ts": ts, "run_id": run_id, "cluster": cluster}
+            for cid, s in zip(self.cell_ids, self.statuses)
+        ]
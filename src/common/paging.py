@@ -0,0 +1,111 @@
+"""
+Keyset pagination for cell_logs on (ts, _id).
+
+Each page asks for documents strictly after the last (ts, _id) returned, so the
+cost of a page doesn't grow with how deep into the window a client is (no skip).
+The continuation token is opaque to clients: base64 of the last key, the pinned
+window bounds and a fingerprint of the filters it was issued for.
+"""
+from __future__ import annotations
+import base64
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+from pymongo import ASCENDING, DESCENDING
+
+from src.common.schema import from_storage, log_field
+
+# CellLog fields a client may ask for (plus "_id")
+FIELDS = ("cell_id", "status", "ts", "run_id", "cluster")
+
+def filters_for(cell_ids: Optional[List[int]] = None, cluster: Optional[str] = None,
+                status: Optional[str] = None, run_id: Optional[int] = None) -> Dict[str, Any]:
+    """CellLog-field filter for the optional equality/$in conditions."""
+    flt: Dict[str, Any] = {}
+    if cell_ids:
+        flt["cell_id"] = cell_ids[0] if len(cell_ids) == 1 else {"$in": sorted(set(cell_ids))}
+    if cluster is not None:
+        flt["cluster"] = cluster
+    if status is not None:
+        if status.upper() not in ("ON", "OFF"):
+            raise ValueError(f"status must be ON or OFF, got {status!r}")
+        flt["status"] = status.upper()
+    if run_id is not None:
+        flt["run_id"] = run_id
+    return flt
+
+def _fingerprint(flt: Dict[str, Any], order: str) -> str:
+    return hashlib.sha1(json_util.dumps([flt, order], sort_keys=True).encode()).hexdigest()[:12]
+
+def encode_token(last: Dict[str, Any], since: datetime, until: datetime, flt: Dict[str, Any], order: str) -> str:
+    state = {"ts": last["ts"], "id": last["_id"], "since": since, "until": until, "f": _fingerprint(flt, order)}
+    return base64.urlsafe_b64encode(json_util.dumps(state).encode()).decode()
+
+def decode_token(token: str, flt: Dict[str, Any], order: str) -> Dict[str, Any]:
+    try:
+        state = json_util.loads(base64.urlsafe_b64decode(token.encode()))
+        state["ts"], state["since"], state["until"] = (_utc(state[k]) for k in ("ts", "since", "until"))
+    except Exception:
+        raise ValueError("invalid page_token")
+    if state.get("f") != _fingerprint(flt, order):
+        raise ValueError("page_token was issued for different filters or order")
+    return state
+
+def _utc(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+def page_query(flt: Dict[str, Any], since: datetime, until: datetime, order: str = "desc",
+               after: Optional[Dict[str, Any]] = None, fields: Optional[List[str]] = None
+               ) -> Tuple[Dict[str, Any], List[Tuple[str, int]], Optional[Dict[str, int]]]:
+    """
+    (stored filter, sort, projection) for one page. `after` is the decoded token:
+    the next page starts strictly after its (ts, _id) in the requested order.
+    """
+    direction = DESCENDING if order == "desc" else ASCENDING
+    op = "$lt" if direction == DESCENDING else "$gt"
+    q: Dict[str, Any] = {log_field(k): v for k, v in flt.items()}
+    q["ts"] = {"$gte": since, "$lte": until}
+    if after is not None:
+        q["$or"] = [{"ts": {op: after["ts"]}}, {"ts": after["ts"], "_id": {op: after["id"]}}]
+    projection = None
+    if fields:
+        projection = {log_field(f): 1 for f in fields if f != "_id"}
+        projection.update(ts=1, _id=1)  # the keyset needs both, even if not returned
+    return q, [("ts", direction), ("_id", direction)], projection
+
+def shape_page(docs: List[Dict[str, Any]], limit: int, fields: Optional[List[str]], compact: bool,
+               token_for) -> Dict[str, Any]:
+    """
+    Turn one fetched page (limit + 1 docs requested) into the tool response.
+    compact=True returns parallel columns with ts as epoch milliseconds.
+    """
+    more = len(docs) > limit
+    docs = docs[:limit]
+    next_token = token_for(docs[-1]) if more else None
+    wanted = list(fields) if fields else list(FIELDS)
+    rows = [from_storage(d) for d in docs]
+    if compact:
+        columns: Dict[str, List[Any]] = {}
+        for f in wanted:
+            if f == "_id":
+                columns[f] = [str(r["_id"]) for r in rows]
+            elif f == "ts":
+                columns[f] = [int(_utc(r["ts"]).timestamp() * 1000) for r in rows]
+            else:
+                columns[f] = [r.get(f) for r in rows]
+        return {"columns": columns, "count": len(rows), "next_token": next_token}
+    include_id = "_id" in wanted
+    logs = []
+    for r in rows:
+        out = {f: r.get(f) for f in wanted if f != "_id"}
+        if include_id:
+            out["_id"] = str(r["_id"])
+        logs.append(out)
+    return {"logs": logs, "count": len(rows), "next_token": next_token}
+
+def check_fields(fields: Optional[List[str]]) -> None:
+    unknown = [f for f in fields or [] if f not in FIELDS and f != "_id"]
+    if unknown:
+        raise ValueError(f"unknown fields {unknown}; choose from {list(FIELDS) + ['_id']}")
@@ -0,0 +1,296 @@
+"""
+Per-cell, per-minute and per-hour rollups of cell_logs, kept in cell_rollups.
+
+Each rollup document covers one (resolution, cell, bucket) and holds:
+  on / off              event counts
+  transitions           status changes (including one from the previous bucket)
+  on_seconds / off_seconds  time spent in each state inside the bucket
+  last_status / last_ts / cluster
+
+write_logs feeds every batch through RollupUpdater, which turns it into one
+unordered bulk_write. Window queries then cost O(cells x buckets) instead of
+O(events). Rebuild from raw events with:
+
+    python -m src.common.rollups backfill
+"""
+from __future__ import annotations
+import argparse
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.collection import Collection
+
+# Bucket widths in seconds
+RESOLUTIONS: Dict[str, int] = {"minute": 60, "hour": 3600}
+
+def rollups_enabled() -> bool:
+    return os.getenv("ROLLUPS", "1").strip().lower() not in ("0", "false", "no", "off")
+
+def _max_gap() -> float:
+    # Gaps longer than this between two events of a cell count as "unknown", not time-in-state
+    return float(os.getenv("ROLLUP_MAX_GAP_SECONDS", "3600"))
+
+def _utc(ts: datetime) -> datetime:
+    # PyMongo returns naive datetimes that are already UTC
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+def bucket_start(ts: datetime, seconds: int) -> datetime:
+    epoch = int(_utc(ts).timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc)
+
+def ensure_rollup_indexes(coll: Collection) -> None:
+    coll.create_index([("res", ASCENDING), ("bucket", ASCENDING)], name="res_1_bucket_1")
+    coll.create_index([("res", ASCENDING), ("cell_id", ASCENDING), ("bucket", ASCENDING)],
+                      name="res_1_cell_id_1_bucket_1")
+
+class RollupUpdater:
+    """
+    Turns events into $inc/$set updates on cell_rollups.
+
+    Keeps each cell's previous (status, ts) in memory to count transitions and
+    time-in-state; cells it hasn't seen yet are seeded from their latest rollup.
+    """
+
+    def __init__(self, coll: Collection, seed: bool = True, floor: Optional[datetime] = None):
+        self.coll = coll
+        self.seed = seed
+        self.floor = floor  # never credit time before this (buckets before it are already complete)
+        self.prev: Dict[int, Tuple[str, datetime]] = {}
+        self.clusters: Dict[int, str] = {}  # last known cluster per cell, for events that omit it
+        self._lock = threading.Lock()
+
+    def _seed(self, cell_ids: Iterable[int]) -> None:
+        if not self.seed:
+            return
+        missing = [c for c in set(cell_ids) if c not in self.prev]
+        if not missing:
+            return
+        pipeline = [
+            {"$match": {"res": "hour", "cell_id": {"$in": missing}, "last_ts": {"$ne": None}}},
+            {"$sort": {"bucket": 1}},
+            {"$group": {"_id": "$cell_id", "status": {"$last": "$last_status"}, "ts": {"$last": "$last_ts"},
+                        "cluster": {"$last": "$cluster"}}},
+        ]
+        for row in self.coll.aggregate(pipeline):
+            self.prev[int(row["_id"])] = (row["status"], _utc(row["ts"]))
+            if row.get("cluster") is not None:
+                self.clusters.setdefault(int(row["_id"]), row["cluster"])
+
+    def updates(self, docs: List[Dict[str, Any]]) -> List[UpdateOne]:
+        """Build one UpdateOne per touched bucket for a batch of flat CellLog dicts."""
+        acc: Dict[Tuple[str, int, datetime], Dict[str, Any]] = {}
+
+        def bucket(res: str, cid: int, b: datetime, cluster: Optional[str]) -> Dict[str, Any]:
+            key = (res, cid, b)
+            if key not in acc:
+                acc[key] = {"inc": defaultdict(int), "set": {}}
+            # Every touched bucket carries the cluster (cluster filters match on it); never overwrite with None
+            if cluster is not None:
+                acc[key]["set"]["cluster"] = cluster
+            return acc[key]
+
+        max_gap = _max_gap()
+        for d in sorted(docs, key=lambda d: _utc(d["ts"])):
+            cid, status, ts = int(d["cell_id"]), d["status"], _utc(d["ts"])
+            cluster = d.get("cluster")
+            if cluster is None:
+                cluster = self.clusters.get(cid)
+            else:
+                self.clusters[cid] = cluster
+            prev = self.prev.get(cid)
+            for res, secs in RESOLUTIONS.items():
+                u = bucket(res, cid, bucket_start(ts, secs), cluster)
+                u["inc"]["on" if status == "ON" else "off"] += 1
+                if prev and prev[0] != status:
+                    u["inc"]["transitions"] += 1
+                u["set"].update(last_status=status, last_ts=ts)
+                # Credit the time since the previous event to its state, split across buckets
+                if prev and prev[1] < ts and (ts - prev[1]).total_seconds() <= max_gap:
+                    field = "on_seconds" if prev[0] == "ON" else "off_seconds"
+                    t = max(prev[1], self.floor) if self.floor else prev[1]
+                    while t < ts:
+                        b = bucket_start(t, secs)
+                        end = min(b + timedelta(seconds=secs), ts)
+                        bucket(res, cid, b, cluster)["inc"][field] += (end - t).total_seconds()
+                        t = end
+            if not prev or prev[1] <= ts:
+                self.prev[cid] = (status, ts)
+
+        ops = []
+        for (res, cid, b), u in acc.items():
+            update: Dict[str, Any] = {"$inc": dict(u["inc"]),
+                                      "$setOnInsert": {"res": res, "cell_id": cid, "bucket": b}}
+            if u["set"]:
+                update["$set"] = u["set"]
+            ops.append(UpdateOne({"_id": f"{res}:{cid}:{int(b.timestamp())}"}, update, upsert=True))
+        return ops
+
+    def apply(self, docs: List[Dict[str, Any]]) -> int:
+        """Update rollups for docs in one unordered bulk_write. Returns the bucket count."""
+        if not docs:
+            return 0
+        # Serialized so concurrent batches see each other's previous state
+        with self._lock:
+            self._seed(int(d["cell_id"]) for d in docs)
+            ops = self.updates(docs)
+            if ops:
+                try:
+                    self.coll.bulk_write(ops, ordered=False)
+                except Exception:
+                    # prev already moved past this batch: drop those cells so they reseed from what was stored
+                    for cid in {int(d["cell_id"]) for d in docs}:
+                        self.prev.pop(cid, None)
+                    raise
+        return len(ops)
+
+# ---------- window queries ----------
+
+def pick_resolution(since: datetime, until: datetime, resolution: str = "auto") -> str:
+    if resolution in RESOLUTIONS:
+        return resolution
+    return "hour" if until - since > timedelta(hours=6) else "minute"
+
+def _match(res: str, since: datetime, until: datetime, cell_ids: Optional[List[int]], cluster: Optional[str]) -> Dict[str, Any]:
+    secs = RESOLUTIONS[res]
+    m: Dict[str, Any] = {"res": res, "bucket": {"$gte": bucket_start(since, secs), "$lt": until}}
+    if cell_ids:
+        m["cell_id"] = {"$in": list(cell_ids)}
+    if cluster is not None:
+        m["cluster"] = cluster
+    return m
+
+def window_stats(
+    coll: Collection,
+    since: datetime,
+    until: Optional[datetime] = None,
+    resolution: str = "auto",
+    cell_ids: Optional[List[int]] = None,
+    cluster: Optional[str] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Per-cell counts, transitions and time-in-state for [since, until) from the rollups.
+    The window start snaps down to the bucket width. For a live window (until=None)
+    the time since each cell's last event is credited to its last status.
+    """
+    live = until is None
+    until = _utc(until or datetime.now(timezone.utc))
+    res = pick_resolution(_utc(since), until, resolution)
+    pipeline = [
+        {"$match": _match(res, since, until, cell_ids, cluster)},
+        {"$sort": {"bucket": 1}},
+        {"$group": {
+            "_id": "$cell_id",
+            "on": {"$sum": "$on"},
+            "off": {"$sum": "$off"},
+            "transitions": {"$sum": "$transitions"},
+            "on_seconds": {"$sum": "$on_seconds"},
+            "off_seconds": {"$sum": "$off_seconds"},
+            # Buckets that only carry time-in-state have no last_ts; $max skips them
+            "last": {"$max": {"$cond": [{"$ifNull": ["$last_ts", False]},
+                                        {"ts": "$last_ts", "status": "$last_status"}, None]}},
+            "cluster": {"$max": "$cluster"},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+    max_gap = _max_gap()
+    out: Dict[int, Dict[str, Any]] = {}
+    for row in coll.aggregate(pipeline, allowDiskUse=True):
+        cid = int(row.pop("_id"))
+        last = row.pop("last") or {}
+        row["last_status"], row["last_ts"] = last.get("status"), last.get("ts")
+        if live and row["last_ts"] is not None:
+            tail = (until - _utc(row["last_ts"])).total_seconds()
+            if 0 < tail <= max_gap:
+                row["on_seconds" if row["last_status"] == "ON" else "off_seconds"] += tail
+        observed = row["on_seconds"] + row["off_seconds"]
+        row["uptime_pct"] = round(row["on_seconds"] / observed * 100, 2) if observed else None
+        row["resolution"] = res
+        out[cid] = row
+    return out
+
+def uptime_series(
+    coll: Collection,
+    since: datetime,
+    until: Optional[datetime] = None,
+    resolution: str = "auto",
+    cluster: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """System-wide time-weighted uptime per bucket for [since, until)."""
+    until = _utc(until or datetime.now(timezone.utc))
+    res = pick_resolution(_utc(since), until, resolution)
+    pipeline = [
+        {"$match": _match(res, since, until, None, cluster)},
+        {"$group": {
+            "_id": "$bucket",
+            "on_seconds": {"$sum": "$on_seconds"},
+            "off_seconds": {"$sum": "$off_seconds"},
+            "off": {"$sum": "$off"},
+            "cells": {"$sum": 1},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+    out = []
+    for row in coll.aggregate(pipeline):
+        observed = row["on_seconds"] + row["off_seconds"]
+        out.append({
+            "bucket": _utc(row["_id"]),
+            "uptime_pct": round(row["on_seconds"] / observed * 100, 2) if observed else None,
+            "off_events": row["off"],
+            "cells": row["cells"],
+        })
+    return out
+
+# ---------- backfill ----------
+
+def backfill(logs: Collection, rollups: Collection, since: Optional[datetime] = None, chunk: int = 20000) -> int:
+    """
+    Rebuild cell_rollups from raw events, streaming them in (cell_id, ts) order.
+    With since, only buckets from since's hour boundary on are deleted and rebuilt;
+    earlier buckets are kept and each cell continues from its last state before it.
+    """
+    from src.common.schema import from_storage, log_field, storage_filter
+
+    if since is None:
+        rollups.drop()
+        ensure_rollup_indexes(rollups)
+        updater = RollupUpdater(rollups, seed=False)  # rebuilding from scratch: nothing to seed from
+        flt = {}
+    else:
+        start = bucket_start(_utc(since), 3600)
+        rollups.delete_many({"bucket": {"$gte": start}})
+        ensure_rollup_indexes(rollups)
+        # Seeds from the kept buckets; the gap before start is already credited there
+        updater = RollupUpdater(rollups, floor=start)
+        flt = storage_filter({"ts": {"$gte": start}})
+    cur = logs.find(flt, {"_id": 0}, batch_size=chunk).sort([(log_field("cell_id"), ASCENDING), ("ts", ASCENDING)])
+    done, batch = 0, []
+    for d in cur:
+        batch.append(from_storage(d))
+        if len(batch) >= chunk:
+            updater.apply(batch)
+            done += len(batch)
+            batch = []
+            print(f"  {done:,} events rolled up", flush=True)
+    if batch:
+        updater.apply(batch)
+        done += len(batch)
+    return done
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    from src.common.db import get_logs_collection, get_rollups_collection
+
+    ap = argparse.ArgumentParser(description="Maintain per-cell minute/hour rollups.")
+    ap.add_argument("command", choices=["backfill"])
+    ap.add_argument("--days", type=float, default=None, help="only rebuild the last N days (from that hour boundary on); "
+                         "older rollups are kept. Default: drop and rebuild everything")
+    args = ap.parse_args()
+
+    since = datetime.now(timezone.utc) - timedelta(days=args.days) if args.days else None
+    n = backfill(get_logs_collection(), get_rollups_collection(), since)
+    print(f"Rolled up {n:,} events")
@@ -0,0 +1,341 @@
+"""
+Schema / index management for cell_logs.
+
+The collection is prepared (created, indexed) once per process by
+get_logs_collection(), or explicitly:
+
+    python -m src.common.schema migrate        # create/upgrade indexes
+    python -m src.common.schema check          # fail if a server query would COLLSCAN
+    python -m src.common.schema to-timeseries  # move a plain collection to time-series storage
+    python -m src.common.schema compare        # storage size / query latency, plain vs time-series
+
+Storage modes (LOG_STORAGE):
+- plain (default): one flat document per event.
+- timeseries: native time-series collection with ts as timeField and
+  meta = {cell_id, cluster} as metaField. Use to_storage/from_storage and
+  log_field/storage_filter so callers keep working with flat CellLog dicts.
+"""
+from __future__ import annotations
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.errors import OperationFailure
+
+# (keys, options) for every index the server and analytics rely on
+INDEXES: List[Tuple[List[Tuple[str, int]], Dict[str, Any]]] = [
+    ([("ts", ASCENDING)], {"name": "ts_1"}),                                  # time windows (+ TTL)
+    ([("ts", ASCENDING), ("_id", ASCENDING)], {"name": "ts_1__id_1"}),        # fetch_logs keyset pages
+    # per-cell / per-cluster history; the _id suffix keeps filtered pages on the index too
+    ([("cell_id", ASCENDING), ("ts", ASCENDING), ("_id", ASCENDING)], {"name": "cell_id_1_ts_1__id_1"}),
+    ([("cluster", ASCENDING), ("ts", ASCENDING), ("_id", ASCENDING)], {"name": "cluster_1_ts_1__id_1"}),
+    ([("run_id", ASCENDING)], {"name": "run_id_1"}),                          # per-run lookups
+]
+
+# Older indexes now covered by a longer one above; `migrate` drops them
+SUPERSEDED_INDEXES = ["cell_id_1_ts_1", "cluster_1_ts_1"]
+
+# Server error codes for "same keys, different options/name"
+_INDEX_CONFLICT_CODES = {85, 86}
+
+# Fields stored under the time-series metaField
+META_FIELD = "meta"
+META_FIELDS = ("cell_id", "cluster")
+
+def _ttl_seconds() -> Optional[int]:
+    ttl_days = (os.getenv("LOG_TTL_DAYS") or "").strip()
+    if not ttl_days:
+        return None
+    try:
+        return int(float(ttl_days) * 24 * 3600)
+    except ValueError:
+        return None  # ignore misconfig; you can fix the env later
+
+# ---------- storage mode ----------
+
+def timeseries_enabled() -> bool:
+    return os.getenv("LOG_STORAGE", "plain").strip().lower() == "timeseries"
+
+def log_field(name: str, timeseries: Optional[bool] = None) -> str:
+    """Stored path of a CellLog field ("cell_id" -> "meta.cell_id" in time-series mode)."""
+    if timeseries is None:
+        timeseries = timeseries_enabled()
+    return f"{META_FIELD}.{name}" if timeseries and name in META_FIELDS else name
+
+def storage_filter(flt: Dict[str, Any], timeseries: Optional[bool] = None) -> Dict[str, Any]:
+    """Rewrite the top-level keys of a CellLog-field filter to stored paths."""
+    return {log_field(k, timeseries): v for k, v in flt.items()}
+
+def to_storage(docs: List[Dict[str, Any]], timeseries: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """Map flat CellLog dicts to the stored shape (no-op in plain mode)."""
+    if timeseries is None:
+        timeseries = timeseries_enabled()
+    if not timeseries:
+        return docs
+    out = []
+    for d in docs:
+        d = dict(d)
+        d[META_FIELD] = {k: d.pop(k, None) for k in META_FIELDS}
+        out.append(d)
+    return out
+
+def from_storage(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a stored document back to CellLog fields (works for both modes)."""
+    meta = doc.pop(META_FIELD, None)
+    if meta:
+        doc.update(meta)
+    return doc
+
+def is_timeseries(db: Database, name: str) -> bool:
+    info = next(iter(db.list_collections(filter={"name": name})), None)
+    return bool(info) and info.get("type") == "timeseries"
+
+def ensure_collection(db: Database, name: str, timeseries: Optional[bool] = None) -> Collection:
+    """
+    Create the collection in the configured storage mode if it does not exist.
+    For time-series, TTL comes from LOG_TTL_DAYS and granularity from TS_GRANULARITY.
+    """
+    if timeseries is None:
+        timeseries = timeseries_enabled()
+    if not timeseries:
+        return db[name]
+    ttl = _ttl_seconds()
+    if name not in db.list_collection_names(filter={"name": name}):
+        opts: Dict[str, Any] = {
+            "timeseries": {
+                "timeField": "ts",
+                "metaField": META_FIELD,
+                "granularity": os.getenv("TS_GRANULARITY", "seconds"),
+            }
+        }
+        if ttl is not None:
+            opts["expireAfterSeconds"] = ttl
+        return db.create_collection(name, **opts)
+    if not is_timeseries(db, name):
+        raise RuntimeError(
+            f"LOG_STORAGE=timeseries but {db.name}.{name} is a plain collection; "
+            "run `python -m src.common.schema to-timeseries` first"
+        )
+    if ttl is not None:
+        db.command("collMod", name, expireAfterSeconds=ttl)
+    return db[name]
+
+# ---------- indexes ----------
+
+def ensure_indexes(coll: Collection, timeseries: Optional[bool] = None) -> List[str]:
+    """Create all INDEXES on coll (idempotent). Returns the index names."""
+    if timeseries is None:
+        timeseries = timeseries_enabled()
+    # Time-series collections expire through the collection option, not a TTL index
+    ttl = None if timeseries else _ttl_seconds()
+    names = []
+    for keys, opts in INDEXES:
+        opts = dict(opts)
+        keys = [(log_field(k, timeseries), d) for k, d in keys]
+        if ttl is not None and keys == [("ts", ASCENDING)]:
+            # Mongo needs the TTL on a single-field index, so it rides on ts_1
+            opts["expireAfterSeconds"] = ttl
+        try:
+            names.append(coll.create_index(keys, **opts))
+        except OperationFailure as e:
+            if e.code not in _INDEX_CONFLICT_CODES or "expireAfterSeconds" not in opts:
+                raise
+            # ts_1 already exists without (or with another) TTL: change it in place
+            coll.database.command("collMod", coll.name,
+                                  index={"keyPattern": dict(keys), "expireAfterSeconds": ttl})
+            names.append(opts["name"])
+    return names
+
+def prepare_collection(db: Database, name: str, indexes: bool = True) -> Collection:
+    """Create the collection in the configured storage mode and (optionally) its indexes."""
+    coll = ensure_collection(db, name)
+    if indexes:
+        ensure_indexes(coll)
+    return coll
+
+# ---------- query checks ----------
+
+def server_queries(minutes: int = 10) -> Dict[str, Tuple[Dict[str, Any], Optional[List[Tuple[str, int]]]]]:
+    """Representative (filter, sort) pairs, in CellLog fields, for the queries the server and analytics issue."""
+    since = datetime.now(timezone.utc) - timedelta(minutes=minutes)
+    window = {"$gte": since}
+    return {
+        "fetch_logs": ({"ts": window}, [("ts", DESCENDING), ("_id", DESCENDING)]),
+        "fetch_logs_cells": ({"cell_id": {"$in": [1, 2]}, "ts": window}, [("ts", DESCENDING), ("_id", DESCENDING)]),
+        "fetch_logs_cluster": ({"cluster": "default", "ts": window}, [("ts", ASCENDING), ("_id", ASCENDING)]),
+        "summarize_recent": ({"ts": window}, None),
+        "cell_history": ({"cell_id": 1, "ts": window}, [("ts", ASCENDING)]),
+        "cluster_window": ({"cluster": "default", "ts": window}, [("ts", ASCENDING)]),
+        "run_lookup": ({"run_id": 1}, None),
+    }
+
+def _has_collscan(plan: Any) -> bool:
+    """True if any stage in an explain plan (classic or SBE layout) is a COLLSCAN."""
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(_has_collscan(v) for v in plan.values())
+    if isinstance(plan, list):
+        return any(_has_collscan(v) for v in plan)
+    return False
+
+def assert_indexed(coll: Collection, flt: Dict[str, Any], sort: Optional[List[Tuple[str, int]]] = None) -> None:
+    """Raise RuntimeError if the winning plan for find(flt).sort(sort) scans the collection."""
+    cur = coll.find(flt)
+    if sort:
+        cur = cur.sort(sort)
+    explain = cur.explain()
+    # Time-series finds are rewritten to an aggregation over the buckets collection
+    plan = explain.get("queryPlanner", {}).get("winningPlan") or explain.get("stages") or explain
+    if _has_collscan(plan):
+        raise RuntimeError(f"query {flt} (sort={sort}) falls back to COLLSCAN on {coll.full_name}")
+
+def check_queries(coll: Collection, timeseries: Optional[bool] = None) -> List[str]:
+    """Explain every server query; returns the names of those that COLLSCAN."""
+    failed = []
+    for name, (flt, sort) in server_queries().items():
+        try:
+            assert_indexed(coll, storage_filter(flt, timeseries), sort)
+        except RuntimeError as e:
+            print(f"❌ {name}: {e}")
+            failed.append(name)
+        else:
+            print(f"✅ {name}: index scan")
+    return failed
+
+def migrate(coll: Optional[Collection] = None) -> List[str]:
+    """Explicit entry point to bring the collection and its indexes up to date."""
+    if coll is None:
+        from src.common.db import get_logs_collection
+        coll = get_logs_collection(ensure_indexes=False)
+    ensure_collection(coll.database, coll.name)
+    names = ensure_indexes(coll)
+    existing = set(coll.index_information())
+    for name in SUPERSEDED_INDEXES:
+        if name in existing:
+            coll.drop_index(name)
+            print(f"dropped superseded index {name}")
+    return names
+
+# ---------- plain -> time-series ----------
+
+def copy_to_timeseries(src: Collection, dst: Collection, batch_size: int = 10000, resume: bool = False) -> int:
+    """
+    Bulk-copy flat documents (keeping their _id) from src into the time-series collection
+    dst in (ts, _id) order. After each batch the last copied source key is recorded in
+    schema_migrations; resume=True continues after it. Documents of an interrupted batch
+    that already reached dst are skipped by _id, and dst's own live writes never move the
+    resume point.
+    """
+    progress = dst.database["schema_migrations"]
+    key = f"to_timeseries:{dst.name}"
+    flt: Dict[str, Any] = {}
+    total = 0
+    if not resume:
+        progress.delete_one({"_id": key})
+    elif (last := progress.find_one({"_id": key})) is not None:
+        flt = {"$or": [{"ts": {"$gt": last["ts"]}}, {"ts": last["ts"], "_id": {"$gt": last["last_id"]}}]}
+        total = last["copied"]
+        print(f"  resuming after {last['ts']} ({total:,} events already copied)", flush=True)
+    copied = 0
+    check = resume  # only the first batch after a restart can already be (partly) in dst
+
+    def flush(batch: List[Dict[str, Any]]) -> None:
+        nonlocal copied, check
+        end, n = batch[-1], len(batch)
+        if check:
+            have = set(dst.distinct("_id", {"ts": {"$gte": batch[0]["ts"], "$lte": end["ts"]},
+                                            "_id": {"$in": [d["_id"] for d in batch]}}))
+            batch = [d for d in batch if d["_id"] not in have]
+            check = False
+        if batch:
+            dst.insert_many(to_storage(batch, timeseries=True), ordered=True)
+        copied += n
+        progress.replace_one({"_id": key}, {"ts": end["ts"], "last_id": end["_id"], "copied": total + copied},
+                             upsert=True)
+
+    batch: List[Dict[str, Any]] = []
+    for d in src.find(flt, batch_size=batch_size).sort([("ts", ASCENDING), ("_id", ASCENDING)]):
+        batch.append(d)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+            print(f"  copied {total + copied:,}", flush=True)
+    if batch:
+        flush(batch)
+    return copied
+
+def to_timeseries(db: Database, name: str, batch_size: int = 10000) -> int:
+    """
+    Move plain `name` aside to `<name>_plain` and recreate `name` as a time-series
+    collection holding the same events. Time-series collections can't be renamed,
+    so the plain one is the one that moves. Rerunning after a failure resumes the
+    copy from `<name>_plain` (a finished migration copies nothing more).
+    """
+    backup = f"{name}_plain"
+    has_backup = backup in db.list_collection_names(filter={"name": backup})
+    if is_timeseries(db, name):
+        if not has_backup:
+            print(f"{db.name}.{name} is already a time-series collection")
+            return 0
+        return copy_to_timeseries(db[backup], db[name], batch_size, resume=True)
+    if name in db.list_collection_names(filter={"name": name}):
+        if has_backup:
+            raise RuntimeError(f"both {name} and {backup} exist as plain collections; resolve manually")
+        db[name].rename(backup)
+    dst = ensure_collection(db, name, timeseries=True)
+    ensure_indexes(dst, timeseries=True)
+    return copy_to_timeseries(db[backup], dst, batch_size)
+
+def _latency_ms(coll: Collection, flt: Dict[str, Any], sort, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        cur = coll.find(flt)
+        if sort:
+            cur = cur.sort(sort)
+        for _doc in cur:
+            pass
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+def compare(db: Database, plain: str, ts: str, minutes: int = 60, repeat: int = 5) -> None:
+    """Print storage size and median query latency for the plain vs time-series collections."""
+    print(f"{'':<18} {plain:>20} {ts:>20}")
+    stats = {n: db.command("collStats", n) for n in (plain, ts)}
+    for key in ("count", "size", "storageSize", "totalIndexSize"):
+        print(f"{key:<18} {stats[plain].get(key, 0):>20,} {stats[ts].get(key, 0):>20,}")
+    for qname, (flt, sort) in server_queries(minutes).items():
+        lp = _latency_ms(db[plain], storage_filter(flt, False), sort, repeat)
+        lt = _latency_ms(db[ts], storage_filter(flt, True), sort, repeat)
+        print(f"{qname + ' ms':<18} {lp:>20.1f} {lt:>20.1f}")
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    from src.common.db import get_client, get_logs_collection
+
+    ap = argparse.ArgumentParser(description="Manage cell_logs storage and indexes.")
+    ap.add_argument("command", choices=["migrate", "check", "to-timeseries", "compare"])
+    ap.add_argument("--batch", type=int, default=10000, help="to-timeseries: documents per insert_many")
+    ap.add_argument("--minutes", type=int, default=60, help="compare: query window")
+    args = ap.parse_args()
+
+    db = get_client()[os.getenv("MONGO_DB", "maveric")]
+    if args.command == "to-timeseries":
+        print(f"Copied {to_timeseries(db, 'cell_logs', args.batch):,} events into time-series cell_logs")
+    elif args.command == "compare":
+        compare(db, "cell_logs_plain", "cell_logs", args.minutes)
+    else:
+        coll = get_logs_collection(ensure_indexes=False)
+        if args.command == "migrate":
+            print("Indexes:", ", ".join(migrate(coll)))
+        else:
+            sys.exit(1 if check_queries(coll) else 0)
@@ -0,0 +1,250 @@
+"""
+Transition-only storage for cell_logs (LOG_MODE=transitions).
+
+write_logs then stores an event only when the cell's status differs from its last
+stored row, or when HEARTBEAT_SECONDS have passed since that row (a heartbeat, so
+a steady cell stays visible and no gap in its log exceeds the heartbeat). With
+a generator flipping 30% of cells per tick that drops ~70% of the rows.
+
+Rollups, cell_state and in-process subscriptions still receive every event, so
+window_stats, uptime_series and current_status answer exactly as before. Readers
+of the raw log rebuild state from it:
+
+    state_at(coll, ts)                    each cell's status at ts
+    time_in_state(coll, since, until)     per-cell ON/OFF seconds and transitions
+    window_per_cell(rollups, since)       summarize_recent's per-cell aggregate
+
+Time-weighted answers (SLA, outage lengths, flips) are unchanged because a status
+holds until the next stored row either way; event counts come from the rollups,
+so this mode requires ROLLUPS=1 (check_config() fails otherwise).
+
+Each process tracks the last stored row per cell. With several writers for the
+same cell a repeat can be dropped after another writer stored a change; the next
+heartbeat corrects it, so the error is bounded by HEARTBEAT_SECONDS.
+
+    python -m src.common.transitions state --at 2025-01-01T12:00:00
+    python -m src.common.transitions compact --dry-run   # drop repeats from an existing full log
+"""
+from __future__ import annotations
+import argparse
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.collection import Collection
+
+from src.common.schema import from_storage, log_field, storage_filter
+
+def transitions_enabled() -> bool:
+    return os.getenv("LOG_MODE", "all").strip().lower() == "transitions"
+
+def check_config() -> None:
+    """Fail fast: without the rollups a transition-only log can't answer event counts."""
+    from src.common.rollups import rollups_enabled
+    if transitions_enabled() and not rollups_enabled():
+        raise RuntimeError("LOG_MODE=transitions requires ROLLUPS=1: event counts come from the rollups")
+
+def _heartbeat() -> float:
+    return float(os.getenv("HEARTBEAT_SECONDS", "300"))
+
+def _utc(ts: datetime) -> datetime:
+    # PyMongo returns naive datetimes that are already UTC
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+class TransitionFilter:
+    """
+    Picks the events of a batch that must be stored. Keeps each cell's last stored
+    (status, ts) in memory; cells it hasn't seen yet are seeded from cell_logs.
+    """
+
+    def __init__(self, coll: Collection, heartbeat: Optional[float] = None, seed: bool = True):
+        self.coll = coll
+        self.heartbeat = _heartbeat() if heartbeat is None else heartbeat
+        self.seed = seed
+        self.prev: Dict[int, Tuple[str, datetime]] = {}
+        self._lock = threading.Lock()
+
+    def _seed(self, cell_ids: Iterable[int]) -> None:
+        if not self.seed:
+            return
+        missing = [c for c in set(cell_ids) if c not in self.prev]
+        if missing:
+            for cid, row in latest_rows(self.coll, cell_ids=missing).items():
+                self.prev[cid] = (row["status"], row["ts"])
+
+    def keep(self, d: Dict[str, Any]) -> bool:
+        """Decide for one event (callers hold the lock and feed events in ts order)."""
+        cid, status, ts = int(d["cell_id"]), d["status"], _utc(d["ts"])
+        prev = self.prev.get(cid)
+        if prev is not None and ts < prev[1]:
+            return True  # older than what is stored: can't tell, keep it
+        if prev is None or prev[0] != status or (ts - prev[1]).total_seconds() >= self.heartbeat:
+            self.prev[cid] = (status, ts)
+            return True
+        return False
+
+    def select(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The transitions and heartbeats among docs (flat CellLog dicts), in their original order."""
+        if not docs:
+            return []
+        # Serialized so concurrent batches see each other's stored rows
+        with self._lock:
+            self._seed(int(d["cell_id"]) for d in docs)
+            order = sorted(range(len(docs)), key=lambda i: _utc(docs[i]["ts"]))
+            kept = {i for i in order if self.keep(docs[i])}
+        return [d for i, d in enumerate(docs) if i in kept]
+
+    def forget(self, docs: List[Dict[str, Any]]) -> None:
+        """Drop the cells of a batch whose insert failed; they are re-seeded on their next event."""
+        with self._lock:
+            for d in docs:
+                self.prev.pop(int(d["cell_id"]), None)
+
+# ---------- reconstruction ----------
+
+def _filter(cell_ids: Optional[List[int]], cluster: Optional[str]) -> Dict[str, Any]:
+    flt: Dict[str, Any] = {}
+    if cell_ids:
+        flt["cell_id"] = {"$in": list(cell_ids)}
+    if cluster is not None:
+        flt["cluster"] = cluster
+    return flt
+
+def latest_rows(coll: Collection, at: Optional[datetime] = None, cell_ids: Optional[List[int]] = None,
+                cluster: Optional[str] = None, max_age: Optional[float] = None) -> Dict[int, Dict[str, Any]]:
+    """
+    Newest stored row per cell at or before `at` (default: the newest overall), as
+    {cell_id: {"status", "ts", "cluster"}}. max_age (seconds) skips cells whose last
+    row is older, i.e. that had stopped reporting.
+    """
+    cell = log_field("cell_id")
+    flt = _filter(cell_ids, cluster)
+    if at is not None or max_age is not None:
+        flt["ts"] = {}
+        if at is not None:
+            flt["ts"]["$lte"] = at
+        if max_age is not None:
+            flt["ts"]["$gte"] = (at or datetime.now(timezone.utc)) - timedelta(seconds=max_age)
+    pipeline = [
+        {"$match": storage_filter(flt)},
+        # Descending on both keys walks the (cell_id, ts) index backwards; $first is then the newest row
+        {"$sort": {cell: DESCENDING, "ts": DESCENDING}},
+        {"$group": {"_id": "$" + cell, "status": {"$first": "$status"}, "ts": {"$first": "$ts"},
+                    "cluster": {"$first": "$" + log_field("cluster")}}},
+    ]
+    out: Dict[int, Dict[str, Any]] = {}
+    for row in coll.aggregate(pipeline, allowDiskUse=True):
+        out[int(row.pop("_id"))] = {**row, "ts": _utc(row["ts"])}
+    return dict(sorted(out.items()))
+
+def state_at(coll: Collection, at: datetime, cell_ids: Optional[List[int]] = None,
+             cluster: Optional[str] = None, max_age: Optional[float] = None) -> Dict[int, str]:
+    """{cell_id: "ON"|"OFF"} as of `at`; works on full and transition-only logs alike."""
+    return {cid: row["status"] for cid, row in latest_rows(coll, at, cell_ids, cluster, max_age).items()}
+
+def time_in_state(coll: Collection, since: datetime, until: Optional[datetime] = None,
+                  cell_ids: Optional[List[int]] = None, cluster: Optional[str] = None,
+                  max_age: Optional[float] = None) -> Dict[int, Dict[str, Any]]:
+    """
+    Per-cell on_seconds / off_seconds / transitions over [since, until) (until
+    defaults to now), plus last_status, last_ts, cluster, uptime_pct and the number
+    of stored rows read. The state at `since` is carried in from the newest row
+    before it, so a cell that didn't change in the window still counts.
+    """
+    since = _utc(since)
+    until = _utc(until or datetime.now(timezone.utc))
+    acc: Dict[int, Dict[str, Any]] = {}
+    for cid, row in latest_rows(coll, since, cell_ids, cluster, max_age).items():
+        acc[cid] = {"on_seconds": 0.0, "off_seconds": 0.0, "transitions": 0, "rows": 0,
+                    "last_status": row["status"], "last_ts": row["ts"], "cluster": row.get("cluster"), "_t": since}
+
+    flt = {**_filter(cell_ids, cluster), "ts": {"$gt": since, "$lt": until}}
+    cur = coll.find(storage_filter(flt), {"_id": 0, "run_id": 0}).sort(
+        [(log_field("cell_id"), ASCENDING), ("ts", ASCENDING)])
+    for doc in cur:
+        d = from_storage(doc)
+        cid, ts = int(d["cell_id"]), _utc(d["ts"])
+        a = acc.get(cid)
+        if a is None:
+            acc[cid] = {"on_seconds": 0.0, "off_seconds": 0.0, "transitions": 0, "rows": 1,
+                        "last_status": d["status"], "last_ts": ts, "cluster": d.get("cluster"), "_t": ts}
+            continue
+        a["on_seconds" if a["last_status"] == "ON" else "off_seconds"] += (ts - a["_t"]).total_seconds()
+        if d["status"] != a["last_status"]:
+            a["transitions"] += 1
+        a.update(last_status=d["status"], last_ts=ts, cluster=d.get("cluster", a["cluster"]), _t=ts)
+        a["rows"] += 1
+
+    for a in acc.values():
+        a["on_seconds" if a["last_status"] == "ON" else "off_seconds"] += (until - a.pop("_t")).total_seconds()
+        observed = a["on_seconds"] + a["off_seconds"]
+        a["uptime_pct"] = round(a["on_seconds"] / observed * 100, 2) if observed else None
+    return dict(sorted(acc.items()))
+
+def window_per_cell(rollups: Collection, since: datetime) -> Dict[int, Dict[str, Any]]:
+    """
+    aggregates.window_per_cell() for a transition-only log: {cell_id: {"on", "off",
+    "last_status", "last_ts", "cluster"}}. The log lacks the repeats, so the event
+    counts come from the rollups (which see every event), exact per minute bucket.
+    """
+    from src.common.rollups import window_stats
+    per_cell = window_stats(rollups, since, resolution="minute")
+    return {cid: {k: row[k] for k in ("on", "off", "last_status", "last_ts", "cluster")}
+            for cid, row in per_cell.items() if row["on"] + row["off"]}
+
+# ---------- existing full logs ----------
+
+def compact(coll: Collection, heartbeat: Optional[float] = None, dry_run: bool = False,
+            chunk: int = 10000) -> Tuple[int, int]:
+    """Delete the rows transition-only ingest would not have stored. Returns (rows read, rows dropped)."""
+    filt = TransitionFilter(coll, heartbeat, seed=False)  # rows arrive in (cell_id, ts) order
+    cur = coll.find({}, {"status": 1, "ts": 1, log_field("cell_id"): 1}, batch_size=chunk).sort(
+        [(log_field("cell_id"), ASCENDING), ("ts", ASCENDING)])
+    read = dropped = 0
+    doomed: List[Any] = []
+    for doc in cur:
+        read += 1
+        if not filt.keep(from_storage(doc)):
+            doomed.append(doc["_id"])
+        if len(doomed) >= chunk:
+            dropped += len(doomed)
+            if not dry_run:
+                coll.delete_many({"_id": {"$in": doomed}})
+            doomed = []
+            print(f"  {read:,} rows read, {dropped:,} repeats", flush=True)
+    if doomed:
+        dropped += len(doomed)
+        if not dry_run:
+            coll.delete_many({"_id": {"$in": doomed}})
+    return read, dropped
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    from src.common.db import get_logs_collection
+
+    ap = argparse.ArgumentParser(description="Transition-only cell_logs: state queries and compaction.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p_state = sub.add_parser("state", help="status of every cell at a timestamp")
+    p_state.add_argument("--at", default=None, help="ISO timestamp (default now)")
+    p_state.add_argument("--cluster", default=None)
+    p_compact = sub.add_parser("compact", help="delete repeated statuses from an existing full log")
+    p_compact.add_argument("--heartbeat", type=float, default=None, help="seconds (default HEARTBEAT_SECONDS)")
+    p_compact.add_argument("--dry-run", action="store_true", help="only count what would be dropped")
+    args = ap.parse_args()
+
+    coll = get_logs_collection()
+    if args.command == "state":
+        at = _utc(datetime.fromisoformat(args.at)) if args.at else datetime.now(timezone.utc)
+        states = state_at(coll, at, cluster=args.cluster)
+        on = sum(1 for s in states.values() if s == "ON")
+        print(f"✅ {len(states)} cells at {at.isoformat()}: {on} ON, {len(states) - on} OFF")
+        off = [cid for cid, s in states.items() if s == "OFF"]
+        if off:
+            print(f"  OFF: {', '.join(map(str, off[:50]))}" + (" ..." if len(off) > 50 else ""))
+    else:
+        read, dropped = compact(coll, args.heartbeat, dry_run=args.dry_run)
+        verb = "would drop" if args.dry_run else "dropped"
+        print(f"✅ {read:,} rows read, {verb} {dropped:,} repeats ({dropped / read * 100 if read else 0:.1f}%)")
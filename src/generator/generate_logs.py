@@ -3,17 +3,34 @@ from datetime import datetime, timezone
 from dotenv import load_dotenv
 load_dotenv()
 
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from src.clients.connect import open_session, server_params
+from src.common.models import pack_statuses
 
-async def run(cell_count: int, interval_sec: float, iterations: int, flip_prob: float):
-    # Launch the MCP server as a module (works with src/ layout)
+def build_call(payload: str, cell_ids: list, statuses: list, ts: str | None, run_id: int):
+    """Return (tool name, arguments) for one tick in the requested payload shape (ts=None: server time)."""
+    if payload == "rows":
+        batch = [
+            {"cell_id": cid, "status": s, "run_id": run_id}
+            for cid, s in zip(cell_ids, statuses)
+        ]
+        if ts is not None:
+            for row in batch:
+                row["ts"] = ts
+        return "write_logs", {"batch": batch}
+    args = {"cell_ids": cell_ids, "run_id": run_id}
+    if ts is not None:
+        args["ts"] = ts
+    if payload == "bitmask":
+        args["status_bits"] = pack_statuses(statuses)
+    else:
+        args["statuses"] = statuses
+    return "write_logs_columnar", args
+
+async def run(cell_count: int, interval_sec: float, iterations: int, flip_prob: float,
+              payload: str = "rows", url: str | None = None):
+    # Launch the MCP server as a module (works with src/ layout), unless url / MCP_SERVER_URL is set
     # Suppress server debug output by redirecting stderr to devnull
-    server = StdioServerParameters(
-        command="python", 
-        args=["-m", "src.mcp_server.server"],
-        env={"PYTHONUNBUFFERED": "1"}
-    )
+    server = server_params(env={"PYTHONUNBUFFERED": "1"})
 
     # Track current ON/OFF state per cell
     states = {i: "OFF" for i in range(1, cell_count + 1)}
@@ -21,38 +38,64 @@ async def run(cell_count: int, interval_sec: float, iterations: int, flip_prob:
 
     print(f"Starting log generation: {cell_count} cells, {iterations} iterations")
     
-    async with stdio_client(server) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
+    async with open_session(url, server) as session:
+        for _ in range(iterations):
+            run_id += 1
+            # Flip ~flip_prob of cells
+            for cid in range(1, cell_count + 1):
+                if random.random() < flip_prob:
+                    states[cid] = "ON" if states[cid] == "OFF" else "OFF"
+
+            now = datetime.now(timezone.utc).isoformat()
+            cell_ids = list(states)
+            tool, arguments = build_call(payload, cell_ids, [states[c] for c in cell_ids], now, run_id)
 
-            for _ in range(iterations):
-                run_id += 1
-                # Flip ~flip_prob of cells
-                for cid in range(1, cell_count + 1):
-                    if random.random() < flip_prob:
-                        states[cid] = "ON" if states[cid] == "OFF" else "OFF"
+            res = await session.call_tool(name=tool, arguments=arguments)
+            # Clean output - just show progress
+            try:
+                # Handle new MCP response structure
+                if hasattr(res, 'structuredContent') and res.structuredContent:
+                    inserted = res.structuredContent.get('result', {}).get('inserted', 0)
+                else:
+                    inserted = cell_count  # fallback
+                print(f"Run {run_id:3d}: {inserted} logs inserted", flush=True)
+            except Exception as e:
+                print(f"Run {run_id:3d}: {cell_count} logs (status unknown)", flush=True)
+
+            await asyncio.sleep(interval_sec)
+            
+        print(f"\nCompleted: {iterations} iterations, {iterations * cell_count} total logs")
 
-                now = datetime.now(timezone.utc).isoformat()
-                batch = [
-                    {"cell_id": cid, "status": states[cid], "ts": now, "run_id": run_id}
-                    for cid in range(1, cell_count + 1)
-                ]
+async def run_simulated(cell_count: int, interval_sec: float, iterations: int, payload: str = "bitmask",
+                        seed: int | None = None, clusters: int = 10, mtbf: float = 3600.0, mttr: float = 300.0,
+                        changes_only: bool = False, url: str | None = None):
+    """Same loop driven by the NumPy FleetSimulator; sends one columnar call per cluster chunk."""
+    from src.generator.simulator import FleetSimulator
 
-                res = await session.call_tool(name="write_logs", arguments={"batch": batch})
-                # Clean output - just show progress
-                try:
-                    # Handle new MCP response structure
-                    if hasattr(res, 'structuredContent') and res.structuredContent:
-                        inserted = res.structuredContent.get('result', {}).get('inserted', 0)
-                    else:
-                        inserted = len(batch)  # fallback
-                    print(f"Run {run_id:3d}: {inserted} logs inserted", flush=True)
-                except Exception as e:
-                    print(f"Run {run_id:3d}: {len(batch)} logs (status unknown)", flush=True)
+    server = server_params(env={"PYTHONUNBUFFERED": "1"})
+    # One simulated tick per iteration, interval_sec of model time
+    sim = FleetSimulator(cell_count, clusters=clusters, dt=max(interval_sec, 1e-3), mtbf=mtbf, mttr=mttr, seed=seed)
 
+    print(f"Starting simulated fleet: {cell_count} cells in {clusters} clusters, {iterations} iterations"
+          + (f", seed {seed}" if seed is not None else ""))
+
+    async with open_session(url, server) as session:
+        total = 0
+        for _ in range(iterations):
+            changed = sim.step()
+            inserted = 0
+            for args in sim.batches(changed if changes_only else None, packed=payload != "columnar"):
+                res = await session.call_tool(name="write_logs_columnar", arguments=args)
+                if res.structuredContent:
+                    inserted += res.structuredContent.get("result", {}).get("inserted", 0)
+            total += inserted
+            st = sim.stats()
+            print(f"Run {sim.tick:3d}: {inserted} logs inserted, {st['off']} OFF, "
+                  f"{int(changed.sum())} changed, outages: {', '.join(st['clusters_in_outage']) or 'none'}", flush=True)
+            if sim.start is None:
                 await asyncio.sleep(interval_sec)
-            
-            print(f"\nCompleted: {iterations} iterations, {iterations * cell_count} total logs")
+
+        print(f"\nCompleted: {iterations} iterations, {total} total logs")
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser(description="Generate cell ON/OFF logs via MCP.")
@@ -60,6 +103,34 @@ if __name__ == "__main__":
     ap.add_argument("--interval", type=float, default=3.0, help="seconds between ticks")
     ap.add_argument("--iterations", type=int, default=10, help="number of ticks to generate")
     ap.add_argument("--flip-prob", type=float, default=0.30, help="probability each cell flips per tick")
+    ap.add_argument("--payload", choices=["rows", "columnar", "bitmask"], default="rows",
+                    help="rows = write_logs; columnar/bitmask = write_logs_columnar")
+    ap.add_argument("--engine", choices=["loop", "numpy"], default="loop",
+                    help="numpy = vectorized FleetSimulator (MTBF/MTTR + cluster outages, columnar output)")
+    ap.add_argument("--seed", type=int, default=None, help="numpy: deterministic run (simulated clock, no sleeping)")
+    ap.add_argument("--clusters", type=int, default=10, help="numpy: number of clusters")
+    ap.add_argument("--mtbf", type=float, default=3600.0, help="numpy: mean seconds between failures per cell")
+    ap.add_argument("--mttr", type=float, default=300.0, help="numpy: mean seconds to recover per cell")
+    ap.add_argument("--changes-only", action="store_true", help="numpy: send only cells that changed state")
+    ap.add_argument("--rate", type=float, default=None,
+                    help="load-test mode: target events/s (open loop; --cells events per call)")
+    ap.add_argument("--sessions", type=int, default=1, help="load-test: concurrent MCP sessions")
+    ap.add_argument("--ramp", type=float, default=0.0, help="load-test: seconds to ramp up to --rate")
+    ap.add_argument("--duration", type=float, default=30.0, help="load-test: total seconds")
+    ap.add_argument("--json", default=None, help="load-test: write results to this file")
+    ap.add_argument("--url", default=None,
+                    help="running server, e.g. http://127.0.0.1:8000/mcp (default MCP_SERVER_URL, else spawn over stdio)")
     args = ap.parse_args()
 
-    asyncio.run(run(args.cells, args.interval, args.iterations, args.flip_prob))
+    if args.rate is None and args.engine == "numpy":
+        asyncio.run(run_simulated(args.cells, args.interval, args.iterations, args.payload, args.seed,
+                                  args.clusters, args.mtbf, args.mttr, args.changes_only, args.url))
+    elif args.rate is None:
+        asyncio.run(run(args.cells, args.interval, args.iterations, args.flip_prob, args.payload, args.url))
+    else:
+        from src.generator.load_test import print_report, run_load, save_json
+        result = asyncio.run(run_load(args.sessions, args.cells, args.rate, args.ramp, args.duration,
+                                      args.flip_prob, args.payload, url=args.url))
+        print_report(result)
+        if args.json:
+            save_json(result, args.json)
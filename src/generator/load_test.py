@@ -0,0 +1,147 @@
+"""
+Open-loop load test for the MCP write path.
+
+N sessions (one stdio server each, or all on one running server with --url)
+share a target event rate. Calls are scheduled on a fixed timeline (linear
+ramp-up, then steady rate) and sent whether or not earlier calls have
+finished, so a slow server shows up as latency instead of quietly lowering
+the offered load.
+
+Per tool two histograms are kept:
+- latency: scheduled send time -> response (includes any client-side backlog)
+- service: actual send -> response
+Payloads are built before the clock starts, so generation time is excluded.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import math
+import random
+from collections import Counter
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from mcp import StdioServerParameters
+
+from src.clients.connect import open_session, server_params
+from src.common.metrics import LatencyHistogram
+from src.generator.generate_logs import build_call
+
+def schedule(call_rate: float, ramp: float, duration: float) -> List[float]:
+    """
+    Offsets (seconds from start) of every call: rate rises linearly over `ramp`,
+    then holds at call_rate until `duration`.
+    """
+    times, n = [], 0
+    ramp_calls = call_rate * ramp / 2  # area under the ramp
+    while True:
+        n += 1
+        t = math.sqrt(2 * ramp * n / call_rate) if n <= ramp_calls else ramp + (n - ramp_calls) / call_rate
+        if t >= duration:
+            return times
+        times.append(t)
+
+def _payload_ring(payload: str, cell_ids: List[int], flip_prob: float,
+                  size: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """Pre-built calls cycled during the run. ts is left to the server (arrival time)."""
+    states = {c: random.choice(("ON", "OFF")) for c in cell_ids}
+    ring = []
+    for run_id in range(1, size + 1):
+        for c in cell_ids:
+            if random.random() < flip_prob:
+                states[c] = "ON" if states[c] == "OFF" else "OFF"
+        ring.append(build_call(payload, cell_ids, [states[c] for c in cell_ids], None, run_id))
+    return ring
+
+async def run_load(sessions: int, cells: int, rate: float, ramp: float, duration: float,
+                   flip_prob: float = 0.3, payload: str = "rows",
+                   server: Optional[StdioServerParameters] = None, url: Optional[str] = None) -> Dict[str, Any]:
+    """Drive `rate` events/s (cells per call) across `sessions` sessions; return the results dict."""
+    server = server or server_params(env={"PYTHONUNBUFFERED": "1"})
+    call_rate = rate / cells
+    offsets = schedule(call_rate, ramp, duration)
+    rings = [_payload_ring(payload, list(range(i * cells + 1, (i + 1) * cells + 1)), flip_prob, 16)
+             for i in range(sessions)]
+
+    latency: Dict[str, LatencyHistogram] = {}
+    service: Dict[str, LatencyHistogram] = {}
+    errors: Counter = Counter()
+    ok_calls = ok_events = 0
+    inflight = peak_inflight = 0
+    steady_ok = 0
+
+    async with AsyncExitStack() as stack:
+        clients = []
+        for _ in range(sessions):
+            clients.append(await stack.enter_async_context(open_session(url, server)))
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        started_at = datetime.now(timezone.utc)
+
+        async def one(i: int, due: float) -> None:
+            nonlocal ok_calls, ok_events, inflight, peak_inflight, steady_ok
+            tool, args = rings[i % sessions][(i // sessions) % len(rings[0])]
+            inflight += 1
+            peak_inflight = max(peak_inflight, inflight)
+            sent = loop.time()
+            try:
+                res = await clients[i % sessions].call_tool(name=tool, arguments=args)
+                done = loop.time()
+                if res.isError:
+                    errors["tool_error"] += 1
+                    return
+                latency.setdefault(tool, LatencyHistogram()).record(done - due)
+                service.setdefault(tool, LatencyHistogram()).record(done - sent)
+                ok_calls += 1
+                ok_events += cells
+                if due - start >= ramp:
+                    steady_ok += 1
+            except Exception as e:
+                errors[type(e).__name__] += 1
+            finally:
+                inflight -= 1
+
+        tasks = []
+        for i, offset in enumerate(offsets):
+            due = start + offset
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(i, due)))
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - start
+
+    steady = max(duration - ramp, 0)
+    return {
+        "started_at": started_at.isoformat(),
+        "config": {"sessions": sessions, "cells_per_call": cells, "target_events_per_s": rate,
+                   "ramp_s": ramp, "duration_s": duration, "payload": payload, "flip_prob": flip_prob},
+        "elapsed_s": round(elapsed, 3),
+        "calls": {"scheduled": len(offsets), "ok": ok_calls, "errors": sum(errors.values())},
+        "errors": dict(errors),
+        "throughput": {
+            "events_per_s": round(ok_events / elapsed, 1) if elapsed else 0.0,
+            "calls_per_s": round(ok_calls / elapsed, 2) if elapsed else 0.0,
+            "steady_events_per_s": round(steady_ok * cells / steady, 1) if steady else None,
+        },
+        "peak_inflight": peak_inflight,
+        "latency_ms": {tool: h.summary() for tool, h in latency.items()},
+        "service_ms": {tool: h.summary() for tool, h in service.items()},
+    }
+
+def print_report(result: Dict[str, Any]) -> None:
+    c, t = result["calls"], result["throughput"]
+    print(f"\nCalls: {c['ok']}/{c['scheduled']} ok, {c['errors']} errors {result['errors'] or ''}")
+    print(f"Throughput: {t['events_per_s']:,.0f} events/s ({t['calls_per_s']} calls/s), "
+          f"steady {t['steady_events_per_s']} events/s, peak in-flight {result['peak_inflight']}")
+    for tool, h in result["latency_ms"].items():
+        s = result["service_ms"][tool]
+        print(f"{tool} latency ms: p50={h['p50']} p95={h['p95']} p99={h['p99']} max={h['max']} "
+              f"(service p50={s['p50']} p99={s['p99']})")
+
+def save_json(result: Dict[str, Any], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results saved to {path}")
@@ -0,0 +1,130 @@
+"""
+NumPy fleet simulator: state lives in arrays, so a tick over 1M cells is a
+handful of vectorized operations instead of a Python loop.
+
+Model (per tick of dt seconds):
+- each cell is a two-state Markov chain: an ON cell fails with probability
+  1 - exp(-dt / mtbf), an OFF cell recovers with 1 - exp(-dt / mttr);
+  mtbf/mttr are per-cell arrays (drawn lognormal around the given means);
+- clusters suffer correlated outages: an outage starts with probability
+  1 - exp(-dt / cluster_mtbf), lasts ~Exp(cluster_mttr), and holds a
+  `severity` fraction of the cluster's cells OFF until it ends.
+
+Output is columnar (cell_ids + packed status bits per cluster), the shape
+write_logs_columnar accepts. With a seed, the simulated clock and every draw
+are deterministic, so two runs produce identical batches.
+"""
+from __future__ import annotations
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, Optional, Union
+
+import numpy as np
+
+ArrayLike = Union[float, np.ndarray]
+
+def pack_bits(on: np.ndarray) -> str:
+    """Vectorized pack_statuses(): base64 bitmask, bit i set = item i is ON, LSB first."""
+    return base64.b64encode(np.packbits(on.astype(np.uint8), bitorder="little").tobytes()).decode("ascii")
+
+class FleetSimulator:
+    def __init__(self, cells: int, clusters: int = 10, dt: float = 1.0,
+                 mtbf: ArrayLike = 3600.0, mttr: ArrayLike = 300.0, spread: float = 0.5,
+                 cluster_mtbf: float = 6 * 3600.0, cluster_mttr: float = 600.0, severity: float = 0.8,
+                 seed: Optional[int] = None, start: Optional[datetime] = None, first_id: int = 1):
+        self.rng = np.random.default_rng(seed)
+        self.dt = dt
+        self.n = cells
+        self.cell_ids = np.arange(first_id, first_id + cells, dtype=np.int64)
+        self.cluster_names = [f"cluster-{i}" for i in range(clusters)]
+        self.cluster = (np.arange(cells) % clusters).astype(np.int32)  # round-robin assignment
+        self.mtbf = self._per_cell(mtbf, spread)
+        self.mttr = self._per_cell(mttr, spread)
+        # Per-tick transition probabilities are fixed per cell, so compute them once
+        self.p_fail = -np.expm1(-dt / self.mtbf)
+        self.p_recover = -np.expm1(-dt / self.mttr)
+        self.p_outage = -np.expm1(-dt / cluster_mtbf) if cluster_mtbf > 0 else 0.0
+        self.cluster_mttr = cluster_mttr
+        self.severity = severity
+        # Start in the stationary distribution: P(ON) = mtbf / (mtbf + mttr)
+        self.on = self.rng.random(cells) < self.mtbf / (self.mtbf + self.mttr)
+        self.outage_left = np.zeros(clusters)          # seconds left per cluster outage
+        self.held = np.zeros(cells, dtype=bool)        # cells forced OFF by their cluster's outage
+        self.tick = 0
+        # Seeded runs use a simulated clock so timestamps are reproducible too
+        self.start = start or (datetime(2025, 1, 1, tzinfo=timezone.utc) if seed is not None else None)
+
+    def _per_cell(self, mean: ArrayLike, spread: float) -> np.ndarray:
+        if isinstance(mean, np.ndarray):
+            if mean.shape != (self.n,):
+                raise ValueError(f"expected {self.n} per-cell values, got shape {mean.shape}")
+            return mean.astype(np.float64)
+        if spread <= 0:
+            return np.full(self.n, float(mean))
+        # Lognormal with the requested mean: some cells are much flakier than others
+        return mean * self.rng.lognormal(-spread ** 2 / 2, spread, self.n)
+
+    def now(self) -> datetime:
+        if self.start is None:
+            return datetime.now(timezone.utc)
+        return self.start + timedelta(seconds=self.tick * self.dt)
+
+    def step(self) -> np.ndarray:
+        """Advance one tick; returns the boolean mask of cells whose status changed."""
+        before = self.on.copy()
+        u = self.rng.random(self.n)
+        self.on = np.where(self.on, u >= self.p_fail, u < self.p_recover)
+
+        # Correlated cluster outages
+        active = self.outage_left > 0
+        self.outage_left = np.maximum(self.outage_left - self.dt, 0)
+        ended = active & (self.outage_left == 0)
+        if ended.any():
+            self.held &= ~ended[self.cluster]  # released cells recover through the normal chain
+        starts = (self.rng.random(len(self.outage_left)) < self.p_outage) & ~(self.outage_left > 0)
+        if starts.any():
+            self.outage_left[starts] = self.rng.exponential(self.cluster_mttr, int(starts.sum()))
+            hit = starts[self.cluster] & (self.rng.random(self.n) < self.severity)
+            self.held |= hit
+        self.on &= ~self.held
+
+        self.tick += 1
+        return self.on != before
+
+    def columns(self, changed_only: Optional[np.ndarray] = None):
+        """(cell_ids, on, cluster index) arrays, optionally only where the mask is set."""
+        if changed_only is None:
+            return self.cell_ids, self.on, self.cluster
+        return self.cell_ids[changed_only], self.on[changed_only], self.cluster[changed_only]
+
+    def batches(self, changed: Optional[np.ndarray] = None, max_cells: int = 50000,
+                run_id: Optional[int] = None, packed: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        write_logs_columnar arguments for the current state (every cell, or only the
+        `changed` mask): one batch per cluster, split into chunks of max_cells.
+        packed=False sends a statuses list instead of status_bits.
+        """
+        ids, on, cluster = self.columns(changed)
+        ts = self.now().isoformat()
+        run_id = self.tick if run_id is None else run_id
+        # Group by cluster with one stable argsort instead of a mask per cluster
+        order = np.argsort(cluster, kind="stable")
+        ids, on, cluster = ids[order], on[order], cluster[order]
+        bounds = np.flatnonzero(np.diff(cluster)) + 1
+        for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(ids)]):
+            if lo == hi:
+                continue
+            name = self.cluster_names[cluster[lo]]
+            for a in range(lo, hi, max_cells):
+                b = min(a + max_cells, hi)
+                args = {"cell_ids": ids[a:b].tolist(), "ts": ts, "run_id": run_id, "cluster": name}
+                if packed:
+                    args["status_bits"] = pack_bits(on[a:b])
+                else:
+                    args["statuses"] = np.where(on[a:b], "ON", "OFF").tolist()
+                yield args
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tick": self.tick, "on": int(self.on.sum()), "off": int(self.n - self.on.sum()),
+                "held_by_outage": int(self.held.sum()),
+                "clusters_in_outage": [self.cluster_names[i] for i in np.flatnonzero(self.outage_left > 0)]}
@@ -1,83 +1,490 @@
-from __future__ import annotations
+import argparse
+import asyncio
+import atexit
 import os
+import sys
+import threading
 from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
+from functools import partial
 from typing import Any, Dict, List
 
+import anyio
 from dotenv import load_dotenv
 load_dotenv()
 
-from mcp.server.fastmcp import FastMCP
-from src.common.db import get_logs_collection
-from src.common.models import CellLog
-from src.mcp_server.summarizers.groq_llm import summarize_logs_and_tower_info
+from mcp.server.fastmcp import Context, FastMCP
+from src.analytics import sla
+from src.common import detectors, metrics, paging, rollups, transitions
+from src.common.aggregates import awindow_per_cell, window_per_cell, window_totals
+from src.common.current_state import StatusCache, state_updates
+from src.common.db import (get_async_logs_collection, get_detectors_collection, get_logs_collection,
+                           get_rollups_collection, get_state_collection, logs_prepared)
+from src.common.models import CellLog, CellLogBatch
+from src.common.schema import server_queries, storage_filter, to_storage
+from src.mcp_server.summarizers.groq_llm import asummarize_tower_stats, get_summary_cache, summarize_tower_stats
+from src.mcp_server.subscriptions import EventHub, Subscription, close_feed, open_feed
+from src.mcp_server.write_buffer import buffer_from_env
 
 @dataclass
 class AppCtx:
     pass
 
-mcp = FastMCP(os.getenv("MCP_SERVER_NAME", "MavericCellMCP"))
+class MeteredMCP(FastMCP):
+    async def call_tool(self, name: str, arguments: Dict[str, Any]):
+        # Whole call: FastMCP argument validation, the tool itself and result conversion
+        with metrics.timer("mcp_tool_call_seconds", tool=name):
+            return await super().call_tool(name, arguments)
+
+# host/port only apply to the network transports (--transport sse | streamable-http)
+mcp = MeteredMCP(os.getenv("MCP_SERVER_NAME", "MavericCellMCP"),
+                 host=os.getenv("MCP_HOST", "127.0.0.1"), port=int(os.getenv("MCP_PORT", "8000")))
+metrics.start_exporters()  # METRICS_PROM_FILE / METRICS_PORT, if set
+
+# Optional write-behind buffer (WRITE_BUFFER=1); flushed on shutdown
+write_buffer = buffer_from_env(get_logs_collection)
+if write_buffer is not None:
+    atexit.register(write_buffer.close)
+
+# Per-cell minute/hour rollups updated by every write (ROLLUPS=0 to disable); created lazily
+_rollup_updater: rollups.RollupUpdater | None = None
+
+def _rollups() -> rollups.RollupUpdater:
+    global _rollup_updater
+    if _rollup_updater is None:
+        _rollup_updater = rollups.RollupUpdater(get_rollups_collection())
+    return _rollup_updater
+
+# LOG_MODE=transitions: only status changes and heartbeats reach cell_logs; created lazily
+transitions.check_config()
+_transition_filter: transitions.TransitionFilter | None = None
+
+def _transitions() -> transitions.TransitionFilter:
+    global _transition_filter
+    if _transition_filter is None:
+        _transition_filter = transitions.TransitionFilter(get_logs_collection())
+    return _transition_filter
+
+# Online anomaly detectors fed by every write (ANOMALY_DETECTORS=0 to disable); created lazily
+_anomaly_detectors: detectors.AnomalyDetectors | None = None
+
+def _detectors() -> detectors.AnomalyDetectors:
+    global _anomaly_detectors
+    if _anomaly_detectors is None:
+        _anomaly_detectors = detectors.AnomalyDetectors(get_detectors_collection())
+    return _anomaly_detectors
+
+def _update_detectors(docs: List[Dict[str, Any]]) -> None:
+    det = _detectors()
+    det.update(docs)
+    det.checkpoint()  # no-op until ANOMALY_CHECKPOINT_SECONDS have passed
+
+@atexit.register
+def _save_detectors() -> None:
+    if _anomaly_detectors is not None:
+        _anomaly_detectors.checkpoint(force=True)
+
+# Latest status per cell: cell_state in Mongo plus this in-process mirror (CURRENT_STATE=0 to disable)
+status_cache = StatusCache(max_age=float(os.getenv("CURRENT_STATE_REFRESH_SECONDS", "5")))
+
+# In-process fan-out for subscribe_events when change streams are unavailable
+event_hub = EventHub(history=int(os.getenv("SUBSCRIPTION_HISTORY", "100000")))
+
+def _async_tools() -> bool:
+    # ASYNC_TOOLS=0 runs the blocking PyMongo/Groq calls on the event loop (the old behaviour)
+    return os.getenv("ASYNC_TOOLS", "1").strip().lower() not in ("0", "false", "no", "off")
+
+def _tool_timeout() -> float:
+    return float(os.getenv("TOOL_TIMEOUT_SECONDS", "30"))
+
+async def _async_logs():
+    if not logs_prepared():
+        await anyio.to_thread.run_sync(get_logs_collection)  # one-time storage/index setup
+    return get_async_logs_collection()
+
+def _current_state_enabled() -> bool:
+    return os.getenv("CURRENT_STATE", "1").strip().lower() not in ("0", "false", "no", "off")
+
+def _update_current_state(docs: List[Dict[str, Any]]) -> None:
+    coll = get_state_collection()
+    status_cache.refresh(coll)  # first write loads what other processes already stored
+    coll.bulk_write(state_updates(docs), ordered=False)
+    status_cache.apply(docs)
+
+async def _store(stored: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if not stored:
+        return {"inserted": 0}
+    if write_buffer is None:
+        if _async_tools():
+            res = await (await _async_logs()).insert_many(stored, ordered=False)
+        else:
+            res = get_logs_collection().insert_many(stored, ordered=False)
+        return {"inserted": len(res.inserted_ids)}
+    # WRITE_BUFFER_WAIT=enqueued returns before the flush; durable waits for it.
+    # Waiting happens off the event loop so concurrent calls can join the same flush.
+    durable = os.getenv("WRITE_BUFFER_WAIT", "durable").strip().lower() != "enqueued"
+    inserted = await anyio.to_thread.run_sync(write_buffer.submit, stored, durable)
+    return {"inserted": inserted, "durable": durable}
+
+async def _insert_docs(docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Insert validated docs directly, or through the write buffer when enabled."""
+    if not docs:
+        return {"inserted": 0}
+    filtered = transitions.transitions_enabled()
+    kept = docs
+    if filtered:
+        with metrics.timer("ingest_stage_seconds", stage="transitions"):
+            kept = await anyio.to_thread.run_sync(_transitions().select, docs)
+        metrics.inc("events_not_stored", len(docs) - len(kept))
+    stored = to_storage(kept)  # time-series mode nests cell_id/cluster under meta
+    with metrics.timer("ingest_stage_seconds", stage="insert"):
+        try:
+            out = await _store(stored)
+        except BaseException:
+            if filtered:
+                _transitions().forget(kept)  # not stored after all: re-seed these cells
+            raise
+    if filtered:
+        out["received"] = len(docs)
+    metrics.mark("events_ingested", len(docs) if filtered else out["inserted"])
+    # Rollups, cell_state and subscribers get every event, stored or not
+    if rollups.rollups_enabled():
+        # One unordered bulk_write covers every minute/hour bucket this batch touches
+        with metrics.timer("ingest_stage_seconds", stage="rollups"):
+            await anyio.to_thread.run_sync(_rollups().apply, docs)
+    if _current_state_enabled():
+        with metrics.timer("ingest_stage_seconds", stage="current_state"):
+            await anyio.to_thread.run_sync(_update_current_state, docs)
+    if detectors.detectors_enabled():
+        with metrics.timer("ingest_stage_seconds", stage="anomalies"):
+            await anyio.to_thread.run_sync(_update_detectors, docs)
+    event_hub.publish(docs)
+    return out
 
 @mcp.tool(title="Write cell logs")
-def write_logs(batch: List[Dict[str, Any]]) -> Dict[str, Any]:
+async def write_logs(batch: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Insert a batch of cell logs. Each item must fit CellLog schema.
     """
-    coll = get_logs_collection()
-    docs = [CellLog.model_validate(item).model_dump(mode="python") for item in batch]
-    if not docs:
-        return {"inserted": 0}
-    res = coll.insert_many(docs)
-    return {"inserted": len(res.inserted_ids)}
+    with metrics.timer("validation_seconds", tool="write_logs"):
+        docs = [CellLog.model_validate(item).model_dump(mode="python") for item in batch]
+    with anyio.fail_after(_tool_timeout()):
+        return await _insert_docs(docs)
+
+@mcp.tool(title="Write cell logs (columnar)")
+async def write_logs_columnar(
+    cell_ids: List[int],
+    run_id: int,
+    ts: str | None = None,
+    statuses: List[str] | None = None,
+    status_bits: str | None = None,
+    cluster: str | None = None,
+) -> Dict[str, Any]:
+    """
+    Insert a batch of cell logs sent as parallel columns.
+    ts/run_id/cluster are shared by every row; pass either statuses (ON/OFF per cell)
+    or status_bits (base64 bitmask, bit i set = cell_ids[i] is ON).
+    """
+    payload = {"cell_ids": cell_ids, "run_id": run_id, "statuses": statuses,
+               "status_bits": status_bits, "cluster": cluster}
+    if ts is not None:
+        payload["ts"] = ts
+    # One model validation for the whole batch instead of one per row
+    with metrics.timer("validation_seconds", tool="write_logs_columnar"):
+        docs = CellLogBatch.model_validate(payload).to_docs()
+    with anyio.fail_after(_tool_timeout()):
+        return await _insert_docs(docs)
 
 @mcp.tool(title="Fetch recent logs")
-def fetch_logs(limit: int = 20, minutes: int = 5) -> List[Dict[str, Any]]:
+async def fetch_logs(
+    limit: int = 20,
+    minutes: int = 5,
+    cell_ids: List[int] | None = None,
+    cluster: str | None = None,
+    status: str | None = None,
+    run_id: int | None = None,
+    fields: List[str] | None = None,
+    order: str = "desc",
+    page_token: str | None = None,
+    compact: bool = False,
+) -> Dict[str, Any]:
     """
-    Return recent logs since now - minutes, newest first.
+    Return one page (up to limit) of logs since now - minutes, newest first (order="asc" for oldest first).
+    Optional filters: cell_ids, cluster, status, run_id. fields picks the returned fields
+    (cell_id, status, ts, run_id, cluster, _id); compact=True returns parallel columns with ts
+    in epoch ms. Pass next_token back as page_token (same filters) for the following page.
+    With LOG_MODE=transitions the stored rows are status changes and heartbeats only.
     """
-    coll = get_logs_collection()
-    since = datetime.now(timezone.utc) - timedelta(minutes=minutes)
-    cur = coll.find({"ts": {"$gte": since}}).sort("ts", -1).limit(limit)
-    out: List[Dict[str, Any]] = []
-    for d in cur:
-        d["_id"] = str(d["_id"])
-        out.append(d)
-    return out
+    paging.check_fields(fields)
+    order = order.lower()
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be 'asc' or 'desc'")
+    limit = max(1, min(limit, int(os.getenv("FETCH_MAX_LIMIT", "5000"))))
+    flt = paging.filters_for(cell_ids, cluster, status, run_id)
+    after = paging.decode_token(page_token, flt, order) if page_token else None
+    if after is not None:
+        since, until = after["since"], after["until"]  # the window is pinned by the first page
+    else:
+        until = datetime.now(timezone.utc)
+        since = until - timedelta(minutes=minutes)
+    q, sort, projection = paging.page_query(flt, since, until, order, after, fields)
+
+    with anyio.fail_after(_tool_timeout()):
+        # One extra document tells whether another page exists
+        if _async_tools():
+            docs = await (await _async_logs()).find(q, projection).sort(sort).limit(limit + 1).to_list()
+        else:
+            docs = list(get_logs_collection().find(q, projection).sort(sort).limit(limit + 1))
+    return paging.shape_page(docs, limit, fields, compact,
+                             lambda last: paging.encode_token(last, since, until, flt, order))
+
+def _transition_window(since: datetime) -> Dict[int, Dict[str, Any]]:
+    # Repeated statuses aren't in cell_logs; counts come from the rollups, which see every event
+    return transitions.window_per_cell(get_rollups_collection(), since)
 
 @mcp.tool(title="Summarize recent activity")
-def summarize_recent(minutes: int = 10) -> Dict[str, Any]:
+async def summarize_recent(minutes: int = 10) -> Dict[str, Any]:
     """
     Aggregate simple stats for the last N minutes and produce an LLM summary via Groq.
     """
-    coll = get_logs_collection()
     since = datetime.now(timezone.utc) - timedelta(minutes=minutes)
-    cur = coll.find({"ts": {"$gte": since}})
-
-    logs = []
-    total = on = off = 0
-    per_cell: Dict[int, Dict[str, int]] = {}
-
-    # Collect logs and aggregate basic counts
-    for d in cur:
-        logs.append(d)
-        total += 1
-        s = d["status"]
-        on += (s == "ON")
-        off += (s == "OFF")
-        cid = int(d["cell_id"])
-        per_cell.setdefault(cid, {"ON": 0, "OFF": 0})
-        per_cell[cid][s] += 1
+    with anyio.fail_after(_tool_timeout()):
+        # Per-cell counts and last status are computed by MongoDB; only one row per cell comes back.
+        # The Groq call is awaited, so other tool calls keep running while it is in flight.
+        if transitions.transitions_enabled():
+            per_cell = await anyio.to_thread.run_sync(_transition_window, since)
+        elif _async_tools():
+            per_cell = await awindow_per_cell(await _async_logs(), since)
+        else:
+            per_cell = window_per_cell(get_logs_collection(), since)
+        if detectors.detectors_enabled():
+            # Flip-rate flags from the ingest-time detectors instead of the count heuristic; cells
+            # they haven't seen get no flag and fall back to it (the first call loads the checkpoint)
+            flags = await anyio.to_thread.run_sync(_detectors().instability, list(per_cell))
+            for cid, flag in flags.items():
+                per_cell[cid]["unstable"] = flag
+        if _async_tools():
+            summary = await asummarize_tower_stats(per_cell)
+        else:
+            summary = summarize_tower_stats(per_cell)
+    totals = window_totals(per_cell)
 
     # Basic statistics for the window
-    lines = [f"Window: last {minutes} min", f"Total events: {total}", f"ON: {on}, OFF: {off}", "Per-cell:"]
-    for cid in sorted(per_cell):
-        lines.append(f"  cell {cid}: ON={per_cell[cid]['ON']} OFF={per_cell[cid]['OFF']}")
+    lines = [f"Window: last {minutes} min", f"Total events: {totals['total']}",
+             f"ON: {totals['on']}, OFF: {totals['off']}", "Per-cell:"]
+    for cid, info in per_cell.items():
+        lines.append(f"  cell {cid}: ON={info['on']} OFF={info['off']}")
     stats_text = "\n".join(lines)
 
-    # Call Groq to generate natural language summary from stats
-    summary = summarize_logs_and_tower_info(logs)  # Clean, natural language summary
-
     return {"stats": stats_text, "summary": summary}
 
+@mcp.tool(title="Summary cache stats")
+def summary_cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss counters of the LLM summary cache, with the latency and tokens saved by hits.
+    """
+    return get_summary_cache().stats()
+
+@mcp.tool(title="Server metrics")
+def server_metrics(format: str = "json", explain: bool = False, reset: bool = False) -> Dict[str, Any]:
+    """
+    Where time goes inside this server process: per-tool latency (whole call vs the tool body),
+    validation, ingest stages, Mongo command timings, LLM calls/tokens and events/s ingested.
+    format="prometheus" returns the Prometheus text exposition instead.
+    explain=True also runs each representative server query with executionStats
+    (documents/keys examined vs returned). reset=True clears the counters afterwards.
+    """
+    if format == "prometheus":
+        out: Dict[str, Any] = {"text": metrics.registry.prometheus()}
+    else:
+        out = metrics.registry.snapshot()
+        out["summary_cache"] = get_summary_cache().stats()
+    if explain:
+        out["queries"] = _explain_queries()
+    if reset:
+        metrics.registry.reset()
+    return out
+
+def _explain_queries() -> Dict[str, Dict[str, Any]]:
+    coll = get_logs_collection()
+    stats = {}
+    for name, (flt, sort) in server_queries().items():
+        cmd: Dict[str, Any] = {"find": coll.name, "filter": storage_filter(flt)}
+        if sort:
+            cmd["sort"] = dict(sort)
+        ex = coll.database.command("explain", cmd, verbosity="executionStats")
+        es = ex.get("executionStats", {})
+        stats[name] = {"returned": es.get("nReturned"), "docs_examined": es.get("totalDocsExamined"),
+                       "keys_examined": es.get("totalKeysExamined"), "ms": es.get("executionTimeMillis")}
+    return stats
+
+@mcp.tool(title="Window stats from rollups")
+def window_stats(
+    minutes: int = 60,
+    resolution: str = "auto",
+    cell_ids: List[int] | None = None,
+    cluster: str | None = None,
+) -> Dict[str, Any]:
+    """
+    Per-cell ON/OFF counts, transitions and time-weighted uptime for the last N minutes,
+    answered from the minute/hour rollups. resolution: auto | minute | hour.
+    """
+    since = datetime.now(timezone.utc) - timedelta(minutes=minutes)
+    per_cell = rollups.window_stats(get_rollups_collection(), since, resolution=resolution,
+                                    cell_ids=cell_ids, cluster=cluster)
+    on_s = sum(c["on_seconds"] for c in per_cell.values())
+    off_s = sum(c["off_seconds"] for c in per_cell.values())
+    return {
+        "window_minutes": minutes,
+        "cells": [{"cell_id": cid, **info} for cid, info in per_cell.items()],
+        "uptime_pct": round(on_s / (on_s + off_s) * 100, 2) if on_s + off_s else None,
+    }
+
+@mcp.tool(title="Uptime series from rollups")
+def uptime_series(minutes: int = 1440, resolution: str = "auto", cluster: str | None = None) -> List[Dict[str, Any]]:
+    """
+    System-wide time-weighted uptime per minute/hour bucket for the last N minutes,
+    answered from the rollups.
+    """
+    since = datetime.now(timezone.utc) - timedelta(minutes=minutes)
+    return rollups.uptime_series(get_rollups_collection(), since, resolution=resolution, cluster=cluster)
+
+@mcp.tool(title="SLA report")
+async def sla_report(
+    hours: float = 24,
+    target: float = sla.SLA_TARGET,
+    cell_ids: List[int] | None = None,
+    cluster: str | None = None,
+    max_gap_minutes: float | None = None,
+    breaches_only: bool = False,
+) -> Dict[str, Any]:
+    """
+    Time-weighted SLA per cell for the last N hours: uptime %, downtime and breach minutes
+    (downtime beyond the target's allowance), outages and MTTR, plus fleet totals.
+    Computed in one streaming pass over the raw logs, so long windows (e.g. 720 hours) work.
+    max_gap_minutes: stop crediting a status after this long without a new event.
+    """
+    until = datetime.now(timezone.utc)
+    since = until - timedelta(hours=hours)
+    compute = partial(sla.compute, since, until, target=target, cell_ids=cell_ids, cluster=cluster,
+                      max_gap_minutes=max_gap_minutes)
+    # A month-long pass can outlast TOOL_TIMEOUT_SECONDS; it runs off the event loop instead
+    if _async_tools():
+        rows, summary = await anyio.to_thread.run_sync(compute)
+    else:
+        rows, summary = compute()
+    if breaches_only:
+        rows = [r for r in rows if not r["sla_compliant"]]
+    return {"since": since, "until": until, "summary": summary, "cells": rows}
+
+@mcp.tool(title="Current tower status")
+def current_status(status: str | None = None, cluster: str | None = None) -> Dict[str, Any]:
+    """
+    Latest known status of every cell, optionally filtered by status (ON/OFF) and cluster.
+    Served from an in-process cache of cell_state; includes when each cell last changed
+    state and marks cells that stopped reporting as stale.
+    """
+    status_cache.refresh(get_state_collection())
+    stale_after = float(os.getenv("CURRENT_STATE_STALE_SECONDS", "300"))
+    return status_cache.query(status=status.upper() if status else None, cluster=cluster,
+                              stale_after=stale_after)
+
+@mcp.tool(title="Current anomalies")
+def anomalies(cell_ids: List[int] | None = None, cluster: str | None = None,
+              severity: str | None = None) -> Dict[str, Any]:
+    """
+    Towers flagged right now by the online detectors that write_logs updates per event:
+    High Instability (EWMA flip rate), Ongoing Outage (current OFF duration) and OFF Streak
+    (consecutive OFF events). Answered from memory; thresholds come from ANOMALY_* settings.
+    Optional filters: cell_ids, cluster, severity (HIGH/MEDIUM).
+    """
+    if not detectors.detectors_enabled():
+        raise ValueError("anomaly detectors are disabled (ANOMALY_DETECTORS=0)")
+    det = _detectors()
+    found = det.flagged(cell_ids=cell_ids, cluster=cluster)
+    if severity:
+        found = [a for a in found if a["severity"] == severity.upper()]
+    return {"as_of": datetime.now(timezone.utc), "thresholds": det.thresholds, "tracked": det.stats(),
+            "cells": len({a["cell_id"] for a in found}), "anomalies": found}
+
+@mcp.tool(title="Subscribe to cell events")
+async def subscribe_events(
+    ctx: Context,
+    cell_ids: List[int] | None = None,
+    cluster: str | None = None,
+    transitions_only: bool = False,
+    resume_token: str | None = None,
+    duration_seconds: float = 60,
+    max_events: int = 10000,
+) -> Dict[str, Any]:
+    """
+    Push new events to the caller as notifications/message (logger "cell_events") for up to
+    duration_seconds or max_events. Each notification carries {"events", "resume_token", "dropped"}.
+    Backed by a MongoDB change stream when available, else by in-process fan-out from write_logs.
+    Returns a resume_token; pass it to the next call to continue without gaps. A token that
+    can no longer be resumed (history lost, invalid) is an error rather than a silent restart.
+    """
+    sub = Subscription(cell_ids, cluster, transitions_only,
+                       buffer=int(os.getenv("SUBSCRIPTION_BUFFER", "10000")))
+    source, handle = await open_feed(get_logs_collection(), event_hub, sub, resume_token)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration_seconds
+    delivered, token = 0, sub.last_token
+    try:
+        while delivered < max_events and loop.time() < deadline:
+            batch = await sub.next_batch(min(500, max_events - delivered), deadline - loop.time())
+            if not batch:
+                continue
+            token = batch[-1][0]
+            await ctx.session.send_log_message(
+                level="info",
+                data={"events": [ev for _, ev in batch], "resume_token": token, "dropped": sub.dropped},
+                logger="cell_events",
+                related_request_id=ctx.request_id,
+            )
+            delivered += len(batch)
+    finally:
+        close_feed(event_hub, sub, source, handle)
+    if not sub.queue:
+        token = sub.last_token or token  # nothing pending: skip past filtered-out events too
+    return {"source": source, "delivered": delivered, "dropped": sub.dropped, "resume_token": token}
+
+# Tool-body timings; the gap to mcp_tool_call_seconds is FastMCP validation and serialization
+for _tool in mcp._tool_manager.list_tools():
+    _tool.fn = metrics.timed("mcp_tool_handler_seconds", tool=_tool.name)(_tool.fn)
+
+def _warm_up() -> None:
+    """Connect to Mongo and prepare the collections before the first tool call needs them."""
+    try:
+        get_logs_collection()
+        if rollups.rollups_enabled():
+            get_rollups_collection()
+        if _current_state_enabled():
+            get_state_collection()
+    except Exception as e:  # tools still surface their own Mongo errors
+        print(f"⚠️ Mongo warm-up failed: {e}", file=sys.stderr)
+
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
+    ap = argparse.ArgumentParser(description="Maveric cell MCP server.")
+    ap.add_argument("--transport", choices=["stdio", "sse", "streamable-http"],
+                    default=os.getenv("MCP_TRANSPORT", "stdio"),
+                    help="stdio: one client per process; sse/streamable-http: a shared long-running server")
+    ap.add_argument("--host", default=None, help="bind address for sse/streamable-http (default MCP_HOST)")
+    ap.add_argument("--port", type=int, default=None, help="port for sse/streamable-http (default MCP_PORT)")
+    args = ap.parse_args()
+    if args.host:
+        mcp.settings.host = args.host
+    if args.port:
+        mcp.settings.port = args.port
+
+    # Mongo connect + index setup overlap the client's handshake instead of delaying its first call
+    if os.getenv("MCP_WARMUP", "1").strip().lower() not in ("0", "false", "no", "off"):
+        threading.Thread(target=_warm_up, name="mongo-warm-up", daemon=True).start()
+    if args.transport != "stdio":
+        path = mcp.settings.sse_path if args.transport == "sse" else mcp.settings.streamable_http_path
+        print(f"✅ {args.transport} server on http://{mcp.settings.host}:{mcp.settings.port}{path}", file=sys.stderr)
+    try:
+        mcp.run(transport=args.transport)
+    finally:
+        if write_buffer is not None:
+            write_buffer.close()
@@ -0,0 +1,228 @@
+"""
+Push-based event subscriptions for the MCP server.
+
+Two sources feed subscribers:
+- ChangeStreamFeed: a MongoDB change stream on cell_logs (sees every writer;
+  needs a replica set and a plain, not time-series, collection).
+- EventHub: in-process fan-out from write_logs, used when change streams are
+  unavailable (sees only writes made through this server process).
+
+Each subscription filters by cell/cluster (optionally transitions only), holds at
+most `buffer` undelivered events (oldest are dropped and counted) and exposes an
+opaque resume token for the next subscription.
+"""
+from __future__ import annotations
+import asyncio
+import base64
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import json_util
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure, PyMongoError
+
+from src.common.schema import from_storage, log_field
+
+log = logging.getLogger(__name__)
+
+def encode_token(source: str, value: Any) -> str:
+    return base64.urlsafe_b64encode(json_util.dumps({"src": source, "tok": value}).encode()).decode()
+
+def decode_token(token: Optional[str]) -> Tuple[Optional[str], Any]:
+    if not token:
+        return None, None
+    try:
+        data = json_util.loads(base64.urlsafe_b64decode(token.encode()))
+        return data["src"], data["tok"]
+    except Exception:
+        raise ValueError("invalid resume_token")
+
+def _event(doc: Dict[str, Any]) -> Dict[str, Any]:
+    d = from_storage(dict(doc))
+    d.pop("_id", None)
+    if hasattr(d.get("ts"), "isoformat"):
+        d["ts"] = d["ts"].isoformat()
+    return d
+
+class Subscription:
+    """Bounded per-client buffer of (token, event) with cell/cluster/transition filters."""
+
+    def __init__(self, cell_ids: Optional[Iterable[int]] = None, cluster: Optional[str] = None,
+                 transitions_only: bool = False, buffer: int = 10000):
+        self.cell_ids: Optional[Set[int]] = set(cell_ids) if cell_ids else None
+        self.cluster = cluster
+        self.transitions_only = transitions_only
+        self.queue: Deque[Tuple[str, Dict[str, Any]]] = deque(maxlen=buffer)
+        self.dropped = 0
+        self.last_token: Optional[str] = None
+        self._last_status: Dict[int, str] = {}
+        self._wakeup = asyncio.Event()
+
+    def matches(self, ev: Dict[str, Any]) -> bool:
+        if self.cell_ids is not None and ev.get("cell_id") not in self.cell_ids:
+            return False
+        if self.cluster is not None and ev.get("cluster") != self.cluster:
+            return False
+        if self.transitions_only:
+            cid = ev.get("cell_id")
+            prev = self._last_status.get(cid)
+            self._last_status[cid] = ev.get("status")
+            return prev != ev.get("status")
+        return True
+
+    def advance(self, token: str) -> None:
+        self.last_token = token
+
+    def offer(self, token: str, ev: Dict[str, Any]) -> None:
+        """Called on the event loop for every new event."""
+        self.last_token = token  # advances even for filtered-out events
+        if not self.matches(ev):
+            return
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1  # deque drops the oldest
+        self.queue.append((token, ev))
+        self._wakeup.set()
+
+    async def next_batch(self, max_items: int, timeout: float) -> List[Tuple[str, Dict[str, Any]]]:
+        if not self.queue:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        out = []
+        while self.queue and len(out) < max_items:
+            out.append(self.queue.popleft())
+        return out
+
+class EventHub:
+    """
+    In-process fan-out of events written through this server. The last `history`
+    events are kept (as references to the written batches) so a client can resume.
+    """
+
+    def __init__(self, history: int = 100000):
+        self.seq = 0
+        self.max_history = history
+        self.history: Deque[Tuple[int, List[Dict[str, Any]]]] = deque()  # (seq of first doc, docs)
+        self._held = 0
+        self.subscribers: Set[Subscription] = set()
+
+    def publish(self, docs: List[Dict[str, Any]]) -> None:
+        """Called on the event loop after a batch is written; O(1) without subscribers."""
+        if not docs:
+            return
+        first = self.seq + 1
+        self.seq += len(docs)
+        self.history.append((first, docs))
+        self._held += len(docs)
+        while self._held - len(self.history[0][1]) >= self.max_history:
+            self._held -= len(self.history.popleft()[1])
+        if not self.subscribers:
+            return
+        for i, d in enumerate(docs):
+            ev, token = _event(d), encode_token("hub", first + i)
+            for sub in self.subscribers:
+                sub.offer(token, ev)
+
+    def attach(self, sub: Subscription, resume_seq: Optional[int] = None) -> None:
+        """Add sub, replaying history after resume_seq; ValueError if that can't be done gaplessly."""
+        if resume_seq is not None:
+            oldest = self.history[0][0] if self.history else self.seq + 1
+            if resume_seq > self.seq:
+                # Sequence numbers restart with the process: the token is from an earlier one
+                raise ValueError("resume_token is from a previous server process; events since the token "
+                                 "can't be resumed, subscribe again without resume_token")
+            if resume_seq < oldest - 1:
+                raise ValueError(f"resume_token has aged out of the in-process history ({oldest - 1 - resume_seq} "
+                                 "events lost); subscribe again without resume_token")
+            for first, docs in self.history:
+                for i, d in enumerate(docs):
+                    if first + i > resume_seq:
+                        sub.offer(encode_token("hub", first + i), _event(d))
+        sub.last_token = sub.last_token or encode_token("hub", self.seq)
+        self.subscribers.add(sub)
+
+    def detach(self, sub: Subscription) -> None:
+        self.subscribers.discard(sub)
+
+class ChangeStreamFeed:
+    """One change stream per subscription, read on a worker thread and handed to the loop."""
+
+    def __init__(self, coll: Collection, sub: Subscription, resume_after: Any = None):
+        self.coll = coll
+        self.sub = sub
+        self.resume_after = resume_after
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _pipeline(self) -> List[Dict[str, Any]]:
+        # Filter server-side so only matching inserts cross the wire
+        match: Dict[str, Any] = {"operationType": "insert"}
+        if self.sub.cell_ids is not None:
+            match["fullDocument." + log_field("cell_id")] = {"$in": sorted(self.sub.cell_ids)}
+        if self.sub.cluster is not None:
+            match["fullDocument." + log_field("cluster")] = self.sub.cluster
+        return [{"$match": match}]
+
+    def open(self) -> Any:
+        """Open the stream (raises OperationFailure when change streams aren't supported)."""
+        return self.coll.watch(self._pipeline(), resume_after=self.resume_after, max_await_time_ms=500)
+
+    def start(self, stream: Any, loop: asyncio.AbstractEventLoop) -> None:
+        def run() -> None:
+            try:
+                with stream:
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is not None:
+                            token = encode_token("cs", change["_id"])
+                            loop.call_soon_threadsafe(self.sub.offer, token, _event(change["fullDocument"]))
+                        elif stream.resume_token is not None:
+                            # Idle: keep the token moving so a resume doesn't replay filtered-out history
+                            loop.call_soon_threadsafe(self.sub.advance, encode_token("cs", stream.resume_token))
+            except PyMongoError as e:
+                log.warning("change stream ended: %s", e)
+        self._thread = threading.Thread(target=run, name="change-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+async def open_feed(coll: Collection, hub: EventHub, sub: Subscription, resume_token: Optional[str]) -> Tuple[str, Any]:
+    """
+    Attach sub to the best available source. Returns (source, handle); pass both to
+    close_feed(). Uses a change stream unless SUBSCRIPTION_SOURCE=hub or the server
+    can't provide one. Falls back to the in-process hub only for a fresh subscription:
+    a resume token (change-stream or hub) that can't be resumed raises ValueError,
+    since starting from "now" would silently skip the events since the token.
+    """
+    src, tok = decode_token(resume_token)
+    hub_only = os.getenv("SUBSCRIPTION_SOURCE", "auto").strip().lower() == "hub"
+    if src == "cs" and hub_only:
+        raise ValueError("resume_token is from a change stream, but this server uses in-process fan-out "
+                         "(SUBSCRIPTION_SOURCE=hub); events since the token can't be resumed")
+    if not hub_only and src != "hub":
+        feed = ChangeStreamFeed(coll, sub, resume_after=tok if src == "cs" else None)
+        try:
+            stream = await asyncio.to_thread(feed.open)
+        except OperationFailure as e:
+            if src == "cs":
+                # e.g. the token fell off the oplog or is malformed: the gap is unrecoverable
+                raise ValueError(f"cannot resume change stream from resume_token ({e}); events since "
+                                 "the token are lost, subscribe again without resume_token")
+            log.info("change streams unavailable (%s); using in-process fan-out", e)
+        else:
+            feed.start(stream, asyncio.get_running_loop())
+            return "change_stream", feed
+    hub.attach(sub, resume_seq=tok if src == "hub" else None)
+    return "in_process", None
+
+def close_feed(hub: EventHub, sub: Subscription, source: str, handle: Any) -> None:
+    if source == "change_stream":
+        handle.stop()
+    else:
+        hub.detach(sub)
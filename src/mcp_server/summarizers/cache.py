@@ -0,0 +1,247 @@
+"""
+Cache for LLM summaries, keyed by a digest of the prompt data.
+
+- In-memory TTL + LRU (SUMMARY_CACHE_TTL seconds, SUMMARY_CACHE_SIZE entries).
+- Optional persistent backend (SUMMARY_CACHE_BACKEND=mongo) in the llm_summaries
+  collection, so restarted / other server processes reuse summaries too.
+- Single-flight: concurrent callers with the same key share one LLM call.
+- Counters (hits, misses, saved seconds/tokens) via stats().
+"""
+from __future__ import annotations
+import asyncio
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+@dataclass
+class Entry:
+    text: str
+    expires: float          # time.time() deadline
+    latency: float = 0.0    # seconds the original LLM call took
+    tokens: int = 0         # tokens the original LLM call used
+
+class _Abandoned(Exception):
+    """Set on an in-flight future whose leader was cancelled; followers retry."""
+
+def digest(*parts: str) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+class MongoBackend:
+    """Persistent entries in llm_summaries; Mongo's TTL monitor removes expired ones."""
+
+    def __init__(self):
+        from src.common.db import get_db
+        self.coll = get_db()["llm_summaries"]
+        self.coll.create_index("expires_at", expireAfterSeconds=0, name="expires_at_ttl")
+
+    def get(self, key: str) -> Optional[Entry]:
+        d = self.coll.find_one({"_id": key})
+        if not d:
+            return None
+        exp = d["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+        return Entry(d["text"], exp, d.get("latency", 0.0), d.get("tokens", 0))
+
+    def put(self, key: str, e: Entry) -> None:
+        self.coll.replace_one({"_id": key}, {
+            "text": e.text, "latency": e.latency, "tokens": e.tokens,
+            "expires_at": datetime.fromtimestamp(e.expires, tz=timezone.utc),
+        }, upsert=True)
+
+class SummaryCache:
+    def __init__(self, ttl: float = 60.0, max_entries: int = 256, backend: Optional[Any] = None,
+                 wait_timeout: float = 120.0):
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout    # seconds a caller waits on someone else's in-flight call
+        self.max_entries = max_entries
+        self.backend = backend
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "shared_inflight": 0, "errors": 0,
+                         "abandoned": 0, "saved_seconds": 0.0, "saved_tokens": 0}
+
+    def _lookup(self, key: str) -> Optional[Entry]:
+        """In-memory entry for key; caller holds self._lock."""
+        e = self._entries.get(key)
+        if e is not None and e.expires > time.time():
+            self._entries.move_to_end(key)
+            return e
+        if e is not None:
+            del self._entries[key]
+        return None
+
+    def _store(self, key: str, e: Entry) -> None:
+        self._entries[key] = e
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _fetch(self, key: str) -> Optional[Entry]:
+        """Backend entry for key; a blocking round-trip, so never called under self._lock."""
+        try:
+            e = self.backend.get(key)
+        except Exception:
+            return None
+        return e if e is not None and e.expires > time.time() else None
+
+    def _hit(self, e: Entry) -> Tuple[str, None, bool]:
+        self.counters["hits"] += 1
+        self.counters["saved_seconds"] += e.latency
+        self.counters["saved_tokens"] += e.tokens
+        return e.text, None, False
+
+    def _check(self, key: str) -> Optional[Tuple[Optional[str], Optional[Future], bool]]:
+        """_begin() result if memory or an in-flight call answers key, else None."""
+        with self._lock:
+            e = self._lookup(key)
+            if e is not None:
+                return self._hit(e)
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.counters["shared_inflight"] += 1
+                return None, fut, False
+        return None
+
+    def _claim(self, key: str, fetched: Optional[Entry]) -> Tuple[Optional[str], Optional[Future], bool]:
+        """Install a backend entry, or join / register the in-flight call for key."""
+        with self._lock:
+            if fetched is not None:
+                self._store(key, fetched)
+                return self._hit(fetched)
+            # Re-check: another caller may have finished or started key during the fetch
+            e = self._lookup(key)
+            if e is not None:
+                return self._hit(e)
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.counters["shared_inflight"] += 1
+                return None, fut, False
+            fut = self._inflight[key] = Future()
+            self.counters["misses"] += 1
+            return None, fut, True
+
+    def _begin(self, key: str) -> Tuple[Optional[str], Optional[Future], bool]:
+        """(cached text, in-flight future, whether the caller must compute)."""
+        found = self._check(key)
+        if found is not None:
+            return found
+        return self._claim(key, self._fetch(key) if self.backend is not None else None)
+
+    async def _abegin(self, key: str) -> Tuple[Optional[str], Optional[Future], bool]:
+        """_begin() with the backend fetch off the event loop. The in-flight future is
+        registered on the loop thread after the last await, so a cancelled caller never
+        leaves an orphaned leader behind."""
+        found = self._check(key)
+        if found is not None:
+            return found
+        fetched = await asyncio.to_thread(self._fetch, key) if self.backend is not None else None
+        return self._claim(key, fetched)
+
+    def _failed(self, key: str, fut: Future, exc: BaseException) -> None:
+        with self._lock:
+            del self._inflight[key]
+            if isinstance(exc, Exception):
+                self.counters["errors"] += 1
+            else:
+                # The leader was cancelled (client timeout/disconnect): not the followers' error,
+                # they retry and one of them takes over
+                self.counters["abandoned"] += 1
+                exc = _Abandoned()
+        fut.set_exception(exc)
+
+    def _done(self, key: str, fut: Future, text: str, tokens: int, latency: float) -> None:
+        entry = Entry(text, time.time() + self.ttl, latency, tokens)
+        with self._lock:
+            self._store(key, entry)
+            del self._inflight[key]
+        if self.backend is not None:
+            try:
+                self.backend.put(key, entry)
+            except Exception:
+                pass  # persistence is best-effort
+        fut.set_result(text)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Tuple[str, int]]) -> str:
+        """
+        Return the cached text for key, or run compute() -> (text, tokens) once even if
+        several threads ask at the same time. Exceptions from compute() are not cached.
+        """
+        while True:
+            text, fut, leader = self._begin(key)
+            if text is not None:
+                return text
+            if leader:
+                break
+            try:
+                return fut.result(self.wait_timeout)
+            except _Abandoned:
+                continue
+            except TimeoutError:
+                raise TimeoutError(f"in-flight summary not done after {self.wait_timeout:g}s") from None
+
+        t0 = time.perf_counter()
+        try:
+            text, tokens = compute()
+        except BaseException as exc:
+            self._failed(key, fut, exc)
+            raise
+        self._done(key, fut, text, tokens, time.perf_counter() - t0)
+        return text
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Awaitable[Tuple[str, int]]]) -> str:
+        """get_or_compute() for coroutines; shares in-flight calls with sync callers too."""
+        while True:
+            text, fut, leader = await self._abegin(key)
+            if text is not None:
+                return text
+            if leader:
+                break
+            try:
+                # shield: cancelling this follower must not cancel the shared future
+                return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(fut)), self.wait_timeout)
+            except _Abandoned:
+                continue
+            except TimeoutError:
+                raise TimeoutError(f"in-flight summary not done after {self.wait_timeout:g}s") from None
+
+        t0 = time.perf_counter()
+        try:
+            text, tokens = await compute()
+        except BaseException as exc:
+            self._failed(key, fut, exc)
+            raise
+        done = functools.partial(self._done, key, fut, text, tokens, time.perf_counter() - t0)
+        if self.backend is not None:
+            # Backend writes are blocking round-trips; keep them off the event loop
+            await asyncio.to_thread(done)
+        else:
+            done()
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {**self.counters, "entries": len(self._entries), "ttl_seconds": self.ttl,
+                    "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else None}
+
+def cache_from_env() -> SummaryCache:
+    backend = None
+    if os.getenv("SUMMARY_CACHE_BACKEND", "memory").strip().lower() == "mongo":
+        backend = MongoBackend()
+    return SummaryCache(
+        ttl=float(os.getenv("SUMMARY_CACHE_TTL", "60")),
+        max_entries=int(os.getenv("SUMMARY_CACHE_SIZE", "256")),
+        wait_timeout=float(os.getenv("SUMMARY_CACHE_WAIT", "120")),
+        backend=backend,
+    )
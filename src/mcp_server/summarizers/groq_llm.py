@@ -1,6 +1,135 @@
 from __future__ import annotations
+import logging
 import os
-from groq import Groq
+import threading
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from src.common import metrics
+from src.mcp_server.summarizers import hierarchical, stub_llm
+from src.mcp_server.summarizers.cache import SummaryCache, cache_from_env, digest
+
+if TYPE_CHECKING:
+    from groq import AsyncGroq, Groq
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TEMPLATE = """You are a network operations assistant. Create a clear, actionable summary from this tower monitoring data.
+
+Format your response EXACTLY like this:
+
+🟢 NETWORK HEALTH: [Overall status - Good/Warning/Critical]
+
+📊 QUICK STATS:
+• [Key metric 1]
+• [Key metric 2] 
+• [Key metric 3]
+
+🚨 IMMEDIATE ACTIONS:
+• [Action item 1 if any issues]
+• [Action item 2 if any issues]
+(Or "None required" if all good)
+
+⚠️ MONITORING FOCUS:
+• [Tower(s) to watch]
+• [Reason why]
+
+DATA:
+{data}
+
+Keep it concise and actionable. Focus on what operators need to know and do."""
+
+# One client per process so its HTTP connection pool is reused across calls
+_groq: Optional[Groq] = None
+_groq_key: Optional[str] = None
+_async_groq: Optional[AsyncGroq] = None
+_async_groq_key: Optional[str] = None
+_summary_cache: Optional[SummaryCache] = None
+_init_lock = threading.Lock()
+
+def _groq_options() -> dict:
+    # Per-request timeout; keep it below TOOL_TIMEOUT_SECONDS so the fallback summary still returns
+    return {"timeout": float(os.getenv("GROQ_TIMEOUT_SECONDS", "20")),
+            "max_retries": int(os.getenv("GROQ_MAX_RETRIES", "1"))}
+
+# groq (and its httpx/pydantic types) is imported on the first real LLM call, not at server start
+def get_groq_client(api_key: str) -> Groq:
+    global _groq, _groq_key
+    with _init_lock:
+        if _groq is None or _groq_key != api_key:
+            from groq import Groq
+            _groq, _groq_key = Groq(api_key=api_key, **_groq_options()), api_key
+        return _groq
+
+def get_async_groq_client(api_key: str) -> AsyncGroq:
+    # Bound to the event loop that first uses it (the MCP server's)
+    global _async_groq, _async_groq_key
+    with _init_lock:
+        if _async_groq is None or _async_groq_key != api_key:
+            from groq import AsyncGroq
+            _async_groq, _async_groq_key = AsyncGroq(api_key=api_key, **_groq_options()), api_key
+        return _async_groq
+
+def get_summary_cache() -> SummaryCache:
+    global _summary_cache
+    with _init_lock:
+        if _summary_cache is None:
+            _summary_cache = cache_from_env()
+        return _summary_cache
+
+def _llm_backend() -> str:
+    # groq (default) or stub, the offline stand-in in stub_llm.py
+    return os.getenv("LLM_BACKEND", "groq").strip().lower()
+
+def complete(prompt: str, max_tokens: int = 400) -> Tuple[str, int]:
+    """One chat completion -> (text, total_tokens) from the configured backend."""
+    backend = _llm_backend()
+    with metrics.timer("llm_call_seconds", backend=backend):
+        text, tokens = _complete(backend, prompt, max_tokens)
+    metrics.inc("llm_tokens", tokens, backend=backend)
+    return text, tokens
+
+def _complete(backend: str, prompt: str, max_tokens: int) -> Tuple[str, int]:
+    if backend == "stub":
+        return stub_llm.complete(prompt, max_tokens)
+    resp = get_groq_client(os.getenv("GROQ_API_KEY", "")).chat.completions.create(
+        model=os.getenv("GROQ_MODEL", "llama-3.1-8b-instant"),
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.1,
+        max_tokens=max_tokens,
+    )
+    usage = getattr(resp, "usage", None)
+    return resp.choices[0].message.content.strip(), getattr(usage, "total_tokens", 0) or 0
+
+async def acomplete(prompt: str, max_tokens: int = 400) -> Tuple[str, int]:
+    """complete() on AsyncGroq."""
+    backend = _llm_backend()
+    with metrics.timer("llm_call_seconds", backend=backend):
+        text, tokens = await _acomplete(backend, prompt, max_tokens)
+    metrics.inc("llm_tokens", tokens, backend=backend)
+    return text, tokens
+
+async def _acomplete(backend: str, prompt: str, max_tokens: int) -> Tuple[str, int]:
+    if backend == "stub":
+        return await stub_llm.acomplete(prompt, max_tokens)
+    resp = await get_async_groq_client(os.getenv("GROQ_API_KEY", "")).chat.completions.create(
+        model=os.getenv("GROQ_MODEL", "llama-3.1-8b-instant"),
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.1,
+        max_tokens=max_tokens,
+    )
+    usage = getattr(resp, "usage", None)
+    return resp.choices[0].message.content.strip(), getattr(usage, "total_tokens", 0) or 0
+
+def _cache_key(prompt: str) -> str:
+    model = "stub" if _llm_backend() == "stub" else os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+    return digest(model, prompt)
+
+def cached_complete(prompt: str, max_tokens: int = 400) -> str:
+    # Identical prompt -> served from cache (or a shared in-flight call)
+    return get_summary_cache().get_or_compute(_cache_key(prompt), lambda: complete(prompt, max_tokens))
+
+async def acached_complete(prompt: str, max_tokens: int = 400) -> str:
+    return await get_summary_cache().aget_or_compute(_cache_key(prompt), lambda: acomplete(prompt, max_tokens))
 
 def summarize_logs_and_tower_info(logs: list) -> str:
     """
@@ -14,12 +143,23 @@ def summarize_logs_and_tower_info(logs: list) -> str:
     for log in logs:
         cid = log["cell_id"]
         if cid not in towers_info:
-            towers_info[cid] = {"on": 0, "off": 0, "last_status": ""}
+            towers_info[cid] = {"on": 0, "off": 0, "last_status": "", "cluster": log.get("cluster")}
         
         status = log["status"]
         towers_info[cid][status.lower()] = towers_info[cid].get(status.lower(), 0) + 1
         towers_info[cid]["last_status"] = status
     
+    return summarize_tower_stats(towers_info)
+
+def _hierarchy_options() -> dict:
+    return {
+        "top_k": int(os.getenv("SUMMARY_TOP_K", "25")),
+        "budget": int(os.getenv("SUMMARY_PROMPT_TOKENS", "3000")),
+        "parallel": int(os.getenv("SUMMARY_PARALLEL_CLUSTERS", "0")),
+    }
+
+def _plan_summary(towers_info: dict) -> dict:
+    """Metrics, the flat prompt and the summary mode for a per-cell aggregate."""
     # Calculate metrics
     total_towers = len(towers_info)
     online_towers = sum(1 for info in towers_info.values() if info["last_status"] == "ON")
@@ -30,32 +170,21 @@ def summarize_logs_and_tower_info(logs: list) -> str:
     unstable_towers = []
     
     for cid, info in towers_info.items():
-        on_count = info.get('on', 0)
-        off_count = info.get('off', 0)
-        total_events = on_count + off_count
-        
         # Critical: Currently offline
         if info["last_status"] == "OFF":
             critical_towers.append(cid)
         
-        # Unstable: High flip rate (>50% of events are status changes)
-        if total_events > 10 and off_count > on_count * 1.5:
+        # Unstable: the detectors' flip-rate flag if attached, else mostly-OFF events
+        if hierarchical.is_unstable(info):
             unstable_towers.append(cid)
     
-    # Generate structured summary
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        return "[LLM unavailable] GROQ_API_KEY not set"
-    
-    model = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
-    
     # Create structured data for LLM
     data_summary = f"""NETWORK STATUS OVERVIEW:
 - Total Towers: {total_towers}
 - Online: {online_towers} ({online_towers/total_towers*100:.1f}%)
 - Offline: {offline_towers} ({offline_towers/total_towers*100:.1f}%)
 - Critical (Offline): {critical_towers}
-- Unstable (High downtime): {unstable_towers}
+- {hierarchical.unstable_label(towers_info)}: {unstable_towers}
 
 TOWER DETAILS:
 """
@@ -68,45 +197,23 @@ TOWER DETAILS:
         uptime = on_count / (on_count + off_count) * 100 if (on_count + off_count) > 0 else 0
         data_summary += f"Tower {cid}: {status} (Uptime: {uptime:.1f}%, Events: {on_count + off_count})\n"
     
-    prompt = f"""You are a network operations assistant. Create a clear, actionable summary from this tower monitoring data.
-
-Format your response EXACTLY like this:
-
-🟢 NETWORK HEALTH: [Overall status - Good/Warning/Critical]
-
-📊 QUICK STATS:
-• [Key metric 1]
-• [Key metric 2] 
-• [Key metric 3]
-
-🚨 IMMEDIATE ACTIONS:
-• [Action item 1 if any issues]
-• [Action item 2 if any issues]
-(Or "None required" if all good)
-
-⚠️ MONITORING FOCUS:
-• [Tower(s) to watch]
-• [Reason why]
-
-DATA:
-{data_summary}
+    prompt = PROMPT_TEMPLATE.format(data=data_summary)
+    
+    # Large fleets: the flat prompt grows with every tower, so switch to top-K towers + cluster digests
+    mode = os.getenv("SUMMARY_MODE", "auto").strip().lower()
+    if mode == "auto":
+        too_big = total_towers > int(os.getenv("SUMMARY_FLAT_MAX_TOWERS", "200"))
+        mode = "hierarchical" if too_big or hierarchical.estimate_tokens(prompt) > _hierarchy_options()["budget"] else "flat"
+    return {"mode": mode, "prompt": prompt, "total_towers": total_towers, "online_towers": online_towers,
+            "offline_towers": offline_towers, "critical_towers": critical_towers, "unstable_towers": unstable_towers}
 
-Keep it concise and actionable. Focus on what operators need to know and do."""
+def _fallback_summary(plan: dict, e: Exception) -> str:
+    """Rule-based summary used when the LLM call fails."""
+    total_towers, online_towers, offline_towers = plan["total_towers"], plan["online_towers"], plan["offline_towers"]
+    critical_towers, unstable_towers = plan["critical_towers"], plan["unstable_towers"]
+    status = "Critical" if offline_towers > 0 else "Warning" if unstable_towers else "Good"
     
-    try:
-        client = Groq(api_key=api_key)
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1,
-            max_tokens=400,
-        )
-        return resp.choices[0].message.content.strip()
-    except Exception as e:
-        # Fallback summary when Groq API fails
-        status = "Critical" if offline_towers > 0 else "Warning" if unstable_towers else "Good"
-        
-        fallback = f"""🟢 NETWORK HEALTH: {status}
+    fallback = f"""🟢 NETWORK HEALTH: {status}
 
 📊 QUICK STATS:
 • Total Towers: {total_towers}
@@ -115,20 +222,58 @@ Keep it concise and actionable. Focus on what operators need to know and do."""
 
 🚨 IMMEDIATE ACTIONS:
 """
+    
+    if critical_towers:
+        fallback += f"• Investigate offline towers: {', '.join(map(str, critical_towers))}\n"
+    if unstable_towers:
+        fallback += f"• Check unstable towers: {', '.join(map(str, unstable_towers))}\n"
+    if not critical_towers and not unstable_towers:
+        fallback += "• None required\n"
+        
+    fallback += f"\n⚠️ MONITORING FOCUS:\n"
+    if critical_towers or unstable_towers:
+        focus_towers = list(set(critical_towers + unstable_towers))
+        fallback += f"• Towers {', '.join(map(str, focus_towers))}\n• High downtime or currently offline\n"
+    else:
+        fallback += "• All towers operating normally\n• Continue routine monitoring\n"
         
-        if critical_towers:
-            fallback += f"• Investigate offline towers: {', '.join(map(str, critical_towers))}\n"
-        if unstable_towers:
-            fallback += f"• Check unstable towers: {', '.join(map(str, unstable_towers))}\n"
-        if not critical_towers and not unstable_towers:
-            fallback += "• None required\n"
-            
-        fallback += f"\n⚠️ MONITORING FOCUS:\n"
-        if critical_towers or unstable_towers:
-            focus_towers = list(set(critical_towers + unstable_towers))
-            fallback += f"• Towers {', '.join(map(str, focus_towers))}\n• High downtime or currently offline\n"
-        else:
-            fallback += "• All towers operating normally\n• Continue routine monitoring\n"
-            
-        fallback += f"\n[Note: AI analysis unavailable - {str(e)[:50]}...]"
-        return fallback
+    fallback += f"\n[Note: AI analysis unavailable - {str(e)[:50]}...]"
+    return fallback
+
+def summarize_tower_stats(towers_info: dict) -> str:
+    """
+    Same summary as summarize_logs_and_tower_info, from a per-cell aggregate
+    {cell_id: {"on": int, "off": int, "last_status": "ON"|"OFF"}} such as
+    src.common.aggregates.window_per_cell() returns.
+    """
+    if not towers_info:
+        return "No recent tower activity to analyze."
+    if _llm_backend() != "stub" and not os.getenv("GROQ_API_KEY"):
+        return "[LLM unavailable] GROQ_API_KEY not set"
+    
+    plan = _plan_summary(towers_info)
+    try:
+        if plan["mode"] == "hierarchical":
+            summary, info = hierarchical.summarize(towers_info, cached_complete, PROMPT_TEMPLATE, **_hierarchy_options())
+            logger.info("hierarchical summary: %s", info)
+            return summary
+        return cached_complete(plan["prompt"])
+    except Exception as e:
+        return _fallback_summary(plan, e)
+
+async def asummarize_tower_stats(towers_info: dict) -> str:
+    """summarize_tower_stats() on the async Groq client; doesn't block the event loop."""
+    if not towers_info:
+        return "No recent tower activity to analyze."
+    if _llm_backend() != "stub" and not os.getenv("GROQ_API_KEY"):
+        return "[LLM unavailable] GROQ_API_KEY not set"
+    
+    plan = _plan_summary(towers_info)
+    try:
+        if plan["mode"] == "hierarchical":
+            summary, info = await hierarchical.asummarize(towers_info, acached_complete, PROMPT_TEMPLATE, **_hierarchy_options())
+            logger.info("hierarchical summary: %s", info)
+            return summary
+        return await acached_complete(plan["prompt"])
+    except Exception as e:
+        return _fallback_summary(plan, e)
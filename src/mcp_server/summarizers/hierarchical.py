@@ -0,0 +1,207 @@
+"""
+Hierarchical summaries for large fleets.
+
+The flat prompt lists every tower, so it grows with the fleet. Here the prompt
+is built from:
+- the top-K most anomalous towers (offline, flapping, low uptime), one line each;
+- one compact digest line per cluster for all the other towers.
+
+With parallel > 0 each cluster is first summarized on its own (concurrently) and
+a final merge pass combines the cluster summaries. Every prompt is trimmed to a
+token budget, estimated at ~4 characters per token.
+"""
+from __future__ import annotations
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+# llm(prompt, max_tokens) -> text
+LLM = Callable[[str, int], str]
+AsyncLLM = Callable[[str, int], Awaitable[str]]
+
+CLUSTER_PROMPT = """You are a network operations assistant. Summarize the health of cluster {cluster} in at most 3 bullets: overall state, towers needing action, towers to watch.
+
+DATA:
+{data}"""
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+def tower_uptime(info: Dict[str, Any]) -> float:
+    on, off = info.get("on", 0), info.get("off", 0)
+    return on / (on + off) * 100 if (on + off) > 0 else 0.0
+
+def is_unstable(info: Dict[str, Any]) -> bool:
+    # The online detectors' flag when the caller attached one, else the flat summary's count rule
+    if "unstable" in info:
+        return bool(info["unstable"])
+    on, off = info.get("on", 0), info.get("off", 0)
+    return on + off > 10 and off > on * 1.5
+
+def unstable_label(towers_info: Dict[int, Dict[str, Any]]) -> str:
+    # Name the rule is_unstable() applied, so the prompt doesn't call flapping "downtime"
+    flagged = sum(1 for info in towers_info.values() if "unstable" in info)
+    if not flagged:
+        return "Unstable (High downtime)"
+    if flagged < len(towers_info):
+        return "Unstable (Frequent status flips or high downtime)"
+    return "Unstable (Frequent status flips)"
+
+def anomaly_score(info: Dict[str, Any]) -> float:
+    """Higher is worse: offline now, then unstable, then low uptime."""
+    return ((2.0 if info.get("last_status") == "OFF" else 0.0)
+            + (1.0 if is_unstable(info) else 0.0)
+            + (100.0 - tower_uptime(info)) / 100.0)
+
+def rank_towers(towers_info: Dict[int, Dict[str, Any]]) -> List[int]:
+    return sorted(towers_info, key=lambda cid: (-anomaly_score(towers_info[cid]), cid))
+
+def tower_line(cid: int, info: Dict[str, Any]) -> str:
+    events = info.get("on", 0) + info.get("off", 0)
+    cluster = info.get("cluster")
+    where = f", Cluster: {cluster}" if cluster else ""
+    return f"Tower {cid}: {info['last_status']} (Uptime: {tower_uptime(info):.1f}%, Events: {events}{where})"
+
+def cluster_digests(towers_info: Dict[int, Dict[str, Any]], skip: Iterable[int] = (),
+                    watch: int = 3) -> Dict[str, Dict[str, Any]]:
+    """Per-cluster counts for every tower not in `skip`, plus its `watch` worst tower ids."""
+    skip = set(skip)
+    groups: Dict[str, List[int]] = {}
+    for cid, info in towers_info.items():
+        if cid not in skip:
+            groups.setdefault(info.get("cluster") or "unassigned", []).append(cid)
+    out = {}
+    for name, cids in groups.items():
+        on = sum(towers_info[c].get("on", 0) for c in cids)
+        off = sum(towers_info[c].get("off", 0) for c in cids)
+        offline = sum(1 for c in cids if towers_info[c]["last_status"] == "OFF")
+        worst = sorted(cids, key=lambda c: (-anomaly_score(towers_info[c]), c))[:watch]
+        out[name] = {
+            "towers": len(cids), "online": len(cids) - offline, "offline": offline,
+            "unstable": sum(1 for c in cids if is_unstable(towers_info[c])),
+            "uptime": on / (on + off) * 100 if (on + off) > 0 else 0.0,
+            "watch": [c for c in worst if anomaly_score(towers_info[c]) > 0],
+        }
+    # Worst clusters first, so they survive budget trimming
+    return dict(sorted(out.items(), key=lambda kv: (-kv[1]["offline"], -kv[1]["unstable"], kv[1]["uptime"], kv[0])))
+
+def digest_line(name: str, d: Dict[str, Any]) -> str:
+    line = (f"Cluster {name}: {d['towers']} towers, {d['online']} online, {d['offline']} offline, "
+            f"{d['unstable']} unstable, uptime {d['uptime']:.1f}%")
+    if d["watch"]:
+        line += f", watch: {', '.join(map(str, d['watch']))}"
+    return line
+
+def fit_lines(lines: List[str], budget: int) -> List[str]:
+    """Keep leading lines while they fit in `budget` tokens; note how many were dropped."""
+    out, used = [], 0
+    for i, line in enumerate(lines):
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            out.append(f"... {len(lines) - i} more omitted")
+            break
+        out.append(line)
+        used += cost
+    return out
+
+def overview(towers_info: Dict[int, Dict[str, Any]]) -> str:
+    total = len(towers_info)
+    offline = sum(1 for i in towers_info.values() if i["last_status"] == "OFF")
+    unstable = sum(1 for i in towers_info.values() if is_unstable(i))
+    clusters = len({i.get("cluster") or "unassigned" for i in towers_info.values()})
+    return f"""NETWORK STATUS OVERVIEW:
+- Total Towers: {total} in {clusters} clusters
+- Online: {total - offline} ({(total - offline) / total * 100:.1f}%)
+- Offline: {offline} ({offline / total * 100:.1f}%)
+- {unstable_label(towers_info)}: {unstable}
+"""
+
+def build_data(towers_info: Dict[int, Dict[str, Any]], top: List[int], budget: int,
+               head: Optional[str] = None) -> str:
+    """Overview + top-K tower lines + cluster digests (for the remaining towers), within budget."""
+    head = head if head is not None else overview(towers_info)
+    budget -= estimate_tokens(head)
+    towers = [tower_line(c, towers_info[c]) for c in top]
+    digests = [digest_line(n, d) for n, d in cluster_digests(towers_info, skip=top).items()]
+    # Towers get up to half the room; clusters take the rest (and anything towers left over)
+    tower_part = fit_lines(towers, budget // 2)
+    budget -= sum(estimate_tokens(l) + 1 for l in tower_part) + 10
+    cluster_part = fit_lines(digests, budget)
+    return (head
+            + f"\nTOP {len(top)} TOWERS TO REVIEW:\n" + "\n".join(tower_part)
+            + "\n\nCLUSTERS (other towers):\n" + "\n".join(cluster_part) + "\n")
+
+def _plan(towers_info: Dict[int, Dict[str, Any]], template: str, top_k: int,
+          budget: int) -> Tuple[int, List[int], Dict[str, Any]]:
+    room = budget - estimate_tokens(template.format(data=""))
+    top = [c for c in rank_towers(towers_info)[:top_k] if anomaly_score(towers_info[c]) > 0]
+    return room, top, {"mode": "hierarchical", "towers": len(towers_info), "top_k": len(top)}
+
+def cluster_prompts(towers_info: Dict[int, Dict[str, Any]], room: int, top_k: int) -> List[Tuple[str, str]]:
+    """Map step: one (cluster, prompt) per cluster over that cluster's own towers, worst first."""
+    groups: Dict[str, Dict[int, Dict[str, Any]]] = {}
+    for cid, t in towers_info.items():
+        groups.setdefault(t.get("cluster") or "unassigned", {})[cid] = t
+    cluster_room = room - estimate_tokens(CLUSTER_PROMPT)
+    out = []
+    for name in cluster_digests(towers_info):
+        members = groups[name]
+        local_top = [c for c in rank_towers(members)[:top_k] if anomaly_score(members[c]) > 0]
+        head = digest_line(name, cluster_digests(members)[name]) + "\n"
+        out.append((name, CLUSTER_PROMPT.format(cluster=name, data=build_data(members, local_top, cluster_room, head))))
+    return out
+
+def merge_prompt(towers_info: Dict[int, Dict[str, Any]], top: List[int], summaries: List[Tuple[str, str]],
+                 template: str, room: int) -> str:
+    """Reduce step: fleet overview + top towers + the cluster summaries (worst clusters first)."""
+    head = overview(towers_info)
+    parts = [f"[{name}] " + " ".join(text.split()) for name, text in summaries]
+    towers = fit_lines([tower_line(c, towers_info[c]) for c in top], room // 4)
+    rest = room - estimate_tokens(head) - sum(estimate_tokens(l) + 1 for l in towers) - 10
+    data = (head + f"\nTOP {len(top)} TOWERS TO REVIEW:\n" + "\n".join(towers)
+            + "\n\nCLUSTER SUMMARIES:\n" + "\n".join(fit_lines(parts, rest)) + "\n")
+    return template.format(data=data)
+
+def summarize(towers_info: Dict[int, Dict[str, Any]], llm: LLM, template: str,
+              top_k: int = 25, budget: int = 3000, parallel: int = 0,
+              max_tokens: int = 400) -> Tuple[str, Dict[str, Any]]:
+    """
+    Summarize a large fleet. `template` is the final prompt with a {data} slot.
+    Returns (summary, info) where info records prompt sizes and LLM calls made.
+    """
+    room, top, info = _plan(towers_info, template, top_k, budget)
+    if parallel <= 0:
+        prompt = template.format(data=build_data(towers_info, top, room))
+        info.update(calls=1, prompt_tokens=estimate_tokens(prompt))
+        return llm(prompt, max_tokens), info
+
+    maps = cluster_prompts(towers_info, room, top_k)
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        texts = list(pool.map(lambda p: llm(p, 150), [p for _, p in maps]))
+    prompt = merge_prompt(towers_info, top, [(n, t) for (n, _), t in zip(maps, texts)], template, room)
+    info.update(calls=len(maps) + 1, clusters=len(maps), prompt_tokens=estimate_tokens(prompt),
+                max_cluster_prompt_tokens=max((estimate_tokens(p) for _, p in maps), default=0))
+    return llm(prompt, max_tokens), info
+
+async def asummarize(towers_info: Dict[int, Dict[str, Any]], llm: AsyncLLM, template: str,
+                     top_k: int = 25, budget: int = 3000, parallel: int = 0,
+                     max_tokens: int = 400) -> Tuple[str, Dict[str, Any]]:
+    """summarize() with a coroutine LLM; cluster calls run as concurrent tasks."""
+    room, top, info = _plan(towers_info, template, top_k, budget)
+    if parallel <= 0:
+        prompt = template.format(data=build_data(towers_info, top, room))
+        info.update(calls=1, prompt_tokens=estimate_tokens(prompt))
+        return await llm(prompt, max_tokens), info
+
+    maps = cluster_prompts(towers_info, room, top_k)
+    limit = asyncio.Semaphore(parallel)
+
+    async def one(p: str) -> str:
+        async with limit:
+            return await llm(p, 150)
+
+    texts = await asyncio.gather(*(one(p) for _, p in maps))
+    prompt = merge_prompt(towers_info, top, [(n, t) for (n, _), t in zip(maps, texts)], template, room)
+    info.update(calls=len(maps) + 1, clusters=len(maps), prompt_tokens=estimate_tokens(prompt),
+                max_cluster_prompt_tokens=max((estimate_tokens(p) for _, p in maps), default=0))
+    return await llm(prompt, max_tokens), info
@@ -0,0 +1,63 @@
+"""
+Offline stand-in for the Groq chat API (LLM_BACKEND=stub).
+
+The reply is built deterministically from the numbers in the prompt, so the
+summarizers can be run and tested without network access or an API key.
+STUB_LLM_LATENCY_MS adds a fixed delay per call to mimic a remote model.
+"""
+from __future__ import annotations
+import asyncio
+import os
+import re
+import time
+from typing import Tuple
+
+from src.mcp_server.summarizers.hierarchical import estimate_tokens
+
+_TOTAL = re.compile(r"Total Towers: (\d+)")
+_ONLINE = re.compile(r"^- Online: (\d+)", re.M)
+_OFFLINE = re.compile(r"^- Offline: (\d+)", re.M)
+_TOWER_OFF = re.compile(r"^Tower (\d+): OFF", re.M)
+_CLUSTER = re.compile(r"^Cluster (\S+): (\d+) towers, (\d+) online, (\d+) offline", re.M)
+
+def _latency() -> float:
+    return float(os.getenv("STUB_LLM_LATENCY_MS", "0")) / 1000
+
+def complete(prompt: str, max_tokens: int = 400) -> Tuple[str, int]:
+    """Return (text, total_tokens) like a chat completion would."""
+    if _latency() > 0:
+        time.sleep(_latency())
+    return reply(prompt, max_tokens)
+
+async def acomplete(prompt: str, max_tokens: int = 400) -> Tuple[str, int]:
+    if _latency() > 0:
+        await asyncio.sleep(_latency())
+    return reply(prompt, max_tokens)
+
+def reply(prompt: str, max_tokens: int = 400) -> Tuple[str, int]:
+    """The deterministic answer itself (no delay)."""
+    def num(rx: re.Pattern, default: int = 0) -> int:
+        m = rx.search(prompt)
+        return int(m.group(1)) if m else default
+
+    clusters = _CLUSTER.findall(prompt)
+    offline_towers = _TOWER_OFF.findall(prompt)
+    total = num(_TOTAL, sum(int(c[1]) for c in clusters))
+    offline = num(_OFFLINE, sum(int(c[3]) for c in clusters) or len(offline_towers))
+    online = num(_ONLINE, total - offline)
+    health = "Critical" if offline else "Good"
+
+    lines = [f"🟢 NETWORK HEALTH: {health}", "", "📊 QUICK STATS:",
+             f"• Total Towers: {total}", f"• Online: {online}", f"• Offline: {offline}",
+             "", "🚨 IMMEDIATE ACTIONS:"]
+    if offline_towers:
+        lines.append(f"• Investigate offline towers: {', '.join(offline_towers[:10])}")
+    else:
+        lines.append("• None required")
+    lines += ["", "⚠️ MONITORING FOCUS:"]
+    worst = [c[0] for c in clusters if int(c[3]) > 0][:3]
+    lines.append(f"• Clusters {', '.join(worst)}" if worst else "• Continue routine monitoring")
+    lines += ["", "[stub LLM]"]
+
+    text = "\n".join(lines)[: max_tokens * 4]  # honour max_tokens like the real API
+    return text, estimate_tokens(prompt) + estimate_tokens(text)
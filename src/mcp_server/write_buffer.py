@@ -0,0 +1,154 @@
+from __future__ import annotations
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo.collection import Collection
+from pymongo.write_concern import WriteConcern
+
+log = logging.getLogger(__name__)
+
+@dataclass
+class _Pending:
+    docs: List[Dict[str, Any]]
+    done: threading.Event = field(default_factory=threading.Event)
+    error: Optional[BaseException] = None
+
+class WriteBuffer:
+    """
+    Write-behind buffer that coalesces batches from concurrent write_logs calls
+    into larger unordered insert_many calls on a background thread.
+
+    A flush happens when `max_docs` documents are pending or `max_delay` seconds
+    after the oldest pending batch arrived. At most `max_pending` batches wait in
+    the queue; submit() blocks up to `put_timeout` seconds and then fails
+    (back-pressure), and waits at most `flush_timeout` seconds for its flush.
+    close() drains everything still queued; batches it can't flush fail.
+    """
+
+    def __init__(
+        self,
+        get_collection: Callable[[], Collection],
+        max_docs: int = 5000,
+        max_delay: float = 0.05,
+        max_pending: int = 1000,
+        put_timeout: float = 5.0,
+        acknowledged: bool = True,
+        flush_timeout: float = 30.0,
+    ):
+        self._get_collection = get_collection
+        self.max_docs = max_docs
+        self.max_delay = max_delay
+        self.put_timeout = put_timeout
+        self.flush_timeout = flush_timeout
+        self.write_concern = WriteConcern(w=1 if acknowledged else 0)
+        self._queue: "queue.Queue[_Pending]" = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        # Guards submit()'s closed-check + put against close(); waiting for queue space
+        # releases it, and the worker / close() notify waiters
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="write-buffer", daemon=True)
+        self._thread.start()
+
+    def submit(self, docs: List[Dict[str, Any]], wait: bool = True) -> int:
+        """Queue docs for insertion; with wait=True block until they are flushed."""
+        pending = _Pending(docs)
+        deadline = time.monotonic() + self.put_timeout
+        with self._cond:
+            while True:
+                if self._stop.is_set():
+                    raise RuntimeError("write buffer is closed")
+                try:
+                    self._queue.put_nowait(pending)
+                    break
+                except queue.Full:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RuntimeError(f"write buffer full ({self._queue.maxsize} batches pending), retry later")
+                    self._cond.wait(remaining)
+        if wait:
+            if not pending.done.wait(self.flush_timeout):
+                raise TimeoutError(f"write buffer flush not done after {self.flush_timeout:g}s")
+            if pending.error is not None:
+                raise pending.error
+        return len(docs)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting writes and flush whatever is still queued."""
+        with self._cond:
+            if self._stop.is_set():
+                return
+            self._stop.set()
+            self._cond.notify_all()  # submitters waiting for space fail as closed
+        self._thread.join(timeout)
+        # Only left over if the join timed out: fail them rather than leave submitters waiting
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for p in leftover:
+            p.error = RuntimeError("write buffer closed before the batch was flushed")
+            p.done.set()
+        if leftover:
+            log.warning("write buffer closed with %d unflushed batches", len(leftover))
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            group = [first]
+            count = len(first.docs)
+            deadline = time.monotonic() + self.max_delay
+            # Coalesce until the size threshold or the oldest batch's deadline
+            while count < self.max_docs:
+                remaining = deadline - time.monotonic()
+                try:
+                    if self._stop.is_set():
+                        nxt = self._queue.get_nowait()  # draining on shutdown: don't wait
+                    elif remaining > 0:
+                        nxt = self._queue.get(timeout=remaining)
+                    else:
+                        break
+                except queue.Empty:
+                    break
+                group.append(nxt)
+                count += len(nxt.docs)
+            with self._cond:
+                self._cond.notify_all()  # queue space freed
+            self._flush(group)
+
+    def _flush(self, group: List[_Pending]) -> None:
+        docs = [d for p in group for d in p.docs]
+        error: Optional[BaseException] = None
+        try:
+            if docs:
+                coll = self._get_collection().with_options(write_concern=self.write_concern)
+                coll.insert_many(docs, ordered=False)
+        except Exception as e:
+            log.warning("write buffer flush of %d docs failed: %s", len(docs), e)
+            error = e
+        for p in group:
+            p.error = error
+            p.done.set()
+
+def buffer_from_env(get_collection: Callable[[], Collection]) -> Optional[WriteBuffer]:
+    """Build a WriteBuffer from WRITE_BUFFER* env vars, or None when disabled (default)."""
+    if os.getenv("WRITE_BUFFER", "0").strip().lower() not in ("1", "true", "yes", "on"):
+        return None
+    return WriteBuffer(
+        get_collection,
+        max_docs=int(os.getenv("WRITE_BUFFER_MAX_DOCS", "5000")),
+        max_delay=float(os.getenv("WRITE_BUFFER_MAX_DELAY_MS", "50")) / 1000,
+        max_pending=int(os.getenv("WRITE_BUFFER_MAX_PENDING", "1000")),
+        put_timeout=float(os.getenv("WRITE_BUFFER_PUT_TIMEOUT", "5")),
+        acknowledged=os.getenv("WRITE_CONCERN", "acknowledged").strip().lower() != "unacknowledged",
+        flush_timeout=float(os.getenv("WRITE_BUFFER_FLUSH_TIMEOUT", "30")),
+    )